@@ -0,0 +1,55 @@
+# asgi.py
+# Async serving mode: hypercorn asgi:app --bind 0.0.0.0:8080
+from quart import Quart, Response, jsonify
+from src.api.async_routes import async_router, gemini_service, limiter
+from src.core.bootstrap import prepare_index, startup_status
+from src.utils.logger import get_logger
+from src.utils.metrics import CONTENT_TYPE, REGISTRY
+from datetime import datetime
+
+
+logger = get_logger(__name__)
+app = Quart(__name__)
+app.config['index_manager'] = prepare_index(warm_ups=[gemini_service.warm_up])
+logger.info("Search system initialized" if startup_status.state == 'ready' else "Search system initializing in the background")
+
+app.register_blueprint(async_router, url_prefix='/api/v1')
+
+@app.after_request
+async def add_cors_headers(response):
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+@app.route("/health")
+async def health_check():
+    index_manager = app.config.get('index_manager')
+    if not index_manager or index_manager.searcher is None:
+        return jsonify({
+            "status": "unhealthy",
+            "error": "Search system not initialized"
+        }), 500
+
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "components_initialized": True,
+        "in_flight": limiter.in_flight
+    })
+
+@app.route("/health/live")
+async def liveness_check():
+    return jsonify({"status": "alive"})
+
+@app.route("/health/ready")
+async def readiness_check():
+    index_manager = app.config.get('index_manager')
+    ready = startup_status.state == 'ready' and index_manager is not None and index_manager.searcher is not None
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "snapshot": index_manager.snapshot if index_manager else None,
+        "startup": startup_status.to_dict()
+    }), 200 if ready else 503
+
+@app.route("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
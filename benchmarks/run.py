@@ -0,0 +1,275 @@
+# benchmarks/run.py
+"""Offline end-to-end benchmarks.
+
+Every stage runs against deterministic local stand-ins (EMBEDDING_BACKEND=fake,
+LLM_BACKEND=fake) with configurable injected latency, inside a throwaway
+workspace, so no API key or network access is needed:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json --max-regression 0.2
+
+Reports p50/p95/p99 latency, throughput and peak RSS per stage. With
+--baseline, exits non-zero when any stage's p95 regressed by more than
+--max-regression.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+QUESTIONS = [
+    "What is the concept of dharma in the Gita?",
+    "Who is Arjuna and why does he refuse to fight?",
+    "What does Krishna say about the immortality of the soul?",
+    "How should one act without attachment to results?",
+    "What is karma yoga?",
+    "What are the qualities of a person of steady wisdom?",
+    "Explain chapter 2 verse 47",
+    "What does Krishna teach about devotion?",
+    "What is the nature of the self according to Krishna?",
+    "How does the Gita describe meditation?",
+    "What is said about the three gunas?",
+    "BG 18.66",
+]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure(stage: str, fn: Callable[[int], None], iterations: int, warmup: int = 1,
+            quiet: bool = True, **params) -> Dict:
+    """Time fn(i) for i in range(iterations) after warmup calls; fn's stdout is dropped when quiet"""
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        for i in range(warmup):
+            fn(i)
+        durations = []
+        started = time.perf_counter()
+        for i in range(iterations):
+            start = time.perf_counter()
+            fn(i)
+            durations.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+
+    latencies = np.array(durations) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'stage': stage,
+        'iterations': iterations,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'throughput_per_s': round(iterations / elapsed, 2) if elapsed else None,
+        'peak_rss_mb': peak_rss_mb(),
+        **params
+    }
+
+
+def configure_environment(args):
+    """Local stand-ins with injected latency; caches off so every call does the full work"""
+    os.environ['EMBEDDING_BACKEND'] = 'fake'
+    os.environ['FAKE_EMBEDDING_LATENCY'] = str(args.embed_latency)
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['FAKE_LLM_LATENCY'] = str(args.llm_latency)
+    os.environ['FAKE_LLM_TOKEN_LATENCY'] = str(args.llm_token_latency)
+    if not args.warm_caches:
+        for name in ('QUERY_CACHE_SIZE', 'ANSWER_CACHE_SIZE'):
+            os.environ[name] = '0'
+        os.environ['SEMANTIC_CACHE'] = '0'
+        os.environ['EMBEDDING_CACHE'] = '0'
+    os.environ.setdefault('INDEX_REFRESH_INTERVAL', '3600')
+
+
+def prepare_workspace(source: Path) -> Path:
+    workspace = Path(tempfile.mkdtemp(prefix='gita_bench_'))
+    (workspace / 'data' / 'raw').mkdir(parents=True)
+    shutil.copy(source, workspace / 'data' / 'raw' / 'gita.md')
+    os.chdir(workspace)
+    return workspace
+
+
+def run_benchmarks(args) -> List[Dict]:
+    from src.core.chunker import DocumentChunker
+    from src.core.embedder import DocumentEmbedder
+    from src.core.searcher import EnhancedSearcher
+
+    quiet = not args.verbose
+    results = []
+    source = Path('data/raw/gita.md')
+    state: Dict = {}
+
+    def report(result: Dict):
+        results.append(result)
+        print(f"{result['stage']:<18} p50 {result['p50_ms']:>9.2f} ms   p95 {result['p95_ms']:>9.2f} ms   "
+              f"p99 {result['p99_ms']:>9.2f} ms   {result['throughput_per_s']:>9.1f}/s   "
+              f"rss {result['peak_rss_mb']} MB")
+
+    chunker = DocumentChunker(max_workers=1)
+
+    def chunk(i):
+        state['chunks'] = list(chunker.iter_chunks(source))
+
+    report(measure('chunking', chunk, args.build_iterations, quiet=quiet))
+    chunks = state['chunks']
+
+    def build(i):
+        DocumentEmbedder().process_chunks(chunks)
+
+    report(measure('index_build', build, args.build_iterations, quiet=quiet, chunks=len(chunks)))
+
+    def load(i):
+        state['searcher'] = EnhancedSearcher.load()
+
+    report(measure('searcher_load', load, args.iterations, quiet=quiet))
+    searcher = state['searcher']
+
+    for k in args.k:
+        report(measure(f'search_k{k}', lambda i, k=k: searcher.search(QUESTIONS[i % len(QUESTIONS)], k=k),
+                       args.iterations, quiet=quiet, k=k))
+
+    from src.services.gemini import GeminiService
+
+    service = GeminiService()
+    contexts = []
+    for question in QUESTIONS:
+        found = searcher.search(question, k=5)
+        contexts.append(([r['content'] for r in found], [r['chunk_id'] for r in found]))
+    prompts = [service._prepare_prompt(question, *context) for question, context in zip(QUESTIONS, contexts)]
+    answers = [service.model._answer(prompt) for prompt in prompts]
+
+    report(measure('prepare_prompt', lambda i: service._prepare_prompt(
+        QUESTIONS[i % len(QUESTIONS)], *contexts[i % len(QUESTIONS)]), args.iterations, quiet=quiet))
+    report(measure('format_response', lambda i: service._format_response(answers[i % len(answers)]),
+                   args.iterations, quiet=quiet))
+
+    with contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+        import main
+    client = main.app.test_client()
+
+    def ask(i):
+        response = client.post('/api/v1/ask', json={'question': QUESTIONS[i % len(QUESTIONS)]})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/v1/ask returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    report(measure('ask_endpoint', ask, args.iterations, quiet=quiet))
+    return results
+
+
+def environment_info(args) -> Dict:
+    import faiss
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'faiss': faiss.__version__,
+        'index_type': os.getenv('INDEX_TYPE', 'flat'),
+        'vector_storage': os.getenv('VECTOR_STORAGE', 'float32'),
+        'search_mode': os.getenv('SEARCH_MODE', 'dense'),
+        'embed_latency_s': args.embed_latency,
+        'llm_latency_s': args.llm_latency,
+        'llm_token_latency_s': args.llm_token_latency,
+        'warm_caches': args.warm_caches
+    }
+
+
+def compare(results: List[Dict], baseline_path: Path, max_regression: float) -> List[str]:
+    """Stages whose p95 grew by more than max_regression (a fraction) over the baseline"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {stage['stage']: stage for stage in json.load(f)['stages']}
+    regressions = []
+    for result in results:
+        before = baseline.get(result['stage'])
+        if before and before['p95_ms'] > 0:
+            change = result['p95_ms'] / before['p95_ms'] - 1
+            if change > max_regression:
+                regressions.append(
+                    f"{result['stage']}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms (+{change:.0%})"
+                )
+    return regressions
+
+
+def main_cli(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks")
+    parser.add_argument('--source', type=Path, default=REPO_ROOT / 'data' / 'raw' / 'gita.md')
+    parser.add_argument('--iterations', type=int, default=50, help="Timed calls per stage")
+    parser.add_argument('--build-iterations', type=int, default=3, help="Timed calls for chunking and index build")
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 3, 5, 10, 20], help="k values for search")
+    parser.add_argument('--embed-latency', type=float, default=0.0, help="Seconds injected per embedding call")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Seconds to the first LLM token")
+    parser.add_argument('--llm-token-latency', type=float, default=0.0, help="Seconds between LLM chunks")
+    parser.add_argument('--warm-caches', action='store_true', help="Keep query, answer and embedding caches on")
+    parser.add_argument('--output', type=Path, help="Write results as JSON")
+    parser.add_argument('--baseline', type=Path, help="Earlier --output file to compare p95 against")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="Allowed p95 growth, e.g. 0.2 = 20%%")
+    parser.add_argument('--keep-workspace', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help="Show the application's own output")
+    args = parser.parse_args(argv)
+
+    source = args.source.resolve()
+    output = args.output.resolve() if args.output else None
+    baseline = args.baseline.resolve() if args.baseline else None
+    configure_environment(args)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    workspace = prepare_workspace(source)
+    try:
+        results = run_benchmarks(args)
+    finally:
+        os.chdir(REPO_ROOT)
+        if not args.keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    report = {'environment': environment_info(args), 'stages': results}
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No stage regressed more than {args.max_regression:.0%} against {baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
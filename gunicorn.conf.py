@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py main:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Import the app once in the master: an index loaded there is shared with the
+# forked workers copy-on-write. With FAST_START the master still loads an
+# existing snapshot before forking, but leaves a missing index for the workers
+# to build (one builds, the others wait for it) rather than load a copy itself.
+preload_app = True
+os.environ['PRELOAD_APP'] = '1'
+
+
+def post_fork(server, worker):
+    # A worker forked before the preloaded app finished starting continues on its own thread
+    from src.core.bootstrap import resume_after_fork
+
+    resume_after_fork()
@@ -1,60 +1,28 @@
 # main.py
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
-from src.api.routes import router  
-from src.core.searcher import EnhancedSearcher
-from src.core.chunker import DocumentChunker
-from src.core.embedder import DocumentEmbedder
+from src.api.routes import gemini_service, router
+from src.core.bootstrap import prepare_index, startup_status
+from src.utils.logger import get_logger
+from src.utils.metrics import CONTENT_TYPE, REGISTRY
 from datetime import datetime
 import os
-from pathlib import Path
-from glob import glob
 
 
+logger = get_logger(__name__)
 app = Flask(__name__)
 
 # CORS setup
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-def setup_directories():
-
-    directories = [
-        "data/raw",
-        "data/processed/faiss_index",
-        "data/processed/chunks"
-    ]
-    
-    for dir_path in directories:
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
-        print(f"Created directory: {dir_path}")
-
-def check_existing_files():
-
-    chunks_exist = len(glob("data/processed/chunks/gita_processed_*.json")) > 0
-    embeddings_exist = len(glob("data/processed/faiss_index/chunk_data_*.pkl")) > 0
-    return chunks_exist and embeddings_exist
-
 def init_app():
 
     try:
-        setup_directories()
-        
-        if not check_existing_files():
-            print("\nProcessing documentation...")
-            chunker = DocumentChunker()
-            embedder = DocumentEmbedder()
-            
-            chunks = chunker.process_documentation('./data/raw/gita.md')
-            embedder.process_chunks(chunks)
-        else:
-            print("\nUsing existing processed files...")
-        
-        # Store searcher in app config instead of state
-        app.config['searcher'] = EnhancedSearcher()
-        print("Search system initialized")
+        app.config['index_manager'] = prepare_index(warm_ups=[gemini_service.warm_up])
+        logger.info("Search system initialized" if startup_status.state == 'ready' else "Search system initializing in the background")
             
     except Exception as e:
-        print(f"Error during startup: {str(e)}")
+        logger.error(f"Error during startup: {str(e)}")
         raise
 
 init_app()
@@ -63,8 +31,8 @@ app.register_blueprint(router, url_prefix='/api/v1')
 
 @app.route("/health")
 def health_check():
-    searcher = app.config.get('searcher')
-    if not searcher:
+    index_manager = app.config.get('index_manager')
+    if not index_manager or index_manager.searcher is None:
         return jsonify({
             "status": "unhealthy",
             "error": "Search system not initialized"
@@ -76,6 +44,26 @@ def health_check():
         "components_initialized": True
     })
 
+@app.route("/health/live")
+def liveness_check():
+    # The process is up and serving HTTP; says nothing about the index
+    return jsonify({"status": "alive"})
+
+@app.route("/health/ready")
+def readiness_check():
+    index_manager = app.config.get('index_manager')
+    ready = startup_status.state == 'ready' and index_manager is not None and index_manager.searcher is not None
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "snapshot": index_manager.snapshot if index_manager else None,
+        "startup": startup_status.to_dict()
+    }), 200 if ready else 503
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format; counters are per worker process
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     # Development server
     port = int(os.environ.get("PORT", 8080))
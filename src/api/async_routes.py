@@ -0,0 +1,164 @@
+# src/api/async_routes.py
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from quart import Blueprint, g, request, jsonify, current_app
+from .models import QuestionQuery, validate_query
+from src.services.gemini import GeminiService
+from src.utils.logger import get_logger
+from src.utils.helpers import create_metadata, log_request, log_response
+from src.utils.metrics import (
+    REGISTRY, REQUEST_DURATION, REQUESTS, SERVER_TIMING_HEADER, cache_samples, server_timing, span
+)
+from src.core.index_manager import get_index_manager
+
+logger = get_logger(__name__)
+async_router = Blueprint('async_api', __name__)
+gemini_service = GeminiService()
+get_index_manager().add_swap_listener(gemini_service.invalidate_cache)
+
+REQUEST_TIMEOUT = float(os.getenv('ASYNC_REQUEST_TIMEOUT', '30'))
+QUEUE_TIMEOUT = float(os.getenv('ASYNC_QUEUE_TIMEOUT', '1'))
+
+# FAISS releases the GIL during search, so a small pool keeps the event loop free
+search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SEARCH_THREADS', '4')),
+    thread_name_prefix='faiss-search'
+)
+
+
+class ServerBusyError(Exception):
+    pass
+
+
+class InvalidFilterError(ValueError):
+    pass
+
+
+class InFlightLimiter:
+    """Caps concurrent requests; callers wait at most queue_timeout for a slot"""
+
+    def __init__(self, limit: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        # Slots currently held; only touched on the event loop thread
+        self.in_flight = 0
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ServerBusyError("Too many requests in flight")
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+limiter = InFlightLimiter(int(os.getenv('ASYNC_MAX_IN_FLIGHT', '256')), QUEUE_TIMEOUT)
+
+
+def _collect_metrics():
+    yield 'gita_in_flight_requests', 'gauge', 'Requests holding an in-flight slot', {}, limiter.in_flight
+    stats = gemini_service.cache_stats()
+    yield from cache_samples("answer", stats["answer_cache"])
+    if "semantic_cache" in stats:
+        yield from cache_samples("semantic", stats["semantic_cache"])
+    # A scrape must never load or refresh the index, so only read the resident searcher
+    searcher = get_index_manager().searcher
+    if searcher is not None:
+        yield from cache_samples("query_embedding", searcher.query_cache.stats())
+
+REGISTRY.add_collector(_collect_metrics)
+
+
+@async_router.before_request
+async def _start_request_timer():
+    g.request_start = time.perf_counter()
+    g.timings = {}
+
+
+@async_router.after_request
+async def _record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    REQUEST_DURATION.observe(elapsed, endpoint=endpoint)
+    if SERVER_TIMING_HEADER:
+        response.headers["Server-Timing"] = server_timing({**g.timings, "total": elapsed * 1000})
+    return response
+
+
+async def _answer_question(query: QuestionQuery, request_id: str, timings: dict) -> dict:
+    index_manager = current_app.config['index_manager']
+    with span("get_searcher", timings):
+        # May load or swap a snapshot from disk, so it runs off the event loop
+        searcher = await asyncio.get_running_loop().run_in_executor(search_executor, index_manager.get_searcher)
+    if searcher is None:
+        raise RuntimeError("Search index not loaded")
+    try:
+        searcher.validate_filters(query.filters)
+    except ValueError as e:
+        raise InvalidFilterError(str(e))
+
+    search_results = await searcher.asearch(
+        query.question, k=query.context_limit, executor=search_executor, filters=query.filters, timings=timings
+    )
+    context_chunks = [result['content'] for result in search_results]
+    chunk_ids = [result['chunk_id'] for result in search_results]
+    chunk_uids = [result['uid'] for result in search_results]
+
+    answer = await gemini_service.aget_answer(
+        question=query.question,
+        context_chunks=context_chunks,
+        chunk_ids=chunk_ids,
+        chunk_uids=chunk_uids,
+        question_embedding=searcher.cached_query_embedding(query.question),
+        scope=query.cache_scope(),
+        timings=timings
+    )
+
+    return {
+        "answer": answer,
+        "metadata": create_metadata({
+            "request_id": request_id,
+            "context_chunks": len(context_chunks),
+        })
+    }
+
+@async_router.route("/ask", methods=['POST'])
+async def ask_question():
+    data = await request.get_json()
+    request_id = log_request("/ask", data)
+    try:
+        query = validate_query(data or {})
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        async with limiter:
+            response_data = await asyncio.wait_for(
+                _answer_question(query, request_id, g.timings), REQUEST_TIMEOUT
+            )
+
+        log_response(request_id, response_data)
+        return jsonify(response_data)
+
+    except ServerBusyError as e:
+        logger.warning(f"Rejecting request: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"error": str(e)}), 503
+
+    except InvalidFilterError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except asyncio.TimeoutError:
+        logger.error(f"Request timed out after {REQUEST_TIMEOUT}s", extra={"request_id": request_id})
+        return jsonify({"error": "Request timed out"}), 504
+
+    except Exception as e:
+        logger.error(f"Error processing question: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"error": str(e)}), 500
@@ -1,18 +1,67 @@
 # api/models.py
 from dataclasses import dataclass
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from datetime import datetime
 
+@dataclass
+class SearchFilters:
+    chapters: Optional[List[int]] = None
+    speakers: Optional[List[str]] = None
+    chunk_types: Optional[List[str]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SearchFilters':
+        """Accepts lists or single values; chapters may also be {"from": 2, "to": 3}"""
+        def as_list(value):
+            if value is None or isinstance(value, list):
+                return value
+            return [value]
+
+        chapters = data.get('chapters', data.get('chapter'))
+        if isinstance(chapters, dict):
+            try:
+                chapters = list(range(int(chapters['from']), int(chapters['to']) + 1))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError('Chapter range needs integer "from" and "to"') from None
+        chapters = as_list(chapters)
+        try:
+            chapters = [int(chapter) for chapter in chapters] if chapters else None
+        except (TypeError, ValueError):
+            raise ValueError(f"Chapters must be integers, got {chapters!r}") from None
+
+        return cls(
+            chapters=chapters,
+            speakers=as_list(data.get('speakers', data.get('speaker'))),
+            chunk_types=as_list(data.get('chunk_types', data.get('type')))
+        )
+
+def _coerce_filters(filters: Union['SearchFilters', Dict, None]) -> Optional[SearchFilters]:
+    if isinstance(filters, dict):
+        return SearchFilters.from_dict(filters)
+    return filters
+
 @dataclass
 class SearchQuery:
     query: str
     k: int = 5
     threshold: float = 0.3
+    filters: Optional[SearchFilters] = None
+
+    def __post_init__(self):
+        self.filters = _coerce_filters(self.filters)
 
 @dataclass
 class QuestionQuery:
     question: str
     context_limit: int = 5
+    filters: Optional[SearchFilters] = None
+
+    def __post_init__(self):
+        self.filters = _coerce_filters(self.filters)
+
+    def cache_scope(self) -> str:
+        """Questions only share cached answers within the same retrieval settings"""
+        return f"{self.context_limit}|{self.filters!r}"
 
 @dataclass
 class MetadataModel:
@@ -50,6 +99,36 @@ def validate_query(query_data: dict) -> QuestionQuery:
         
     return QuestionQuery(
         question=query_data['question'],
-        context_limit=context_limit
+        context_limit=context_limit,
+        filters=query_data.get('filters')
+    )
+
+
+def validate_search_query(query_data: dict) -> SearchQuery:
+    """Helper function to validate and create SearchQuery"""
+    if not query_data.get('query'):
+        raise ValueError("Query is required")
+
+    k = query_data.get('k', 5)
+    if not 0 < k <= 50:
+        raise ValueError("k must be between 1 and 50")
+
+    threshold = query_data.get('threshold', 0.3)
+    if not -1.0 <= threshold <= 1.0:
+        raise ValueError("Threshold must be between -1 and 1")
+
+    return SearchQuery(
+        query=query_data['query'],
+        k=k,
+        threshold=threshold,
+        filters=query_data.get('filters')
     )
 
+def validate_batch(batch_data: dict, key: str, max_items: int) -> List[dict]:
+    """Helper function to check the list of items in a batch request"""
+    items = batch_data.get(key) if isinstance(batch_data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"'{key}' must be a non-empty list")
+    if len(items) > max_items:
+        raise ValueError(f"At most {max_items} {key} per batch")
+    return items
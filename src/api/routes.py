@@ -1,32 +1,216 @@
 # src/api/routes.py
-from flask import Blueprint, request, jsonify, current_app
-from .models import QuestionQuery
+from flask import Blueprint, Response, g, request, jsonify, current_app, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+from .models import validate_batch, validate_query, validate_search_query
 from src.services.gemini import GeminiService
 from src.utils.logger import get_logger
 from src.utils.helpers import create_metadata, log_request, log_response
-from src.core.searcher import EnhancedSearcher
+from src.utils.metrics import (
+    REGISTRY, REQUEST_DURATION, REQUESTS, SERVER_TIMING_HEADER, cache_samples, server_timing, span
+)
+from src.core.index_manager import get_index_manager
+import json
+import os
+import time
 
 logger = get_logger(__name__)
 router = Blueprint('api', __name__)
 gemini_service = GeminiService()
+get_index_manager().add_swap_listener(gemini_service.invalidate_cache)
+
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+# Bounds concurrent LLM calls across all /ask/batch requests
+ask_batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASK_BATCH_CONCURRENCY', '8')),
+    thread_name_prefix='ask-batch'
+)
+
+def _collect_cache_metrics():
+    stats = gemini_service.cache_stats()
+    yield from cache_samples("answer", stats["answer_cache"])
+    if "semantic_cache" in stats:
+        yield from cache_samples("semantic", stats["semantic_cache"])
+    # A scrape must never load or refresh the index, so only read the resident searcher
+    searcher = get_index_manager().searcher
+    if searcher is not None:
+        yield from cache_samples("query_embedding", searcher.query_cache.stats())
+
+REGISTRY.add_collector(_collect_cache_metrics)
+
+@router.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    # Stage durations in milliseconds, filled in by the handler
+    g.timings = {}
+
+@router.after_request
+def _record_request_metrics(response):
+    # Streaming responses are measured up to their headers
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    REQUEST_DURATION.observe(elapsed, endpoint=endpoint)
+    if SERVER_TIMING_HEADER:
+        response.headers["Server-Timing"] = server_timing({**g.timings, "total": elapsed * 1000})
+    return response
+
+def _get_searcher():
+    with span("get_searcher", g.timings):
+        searcher = current_app.config['index_manager'].get_searcher()
+    if searcher is None:
+        raise RuntimeError("Search index not loaded")
+    return searcher
+
+def _validate_items(items: list, validator) -> list:
+    """Validated query per item, or the ValueError explaining why it was rejected"""
+    validated = []
+    for item in items:
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Each item must be an object")
+            validated.append(validator(item))
+        except (ValueError, TypeError) as e:
+            validated.append(e)
+    return validated
+
+def _check_filters(searcher, validated: list):
+    """Replaces items whose filters name values the index has never seen with the ValueError"""
+    for i, query in enumerate(validated):
+        if not isinstance(query, Exception):
+            try:
+                searcher.validate_filters(query.filters)
+            except ValueError as e:
+                validated[i] = e
+
+def _search_valid(searcher, validated: list, text, k, threshold=None, timings: dict = None) -> dict:
+    """Runs one batched search over the valid items; maps item position to its results"""
+    _check_filters(searcher, validated)
+    positions = [i for i, query in enumerate(validated) if not isinstance(query, Exception)]
+    if not positions:
+        return {}
+    queries = [validated[i] for i in positions]
+    results = searcher.search_batch(
+        [text(query) for query in queries],
+        k=[k(query) for query in queries],
+        filters=[query.filters for query in queries],
+        threshold=[threshold(query) for query in queries] if threshold else None,
+        timings=timings
+    )
+    return dict(zip(positions, results))
+
+@router.route("/search", methods=['POST'])
+def search():
+    data = request.get_json()
+    request_id = log_request("/search", data)
+
+    try:
+        query = validate_search_query(data or {})
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        start = time.perf_counter()
+        timings = {}
+        searcher = _get_searcher()
+        try:
+            searcher.validate_filters(query.filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        results = _search_valid(
+            searcher, [query], lambda q: q.query, lambda q: q.k, lambda q: q.threshold, timings
+        )[0]
+        g.timings.update(timings)
+        response_data = {
+            "results": results,
+            "total": len(results),
+            "query_time": time.perf_counter() - start,
+            "timings": timings,
+            "metadata": create_metadata({"request_id": request_id})
+        }
+        log_response(request_id, response_data)
+        return jsonify(response_data)
+
+    except Exception as e:
+        logger.error(f"Error processing search: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"error": str(e)}), 500
+
+
+@router.route("/search/batch", methods=['POST'])
+def search_batch():
+    """{"queries": [{"query": ..., "k": ..., "threshold": ..., "filters": ...}, ...]}; results keep input order"""
+    data = request.get_json()
+    request_id = log_request("/search/batch", data)
+
+    try:
+        items = validate_batch(data, 'queries', BATCH_MAX_ITEMS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        start = time.perf_counter()
+        validated = _validate_items(items, validate_search_query)
+        timings = {}
+        results = _search_valid(
+            _get_searcher(), validated, lambda q: q.query, lambda q: q.k, lambda q: q.threshold, timings
+        )
+        g.timings.update(timings)
+
+        response_items = []
+        for i, query in enumerate(validated):
+            if isinstance(query, Exception):
+                response_items.append({"index": i, "error": str(query)})
+            else:
+                response_items.append({"index": i, "results": results[i], "total": len(results[i])})
+
+        response_data = {
+            "results": response_items,
+            "total": len(response_items),
+            "query_time": time.perf_counter() - start,
+            "timings": timings,
+            "metadata": create_metadata({"request_id": request_id})
+        }
+        log_response(request_id, response_data)
+        return jsonify(response_data)
+
+    except Exception as e:
+        logger.error(f"Error processing search batch: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"error": str(e)}), 500
+
 
 @router.route("/ask", methods=['POST'])
 def ask_question():
     # Get data from request
     data = request.get_json()
-    query = QuestionQuery(**data)
     request_id = log_request("/ask", data)
+    try:
+        query = validate_query(data or {})
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
     
     try:
-
-        searcher = EnhancedSearcher.load()
-        search_results = searcher.search(query.question, k=query.context_limit)
+        searcher = _get_searcher()
+        try:
+            searcher.validate_filters(query.filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        timings = {}
+        search_results = searcher.search(
+            query.question, k=query.context_limit, filters=query.filters, timings=timings
+        )
+        g.timings.update(timings)
         context_chunks = [result['content'] for result in search_results]
+        chunk_ids = [result['chunk_id'] for result in search_results]
+        chunk_uids = [result['uid'] for result in search_results]
         
  
         answer = gemini_service.get_answer(
             question=query.question,
-            context_chunks=context_chunks
+            context_chunks=context_chunks,
+            chunk_ids=chunk_ids,
+            chunk_uids=chunk_uids,
+            question_embedding=searcher.cached_query_embedding(query.question),
+            scope=query.cache_scope(),
+            timings=g.timings
         )
         
         # Create response
@@ -35,6 +219,7 @@ def ask_question():
             "metadata": create_metadata({
                 "request_id": request_id,
                 "context_chunks": len(context_chunks),
+                "retrieval_timings": timings,
             })
         }
         
@@ -45,3 +230,147 @@ def ask_question():
         logger.error(f"Error processing question: {str(e)}", extra={"request_id": request_id})
         return jsonify({"error": str(e)}), 500
 
+
+@router.route("/ask/batch", methods=['POST'])
+def ask_batch():
+    """{"questions": [{"question": ..., "context_limit": ..., "filters": ...}, ...]}; answers keep input order"""
+    data = request.get_json()
+    request_id = log_request("/ask/batch", data)
+
+    try:
+        items = validate_batch(data, 'questions', BATCH_MAX_ITEMS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        validated = _validate_items(items, validate_query)
+        searcher = _get_searcher()
+        search_results = _search_valid(
+            searcher, validated, lambda q: q.question, lambda q: q.context_limit, timings=g.timings
+        )
+
+        futures = {
+            i: ask_batch_executor.submit(
+                gemini_service.get_answer,
+                question=validated[i].question,
+                context_chunks=[result['content'] for result in results],
+                chunk_ids=[result['chunk_id'] for result in results],
+                chunk_uids=[result['uid'] for result in results],
+                question_embedding=searcher.cached_query_embedding(validated[i].question),
+                scope=validated[i].cache_scope()
+            )
+            for i, results in search_results.items()
+        }
+
+        answers = []
+        for i, query in enumerate(validated):
+            if isinstance(query, Exception):
+                answers.append({"index": i, "error": str(query)})
+                continue
+            try:
+                answers.append({
+                    "index": i,
+                    "answer": futures[i].result(),
+                    "context_chunks": len(search_results[i])
+                })
+            except Exception as e:
+                logger.error(f"Error answering batch item {i}: {str(e)}", extra={"request_id": request_id})
+                answers.append({"index": i, "error": str(e)})
+
+        response_data = {
+            "answers": answers,
+            "metadata": create_metadata({
+                "request_id": request_id,
+                "questions": len(answers),
+                "failed": sum(1 for answer in answers if "error" in answer),
+            })
+        }
+        log_response(request_id, response_data)
+        return jsonify(response_data)
+
+    except Exception as e:
+        logger.error(f"Error processing question batch: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"error": str(e)}), 500
+
+
+@router.route("/cache/stats", methods=['GET'])
+def cache_stats():
+    """Hit rates of the answer caches (exact and semantic) and the query embedding cache"""
+    stats = gemini_service.cache_stats()
+    searcher = current_app.config['index_manager'].get_searcher()
+    if searcher is not None:
+        stats["query_cache"] = searcher.query_cache.stats()
+    return jsonify(stats)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.route("/ask/stream", methods=['POST'])
+def ask_question_stream():
+    """Server-sent events: a `context` event, `token` events with answer fragments, then `done`"""
+    data = request.get_json()
+    request_id = log_request("/ask/stream", data)
+    try:
+        query = validate_query(data or {})
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        searcher = _get_searcher()
+        searcher.validate_filters(query.filters)
+        search_results = searcher.search(
+            query.question, k=query.context_limit, filters=query.filters, timings=g.timings
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error processing question: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"error": str(e)}), 500
+
+    context_chunks = [result['content'] for result in search_results]
+    chunk_ids = [result['chunk_id'] for result in search_results]
+    chunk_uids = [result['uid'] for result in search_results]
+    question_embedding = searcher.cached_query_embedding(query.question)
+
+    def generate():
+        yield _sse_event("context", {
+            "request_id": request_id,
+            "context_chunks": len(context_chunks),
+            "chunks": [
+                {"chunk_id": result['chunk_id'], "score": result['score']}
+                for result in search_results
+            ]
+        })
+        answer_parts = []
+        try:
+            for fragment in gemini_service.stream_answer(
+                question=query.question,
+                context_chunks=context_chunks,
+                chunk_ids=chunk_ids,
+                chunk_uids=chunk_uids,
+                question_embedding=question_embedding,
+                scope=query.cache_scope()
+            ):
+                answer_parts.append(fragment)
+                yield _sse_event("token", {"text": fragment})
+
+            response_data = {
+                "answer": ''.join(answer_parts),
+                "metadata": create_metadata({
+                    "request_id": request_id,
+                    "context_chunks": len(context_chunks),
+                })
+            }
+            log_response(request_id, response_data)
+            yield _sse_event("done", {"metadata": response_data["metadata"]})
+
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}", extra={"request_id": request_id})
+            yield _sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
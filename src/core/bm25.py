@@ -0,0 +1,160 @@
+# src/core/bm25.py
+
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a about all also an and any are as at be been but by can could did do does for from had has have
+he her him his how i if in into is it its me my no not of on or our over say says she so than that
+the their them then there these they this those thou thee thy to upon us was we were what when
+where which who whom why will with would ye you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-process BM25 inverted index with array-backed (CSR) postings.
+
+    Postings for term t are doc_ids[indptr[t]:indptr[t + 1]] with the matching
+    precomputed BM25 term weights, so scoring a query is one vectorized
+    scatter-add per query term.
+    """
+
+    def __init__(self, terms: np.ndarray, indptr: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, doc_count: int, avg_length: Optional[float] = None):
+        self.terms = terms
+        self.vocabulary: Dict[str, int] = {str(term): i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.doc_count = doc_count
+        # Mean document length in tokens; None for indexes saved before it was recorded
+        self.avg_length = avg_length
+
+    def document_frequency(self, term: str) -> int:
+        t = self.vocabulary.get(term)
+        return int(self.indptr[t + 1] - self.indptr[t]) if t is not None else 0
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.5, b: float = 0.75,
+              background: 'BM25Index' = None) -> 'BM25Index':
+        """background is an index these texts are searched alongside: its documents
+        count towards term rarity and the mean length, so the weights of both stay comparable"""
+        doc_count = len(texts)
+        collection_size = doc_count + (background.doc_count if background is not None else 0)
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        total_length = float(doc_lengths.sum())
+        if background is not None and background.avg_length is not None:
+            total_length += background.avg_length * background.doc_count
+        avg_length = total_length / collection_size if total_length else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(postings[term]) for term in terms])
+        doc_ids = np.empty(indptr[-1], dtype=np.int32)
+        weights = np.empty(indptr[-1], dtype=np.float32)
+
+        for t, term in enumerate(terms):
+            ids, tfs = zip(*postings[term])
+            ids = np.array(ids, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            df = len(ids) + (background.document_frequency(term) if background is not None else 0)
+            idf = np.log(1.0 + (collection_size - df + 0.5) / (df + 0.5))
+            norm = k1 * (1.0 - b + b * doc_lengths[ids] / avg_length)
+            doc_ids[indptr[t]:indptr[t + 1]] = ids
+            weights[indptr[t]:indptr[t + 1]] = idf * tfs * (k1 + 1.0) / (tfs + norm)
+
+        return cls(np.array(terms, dtype=np.str_), indptr, doc_ids, weights, doc_count, avg_length)
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, doc ids); allowed is an optional boolean mask over documents"""
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocabulary.get(term)
+            if t is None:
+                continue
+            start, end = self.indptr[t], self.indptr[t + 1]
+            # Each document appears once per posting list, so fancy-index add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+
+        if allowed is not None:
+            scores[~allowed] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return scores[candidates], candidates
+
+    def save(self, path):
+        np.savez(
+            path,
+            terms=self.terms,
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            doc_count=np.array([self.doc_count], dtype=np.int64),
+            avg_length=np.array([self.avg_length or 0.0], dtype=np.float64)
+        )
+
+    @classmethod
+    def load(cls, path) -> 'BM25Index':
+        with np.load(Path(path), allow_pickle=False) as data:
+            return cls(
+                data['terms'],
+                data['indptr'],
+                data['doc_ids'],
+                data['weights'],
+                int(data['doc_count'][0]),
+                (float(data['avg_length'][0]) or None) if 'avg_length' in data else None
+            )
+
+
+class SegmentedBM25Index:
+    """A snapshot's BM25 index plus a delta segment over documents appended after it.
+
+    Delta documents take the ids after the snapshot's. Only the delta is
+    rebuilt as the change log grows; its weights count the snapshot's
+    documents too (see BM25Index.build), and compaction merges both.
+    """
+
+    def __init__(self, base: BM25Index, delta: BM25Index):
+        self.base = base
+        self.delta = delta
+        self.doc_count = base.doc_count + delta.doc_count
+
+    @classmethod
+    def build(cls, base: BM25Index, texts: List[str]) -> 'SegmentedBM25Index':
+        return cls(base, BM25Index.build(texts, background=base))
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        offset = self.base.doc_count
+        base_scores, base_ids = self.base.search(query, k, allowed[:offset] if allowed is not None else None)
+        delta_scores, delta_ids = self.delta.search(query, k, allowed[offset:] if allowed is not None else None)
+        scores = np.concatenate([base_scores, delta_scores])
+        ids = np.concatenate([base_ids, delta_ids + offset])
+        order = np.argsort(-scores, kind='stable')[:k]
+        return scores[order], ids[order]
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists; each id scores sum(1 / (rrf_k + rank))"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
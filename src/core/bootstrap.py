@@ -0,0 +1,223 @@
+# src/core/bootstrap.py
+
+import json
+import os
+import threading
+import time
+from glob import glob
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from src.core.index_manager import IndexManager, get_index_manager
+from src.core.snapshot import SnapshotStore
+from src.utils.file_lock import file_lock
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Return from startup at once and build/load the index on a background thread
+FAST_START = os.getenv('FAST_START', '0') == '1'
+# Set by gunicorn.conf.py: this process imports the app once and forks the workers that serve it
+PRELOAD_APP = os.getenv('PRELOAD_APP', '0') == '1'
+INDEX_PATH = Path('data/processed/faiss_index')
+# The building process mirrors its progress here so other workers can report it
+BUILD_STATUS_PATH = INDEX_PATH / '.build_status.json'
+BUILD_POLL_INTERVAL = 1.0
+
+
+class StartupStatus:
+    """How far this process is from serving, as reported by /health/ready.
+
+    state goes starting -> building (stage chunking, embedding, indexing) or
+    waiting (another process is building) -> loading -> warming -> ready, or
+    failed. done/total count texts sent to the embedding backend.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {'state': 'starting', 'stage': None, 'done': 0, 'total': 0, 'error': None}
+        self._started = time.monotonic()
+        self.publish = False
+
+    @property
+    def state(self) -> str:
+        return self._status['state']
+
+    def update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+            status = dict(self._status)
+        if self.publish:
+            _write_build_status(status)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            status = dict(self._status)
+        status['elapsed_seconds'] = round(time.monotonic() - self._started, 3)
+        if status['state'] == 'waiting':
+            status['build'] = _read_build_status()
+        return status
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self.publish = False
+
+
+startup_status = StartupStatus()
+_background: Optional[threading.Thread] = None
+# The preloading master left the build to its forked workers
+_deferred_to_workers = False
+_fork_hook_registered = False
+_warm_ups: Iterable[Callable[[], None]] = ()
+
+
+def _write_build_status(status: Dict):
+    tmp_path = BUILD_STATUS_PATH.with_name(f"{BUILD_STATUS_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, BUILD_STATUS_PATH)
+
+
+def _read_build_status() -> Optional[Dict]:
+    try:
+        with open(BUILD_STATUS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def setup_directories():
+
+    directories = [
+        "data/raw",
+        "data/processed/faiss_index",
+        "data/processed/chunks"
+    ]
+
+    for dir_path in directories:
+        Path(dir_path).mkdir(parents=True, exist_ok=True)
+        logger.info(f"Created directory: {dir_path}")
+
+def check_existing_files():
+
+    chunks_exist = (
+        len(glob("data/processed/chunks/gita_processed_*.jsonl")) > 0
+        or len(glob("data/processed/chunks/gita_processed_*.json")) > 0
+    )
+    # A published snapshot, or a legacy flat-layout one that is imported on first load
+    embeddings_exist = (
+        SnapshotStore().current_version() is not None
+        or len(glob("data/processed/faiss_index/docs_index_*.faiss")) > 0
+    )
+    return chunks_exist and embeddings_exist
+
+def build_index(status: StartupStatus = None):
+    """Chunk and embed the raw documentation into a new snapshot"""
+    from src.core.chunker import DocumentChunker
+    from src.core.embedder import DocumentEmbedder
+
+    status = status or StartupStatus()
+    logger.info("Processing documentation...")
+    status.update(state='building', stage='chunking')
+    chunks = DocumentChunker().process_documentation('./data/raw/gita.md')
+
+    status.update(stage='embedding', done=0, total=len(chunks))
+    embedder = DocumentEmbedder(progress=lambda done, total: status.update(done=done, total=total))
+    embeddings = embedder.generate_embeddings(chunks)
+
+    status.update(stage='indexing')
+    embedder.create_faiss_index(embeddings)
+    embedder.save_artifacts(chunks, embeddings)
+
+def _load(index_manager: IndexManager, warm_ups: Iterable[Callable[[], None]]):
+    startup_status.update(state='loading', stage=None)
+    if index_manager.get_searcher() is None:
+        raise RuntimeError("Failed to load search index")
+    startup_status.update(state='warming')
+    for warm_up in warm_ups:
+        warm_up()
+    startup_status.update(state='ready')
+
+def _prepare_in_background():
+    try:
+        # One process builds; the others wait for its snapshot to be published
+        while not check_existing_files():
+            with file_lock(INDEX_PATH / '.build.lock', blocking=False) as acquired:
+                if acquired:
+                    if not check_existing_files():
+                        startup_status.publish = True
+                        build_index(startup_status)
+                        startup_status.publish = False
+                    break
+            startup_status.update(state='waiting', stage=None)
+            time.sleep(BUILD_POLL_INTERVAL)
+        _load(get_index_manager(), _warm_ups)
+        logger.info("Search system initialized")
+    except Exception as e:
+        startup_status.update(state='failed', error=str(e))
+        logger.error(f"Error preparing search index: {str(e)}")
+
+def _start_background():
+    global _background
+    _background = threading.Thread(target=_prepare_in_background, name='index-bootstrap', daemon=True)
+    _background.start()
+
+def _after_fork():
+    # The bootstrap thread (and any lock it held) does not survive a fork
+    startup_status._after_fork()
+
+def _register_fork_hook():
+    global _fork_hook_registered
+    if not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_after_fork)
+        _fork_hook_registered = True
+
+def resume_after_fork():
+    """Pick up startup in a serving worker forked before it finished (gunicorn's post_fork).
+
+    Only called for workers that serve requests; other children (process pools,
+    subprocesses) never restart the bootstrap.
+    """
+    started = _deferred_to_workers or _background is not None
+    if started and startup_status.state not in ('ready', 'failed'):
+        _start_background()
+
+def prepare_index(background: bool = None, warm_ups: Iterable[Callable[[], None]] = ()) -> IndexManager:
+    """Build the artifacts if missing and load the resident index for this process.
+
+    warm_ups run after the index is loaded (e.g. creating the LLM client). With
+    background (default FAST_START) this returns at once and the work runs on a
+    daemon thread; startup_status reports progress until it is ready.
+
+    In a preloading gunicorn master (PRELOAD_APP) a published snapshot is still
+    loaded before the fork, since that only reads it, so the workers share one
+    copy-on-write; a missing index is left for the workers to build, so the
+    master never holds a copy that does not serve.
+    """
+    global _warm_ups, _deferred_to_workers
+    setup_directories()
+    index_manager = get_index_manager()
+
+    if background is None:
+        background = FAST_START
+    if background and PRELOAD_APP:
+        if not check_existing_files():
+            _warm_ups = tuple(warm_ups)
+            _deferred_to_workers = True
+            _register_fork_hook()
+            return index_manager
+        background = False
+    if background:
+        _warm_ups = tuple(warm_ups)
+        _register_fork_hook()
+        _start_background()
+        return index_manager
+
+    if not check_existing_files():
+        build_index(startup_status)
+    else:
+        logger.info("Using existing processed files...")
+
+    # Load the index once per process; requests share the resident searcher
+    _load(index_manager, warm_ups)
+    return index_manager
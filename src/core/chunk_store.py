@@ -0,0 +1,281 @@
+# src/core/chunk_store.py
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+MAGIC = b'GITACHK1'
+ALIGNMENT = 8
+
+# Columns with a fixed numeric layout; -1 marks "not present on this chunk"
+INT_COLUMNS = {'chapter_number': 'chapter', 'verse_number': 'verse'}
+# Low-cardinality string columns, stored once in a dictionary and referenced by code
+DICT_COLUMNS = ['type', 'section_type', 'speaker', 'headers']
+# Variable-length UTF-8 columns stored as an offsets table plus one blob
+BLOB_COLUMNS = ['id', 'content', 'extra']
+
+
+def _chunk_fields(chunk: Dict) -> Dict[str, Any]:
+    metadata = dict(chunk.get('metadata', {}))
+    fields = {
+        'id': chunk.get('id', ''),
+        'content': chunk.get('content', ''),
+        'type': chunk.get('type'),
+        'section_type': metadata.pop('section_type', None),
+        'speaker': metadata.pop('speaker', None),
+        'headers': json.dumps(metadata.pop('headers'), sort_keys=True, ensure_ascii=False)
+                   if 'headers' in metadata else None,
+    }
+    for key in INT_COLUMNS:
+        fields[key] = metadata.pop(key, None)
+
+    extra = {k: v for k, v in chunk.items() if k not in ('id', 'content', 'type', 'metadata')}
+    if metadata:
+        extra['metadata'] = metadata
+    fields['extra'] = json.dumps(extra, ensure_ascii=False) if extra else ''
+    return fields
+
+
+class ChunkStore:
+    """Read-only, memory-mapped columnar store for processed chunks.
+
+    File layout: magic, header length, JSON header (snapshot metadata, string
+    dictionaries, column offsets), then 8-byte aligned numpy columns. Chunk
+    text sits in one UTF-8 blob addressed by an offsets table, so opening the
+    store costs one small JSON parse and chunks are decoded only when read.
+    The OS page cache shares the mapped pages between worker processes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a chunk store: {self.path}")
+        header_len = struct.unpack_from('<Q', self._mmap, len(MAGIC))[0]
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_len].decode('utf-8'))
+
+        self.metadata: Dict[str, Any] = header['metadata']
+        self.dictionaries: Dict[str, List[str]] = header['dictionaries']
+        self._count = header['count']
+        self._columns = {
+            name: np.frombuffer(self._mmap, dtype=spec['dtype'], count=spec['count'], offset=spec['offset'])
+            for name, spec in header['columns'].items()
+        }
+        self._blob_starts: Dict[str, int] = header['blobs']
+        self._decoded_headers: Dict[int, Dict] = {}
+
+    @classmethod
+    def open(cls, path) -> 'ChunkStore':
+        return cls(path)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._count):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        i = int(i)
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("chunk index out of range")
+        return self._decode(i)
+
+    def column(self, name: str) -> np.ndarray:
+        """Raw column array (codes for dictionary columns, -1 where absent)"""
+        return self._columns[name]
+
+    def _text(self, name: str, i: int) -> str:
+        offsets = self._columns[f'{name}_offsets']
+        blob_start = self._blob_starts[name]
+        return self._mmap[blob_start + int(offsets[i]):blob_start + int(offsets[i + 1])].decode('utf-8')
+
+    def _code_value(self, name: str, i: int) -> Optional[str]:
+        code = int(self._columns[name][i])
+        return self.dictionaries[name][code] if code >= 0 else None
+
+    def get_content(self, i: int) -> str:
+        return self._text('content', i)
+
+    def get_id(self, i: int) -> str:
+        return self._text('id', i)
+
+    def get_uid(self, i: int) -> str:
+        """The chunk's uid (stored with its extra fields), else its id, without decoding the rest"""
+        extra = self._text('extra', i)
+        uid = json.loads(extra).get('uid') if extra else None
+        return uid or self._text('id', i)
+
+    def _decode(self, i: int) -> Dict:
+        metadata: Dict[str, Any] = {}
+        for key, column in INT_COLUMNS.items():
+            value = int(self._columns[column][i])
+            if value >= 0:
+                metadata[key] = value
+
+        speaker = self._code_value('speaker', i)
+        if speaker is not None:
+            metadata['speaker'] = speaker
+        section_type = self._code_value('section_type', i)
+        if section_type is not None:
+            metadata['section_type'] = section_type
+
+        header_code = int(self._columns['headers'][i])
+        if header_code >= 0:
+            if header_code not in self._decoded_headers:
+                self._decoded_headers[header_code] = json.loads(self.dictionaries['headers'][header_code])
+            metadata['headers'] = dict(self._decoded_headers[header_code])
+
+        chunk = {
+            'id': self._text('id', i),
+            'type': self._code_value('type', i),
+            'content': self._text('content', i),
+            'metadata': metadata,
+        }
+
+        extra = self._text('extra', i)
+        if extra:
+            extra = json.loads(extra)
+            metadata.update(extra.pop('metadata', {}))
+            chunk.update(extra)
+        return chunk
+
+    @staticmethod
+    def write(path, chunks: List[Dict], metadata: Dict[str, Any] = None):
+        """Serialize chunks to path atomically (temporary file + rename)"""
+        path = Path(path)
+        rows = [_chunk_fields(chunk) for chunk in chunks]
+        count = len(rows)
+
+        dictionaries: Dict[str, List[str]] = {}
+        arrays: Dict[str, np.ndarray] = {}
+
+        for name in DICT_COLUMNS:
+            values: Dict[str, int] = {}
+            codes = np.full(count, -1, dtype=np.int32)
+            for i, row in enumerate(rows):
+                value = row[name]
+                if value is not None:
+                    codes[i] = values.setdefault(value, len(values))
+            dictionaries[name] = list(values)
+            arrays[name] = codes
+
+        for key, column in INT_COLUMNS.items():
+            arrays[column] = np.array(
+                [row[key] if row[key] is not None else -1 for row in rows], dtype=np.int32
+            )
+
+        blobs: Dict[str, bytes] = {}
+        for name in BLOB_COLUMNS:
+            encoded = [row[name].encode('utf-8') for row in rows]
+            offsets = np.zeros(count + 1, dtype=np.uint64)
+            if encoded:
+                offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+            arrays[f'{name}_offsets'] = offsets
+            blobs[name] = b''.join(encoded)
+
+        # The column table depends on the header length, so lay out the data
+        # relative to zero first and shift once the header size is known.
+        layout = []
+        position = 0
+        for name, array in arrays.items():
+            layout.append((name, array, position))
+            position += array.nbytes
+            position += -position % ALIGNMENT
+        blob_positions = {}
+        for name, blob in blobs.items():
+            blob_positions[name] = position
+            position += len(blob)
+
+        def build_header(data_start: int) -> bytes:
+            return json.dumps({
+                'count': count,
+                'metadata': metadata or {},
+                'dictionaries': dictionaries,
+                'columns': {
+                    name: {'dtype': array.dtype.str, 'count': len(array), 'offset': data_start + relative}
+                    for name, array, relative in layout
+                },
+                'blobs': {name: data_start + relative for name, relative in blob_positions.items()}
+            }, ensure_ascii=False).encode('utf-8')
+
+        # Offsets are absolute, so iterate until the header length stops changing
+        header = build_header(0)
+        while True:
+            data_start = len(MAGIC) + 8 + len(header)
+            data_start += -data_start % ALIGNMENT
+            new_header = build_header(data_start)
+            if len(new_header) == len(header):
+                header = new_header
+                break
+            header = new_header
+
+        tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(b'\0' * (data_start - f.tell()))
+            for name, array, relative in layout:
+                f.write(b'\0' * (data_start + relative - f.tell()))
+                f.write(array.tobytes())
+            for name, relative in blob_positions.items():
+                f.write(b'\0' * (data_start + relative - f.tell()))
+                f.write(blobs[name])
+        os.replace(tmp_path, path)
+
+
+class ChunkOverlay:
+    """A snapshot's chunks plus those appended after it by the change log.
+
+    Positions below len(base) address the snapshot, the rest the appended
+    list. append() returns a new overlay that shares the base and copies only
+    the appended list, so the snapshot is never decoded to extend it.
+    """
+
+    def __init__(self, base, appended: List[Dict] = None):
+        self.base = base
+        self.base_count = len(base)
+        self.appended = appended or []
+
+    def __len__(self) -> int:
+        return self.base_count + len(self.appended)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        return self.base[i] if i < self.base_count else self.appended[i - self.base_count]
+
+    def append(self, chunks: List[Dict]) -> 'ChunkOverlay':
+        return ChunkOverlay(self.base, self.appended + list(chunks))
+
+    def get_content(self, i: int) -> str:
+        if i < self.base_count and hasattr(self.base, 'get_content'):
+            return self.base.get_content(i)
+        return self[i]['content']
+
+    def get_id(self, i: int) -> str:
+        if i < self.base_count and hasattr(self.base, 'get_id'):
+            return self.base.get_id(i)
+        return self[i].get('id', '')
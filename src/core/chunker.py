@@ -1,14 +1,32 @@
 # src/core/gita_chunker.py
-from langchain.text_splitter import MarkdownHeaderTextSplitter
 from pathlib import Path
+import hashlib
 import json
 import os
-from typing import List, Dict
-from datetime import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import datetime, timezone
 import re
+from src.utils.helpers import roman_to_int
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SOURCE_PATTERNS = ('*.md', '*.markdown')
+# _iter_sections joins the paragraphs of a section with this, and lines within one with "\n"
+PARAGRAPH_SEPARATOR = re.compile(r'  \n|\n\s*\n')
+# A passage that opens with its own verse number: "47. ..." or "2.47 ..."
+VERSE_NUMBER = re.compile(r'^(?:\d{1,2}[.:])?(\d{1,3})[.)]?\s+(?=\D)')
+SPEAKERS = ("Dhritirashtra", "Sanjaya", "Arjuna", "Krishna")
+# gita.md opens each speech with the speaker's name on its own line ("Krishna."),
+# occasionally inline ("Dhritirashtra: Ranged thus...")
+SPEAKER_LINE = re.compile(rf'^({"|".join(SPEAKERS)})[.:](?=\s|$)\s*')
+# "HERE ENDETH CHAPTER II. ..." (or "HERE ENDS") closes a chapter's dialogue
+COLOPHON = re.compile(r'^HERE END(?:ETH|S)\b', re.IGNORECASE)
 
 class DocumentChunker:
-    def __init__(self):
+    def __init__(self, max_workers: int = None):
         
         self.headers_to_split_on = [
             ("### **CHAPTER", "chapter"),   
@@ -17,13 +35,10 @@ class DocumentChunker:
             ("## ", "subsection"),         
             ("# ", "title"),               
         ]
-        
-        self.header_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=self.headers_to_split_on,
-            return_each_line=False
-        )
-        
-        self.speakers = ["Dhritirashtra:", "Sanjaya:", "Arjuna:", "Krishna:"]
+        # Longest prefix first, so "### **CHAPTER" wins over "### "
+        self._header_prefixes = sorted(self.headers_to_split_on, key=lambda header: len(header[0]), reverse=True)
+        # Independent source files are chunked in parallel processes
+        self.max_workers = max_workers or int(os.getenv('CHUNK_WORKERS', str(os.cpu_count() or 1)))
         
         
         self.metadata = {
@@ -34,12 +49,11 @@ class DocumentChunker:
             "translator": "Sir Edwin Arnold"
         }
 
-    def _extract_speaker(self, text: str) -> str:
-        
-        for speaker in self.speakers:
-            if speaker in text:
-                return speaker.rstrip(':')
-        return "Unknown"
+    @staticmethod
+    def _extract_speaker(text: str) -> Optional[str]:
+        """Speaker named at the start of a passage, or None when it continues the previous speech"""
+        match = SPEAKER_LINE.match(text.lstrip())
+        return match.group(1) if match else None
 
     def _clean_text(self, text: str) -> str:
         
@@ -51,143 +65,282 @@ class DocumentChunker:
     def _get_chapter_number(self, text: str) -> int:
         
         match = re.search(r'CHAPTER\s+([IVX]+)', text, re.IGNORECASE)
+        if not match:
+            # The header splitter strips the "### **CHAPTER" prefix, leaving e.g. "II**"
+            match = re.fullmatch(r'[\s*]*([IVX]+)[\s*.]*', text)
         if match:
-            roman_numeral = match.group(1)
-            roman_values = {'I': 1, 'V': 5, 'X': 10}
-            integer_value = 0
-            for i in range(len(roman_numeral)):
-                if i > 0 and roman_values[roman_numeral[i]] > roman_values[roman_numeral[i-1]]:
-                    integer_value += roman_values[roman_numeral[i]] - 2 * roman_values[roman_numeral[i-1]]
-                else:
-                    integer_value += roman_values[roman_numeral[i]]
-            return integer_value
+            return roman_to_int(match.group(1))
         return 0
 
-    def _preprocess_content(self, content: str) -> str:
-        
-        content = re.sub(r'(\n#+[^#\n]+)', r'\n\1', content)
-        
-        content = re.sub(r'\n{3,}', '\n\n', content)
-        return content
+    def _match_header(self, line: str) -> Optional[Tuple[str, str]]:
+        for prefix, name in self._header_prefixes:
+            if line.startswith(prefix) and (len(line) == len(prefix) or line[len(prefix)] == " "):
+                return prefix, name
+        return None
 
-    def process_documentation(self, input_path: str) -> List[Dict[str, str]]:
-        
-        try:
-            
-            with open(input_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                
-            
-            content = self._preprocess_content(content)
-            
-            
-            splits = self.header_splitter.split_text(content)
+    def _iter_paragraphs(self, lines: Iterable[str]) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """(paragraph, headers in effect) for each blank-line separated block, header lines removed"""
+        header_stack: List[Tuple[int, str]] = []
+        headers: Dict[str, str] = {}
+        current_headers: Dict[str, str] = {}
+        paragraph: List[str] = []
+        in_code_block = False
+        fence = ""
+
+        for line in lines:
+            stripped = "".join(filter(str.isprintable, line.strip()))
+            if not in_code_block:
+                if stripped.startswith("```") and stripped.count("```") == 1:
+                    in_code_block, fence = True, "```"
+                elif stripped.startswith("~~~"):
+                    in_code_block, fence = True, "~~~"
+            elif stripped.startswith(fence):
+                in_code_block, fence = False, ""
+
+            if in_code_block:
+                paragraph.append(stripped)
+                continue
+
+            header = self._match_header(stripped)
+            if header:
+                prefix, name = header
+                level = prefix.count("#")
+                # A header closes every open header at the same or a deeper level
+                while header_stack and header_stack[-1][0] >= level:
+                    headers.pop(header_stack.pop()[1], None)
+                header_stack.append((level, name))
+                headers[name] = stripped[len(prefix):].strip()
+                if paragraph:
+                    yield "\n".join(paragraph), current_headers
+                    paragraph = []
+            elif stripped:
+                paragraph.append(stripped)
+            elif paragraph:
+                yield "\n".join(paragraph), current_headers
+                paragraph = []
+
+            current_headers = dict(headers)
+
+        if paragraph:
+            yield "\n".join(paragraph), current_headers
+
+    def _iter_sections(self, lines: Iterable[str]) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """Consecutive paragraphs under the same headers, joined into one section.
+
+        Line-by-line equivalent of MarkdownHeaderTextSplitter(return_each_line=False),
+        so only one section is held in memory at a time.
+        """
+        section: Optional[str] = None
+        section_headers: Dict[str, str] = {}
+        for paragraph, headers in self._iter_paragraphs(lines):
+            if section is not None and headers == section_headers:
+                section += "  \n" + paragraph
+                continue
+            if section is not None:
+                yield section, section_headers
+            section, section_headers = paragraph, headers
+        if section is not None:
+            yield section, section_headers
+
+    @staticmethod
+    def _uid(source: str, chunk_type: str, chapter: Optional[int], content: str, seen: Dict[str, int]) -> str:
+        """Content-derived ID: unchanged text keeps its ID across runs, whatever moves around it"""
+        digest = hashlib.blake2b(
+            f"{source}\0{chunk_type}\0{chapter}\0{content}".encode('utf-8'), digest_size=8
+        ).hexdigest()
+        # Identical text repeated within one source gets a stable occurrence suffix
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        return digest if occurrence == 0 else f"{digest}-{occurrence}"
+
+    def _chunks_from_sections(self, sections: Iterable[Tuple[str, Dict[str, str]]], source: str) -> Iterator[Dict]:
+        current_chapter = 0
+        chunk_count = 0
+        seen: Dict[str, int] = {}
+
+        for text_content, headers in sections:
+            if not text_content.strip():
+                continue
             
-            processed_chunks = []
-            current_chapter = 0
-            verse_counter = 0
             
-            print(f"Initial number of splits: {len(splits)}")  
+            if 'chapter' in headers:
+                current_chapter = self._get_chapter_number(headers['chapter'])
+                chunk_type = "chapter"
+            elif 'preface' in headers:
+                chunk_type = "preface"
+            elif 'section' in headers:
+                chunk_type = "section"
+            elif 'title' in headers:
+                chunk_type = "title"
+            else:
+                chunk_type = "content"
+
             
-            for split in splits:
-                text_content = split.page_content
-                headers = split.metadata
+            if chunk_type == "chapter":
                 
-                print(f"Processing headers: {headers}")  
-                
-                
-                if not text_content.strip():
-                    continue
+                header_content = headers.get('chapter', '')
+                yield {
+                    "id": f"ch{current_chapter}_header",
+                    "uid": self._uid(source, "chapter_header", current_chapter, header_content, seen),
+                    "type": "chapter_header",
+                    "content": header_content,
+                    "metadata": {
+                        "chapter_number": current_chapter,
+                        "section_type": "chapter_header",
+                        "headers": dict(headers),
+                        "source": source
+                    }
+                }
+                chunk_count += 1
                 
                 
-                if 'chapter' in headers:
-                    current_chapter = self._get_chapter_number(headers['chapter'])
-                    chunk_type = "chapter"
-                elif 'preface' in headers:
-                    chunk_type = "preface"
-                elif 'section' in headers:
-                    chunk_type = "section"
-                elif 'title' in headers:
-                    chunk_type = "title"
-                else:
-                    chunk_type = "content"
-
+                # One chunk per paragraph (a speech, or a stanza of one). Only a paragraph
+                # that carries its own verse number becomes ch{n}_v{m}; the rest are
+                # numbered passages, ch{n}_p{m}, so they are never taken for verse m.
+                passages = PARAGRAPH_SEPARATOR.split(text_content)
+                passage_counter = 0
+                # A passage without a speaker line continues the current speech
+                speaker = None
                 
-                if chunk_type == "chapter":
-                    
-                    header_chunk = {
-                        "id": f"ch{current_chapter}_header",
-                        "type": "chapter_header",
-                        "content": headers.get('chapter', ''),
-                        "metadata": {
-                            "chapter_number": current_chapter,
-                            "section_type": "chapter_header",
-                            "headers": dict(headers)
-                        }
+                for passage in passages:
+                    if not passage.strip():
+                        continue
+                        
+                    passage_counter += 1
+                    content = self._clean_text(passage)
+                    if COLOPHON.match(content):
+                        speaker = None
+                    speaker = self._extract_speaker(passage) or speaker
+                    metadata = {
+                        "chapter_number": current_chapter,
+                        "speaker": speaker or "Unknown",
+                        "section_type": "verse",
+                        "headers": dict(headers),
+                        "source": source
                     }
-                    processed_chunks.append(header_chunk)
-                    
+                    verse_number = VERSE_NUMBER.match(SPEAKER_LINE.sub('', content, count=1))
+                    if verse_number:
+                        metadata["verse_number"] = int(verse_number.group(1))
+                        chunk_id = f"ch{current_chapter}_v{metadata['verse_number']}"
+                    else:
+                        metadata["passage_number"] = passage_counter
+                        chunk_id = f"ch{current_chapter}_p{passage_counter}"
                     
-                    verses = re.split(r'\n\s*\n', text_content)
-                    verse_counter = 0
-                    
-                    for verse in verses:
-                        if not verse.strip():
-                            continue
-                            
-                        verse_counter += 1
-                        speaker = self._extract_speaker(verse)
-                        
-                        verse_chunk = {
-                            "id": f"ch{current_chapter}_v{verse_counter}",
-                            "type": "verse",
-                            "content": self._clean_text(verse),
-                            "metadata": {
-                                "chapter_number": current_chapter,
-                                "verse_number": verse_counter,
-                                "speaker": speaker,
-                                "section_type": "verse",
-                                "headers": dict(headers)
-                            }
-                        }
-                        processed_chunks.append(verse_chunk)
+                    yield {
+                        "id": chunk_id,
+                        "uid": self._uid(source, "verse", current_chapter, content, seen),
+                        "type": "verse",
+                        "content": content,
+                        "metadata": metadata
+                    }
+                    chunk_count += 1
+            
+            else:
                 
-                else:
-                    
-                    chunk = {
-                        "id": f"{chunk_type}_{len(processed_chunks)}",
-                        "type": chunk_type,
-                        "content": self._clean_text(text_content),
-                        "metadata": {
-                            "section_type": chunk_type,
-                            "headers": dict(headers)
-                        }
+                content = self._clean_text(text_content)
+                yield {
+                    "id": f"{chunk_type}_{chunk_count}",
+                    "uid": self._uid(source, chunk_type, None, content, seen),
+                    "type": chunk_type,
+                    "content": content,
+                    "metadata": {
+                        "section_type": chunk_type,
+                        "headers": dict(headers),
+                        "source": source
                     }
+                }
+                chunk_count += 1
+
+    def iter_file_chunks(self, input_path: Union[str, Path], source: str = None) -> Iterator[Dict]:
+        """Chunks of one markdown file, read line by line"""
+        source = source or Path(input_path).name
+        with open(input_path, 'r', encoding='utf-8') as file:
+            yield from self._chunks_from_sections(self._iter_sections(file), source)
+
+    @staticmethod
+    def _source_files(input_path: Union[str, Path]) -> List[Tuple[Path, str]]:
+        """(path, source name) for a single file, or every markdown file under a directory"""
+        input_path = Path(input_path)
+        if input_path.is_file():
+            return [(input_path, input_path.name)]
+        paths = sorted({path for pattern in SOURCE_PATTERNS for path in input_path.rglob(pattern)})
+        return [(path, path.relative_to(input_path).as_posix()) for path in paths]
+
+    def iter_chunks(self, input_path: Union[str, Path]) -> Iterator[Dict]:
+        """Lazily yield chunks from a file or a directory of markdown files, in path order.
+
+        With several files and max_workers > 1, files are chunked in a process pool;
+        each worker spills its chunks to a temporary JSONL part that is streamed back,
+        so memory stays flat regardless of corpus size.
+        """
+        sources = self._source_files(input_path)
+        if len(sources) <= 1 or self.max_workers <= 1:
+            for path, source in sources:
+                yield from self.iter_file_chunks(path, source)
+            return
+
+        with tempfile.TemporaryDirectory(prefix='chunks_') as parts_dir, \
+                ProcessPoolExecutor(max_workers=min(self.max_workers, len(sources))) as pool:
+            futures = [
+                pool.submit(_chunk_file_to_jsonl, str(path), source, os.path.join(parts_dir, f'{i}.jsonl'))
+                for i, (path, source) in enumerate(sources)
+            ]
+            for future in futures:
+                part_path = future.result()
+                yield from read_chunks_jsonl(part_path)
+                os.remove(part_path)
+
+    @staticmethod
+    def write_jsonl(chunks: Iterable[Dict], output_path: Union[str, Path], metadata: Optional[Dict] = None) -> int:
+        """Write chunks one JSON object per line as they arrive (optional metadata line first); returns the count"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if metadata is not None:
+                f.write(json.dumps({"metadata": metadata}, ensure_ascii=False) + "\n")
+            for chunk in chunks:
+                f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, output_path)
+        return count
+
+    def process_documentation(self, input_path: str) -> List[Dict[str, str]]:
+        """Chunk a file or directory, save the chunks as JSON Lines and return them.
+
+        For corpora too large to hold as a list, use iter_chunks with write_jsonl.
+        """
+        try:
+            timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+            output_path = Path('data/processed/chunks') / f'gita_processed_{timestamp}.jsonl'
+            processed_chunks = []
+
+            def collect(chunks: Iterable[Dict]) -> Iterator[Dict]:
+                for chunk in chunks:
                     processed_chunks.append(chunk)
+                    yield chunk
 
-            print(f"Total chunks processed: {len(processed_chunks)}")  # Debug info
-            
-            
-            self._save_chunks(processed_chunks)
+            count = self.write_jsonl(collect(self.iter_chunks(input_path)), output_path, self.metadata)
+            logger.info(f"Total chunks processed: {count}")
             return processed_chunks
 
         except Exception as e:
-            print(f"Error processing documentation: {str(e)}")
+            logger.error(f"Error processing documentation: {str(e)}")
             raise
 
-    def _save_chunks(self, chunks: List[Dict[str, str]]) -> None:
-        
-        output_dir = Path('data/processed/chunks')
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        
-        complete_output = {
-            "metadata": self.metadata,
-            "chunks": chunks
-        }
-        
-        complete_path = output_dir / f'gita_processed_{timestamp}.json'
-        with open(complete_path, 'w', encoding='utf-8') as f:
-            json.dump(complete_output, f, indent=2, ensure_ascii=False)
 
+def read_chunks_jsonl(path: Union[str, Path]) -> Iterator[Dict]:
+    """Stream chunks back from a JSON Lines file, skipping the metadata line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'content' in record:
+                yield record
+
+
+def _chunk_file_to_jsonl(input_path: str, source: str, output_path: str) -> str:
+    """Process pool worker: chunk one file into a JSONL part"""
+    chunker = DocumentChunker(max_workers=1)
+    chunker.write_jsonl(chunker.iter_file_chunks(input_path, source), output_path)
+    return output_path
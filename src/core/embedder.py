@@ -1,102 +1,110 @@
 # src/core/embedder.py
 
-import google.generativeai as genai
 import numpy as np
-from typing import List, Dict
-from pathlib import Path
-from datetime import datetime
+from functools import partial
+from typing import Callable, List, Dict
+from datetime import datetime, timezone
 import faiss
-import pickle
-import os
-from google.generativeai import types
+from src.core.embedding_backend import (
+    BatchEmbedder,
+    EmbeddingBackend,
+    DEFAULT_EMBEDDING_MODEL,
+    get_embedding_backend,
+)
+from src.core.embedding_cache import get_embedding_cache
+from src.core.chunk_store import ChunkStore
+from src.core.bm25 import BM25Index
+from src.core.snapshot import BM25_FILE, CHUNKS_FILE, INDEX_FILE, VECTORS_FILE, SnapshotStore, new_version
+from src.core.vector_index import METRIC_COSINE, FullPrecisionVectors, build_index, describe_index, is_lossy
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
-CURRENT_TIME = "2025-01-14 13:28:48"
 CURRENT_USER = "ravi-hisoka"
 
 class DocumentEmbedder:
-    def __init__(self, model_name: str = "models/text-embedding-004"):
-        print(f"\nInitializing DocumentEmbedder...")
-        print(f"├── Model: {model_name}")
-        print(f"├── User: {CURRENT_USER}")
-        print(f"└── Time: {CURRENT_TIME}")
-        
-        self.model_name = model_name
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: EmbeddingBackend = None,
+                 progress: Callable[[int, int], None] = None):
+        logger.info(f"Initializing DocumentEmbedder: model {model_name}, user {CURRENT_USER}")
         
-        # Initialize Gemini
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is not set")
+        self.backend = backend or get_embedding_backend(model_name)
+        self.model_name = self.backend.model_name
+        self.batch_embedder = BatchEmbedder(self.backend)
+        # Called as progress(done, total) while texts are sent to the embedding backend
+        self.progress = progress
         
-        genai.configure(api_key=api_key)
-        # self.model = genai.GenerativeModel(model_name=model_name) # No longer needed
-        
-        # Gemini embeddings are 768-dimensional
-        self.embedding_dim = 768
+        self.embedding_dim = self.backend.embedding_dim
+        self.index_info = {}
+        self.embedding_cache = get_embedding_cache(self.model_name, self.embedding_dim)
         self.index = None
 
     def generate_embeddings(self, chunks: List[Dict[str, str]]) -> np.ndarray:
         texts = [chunk['content'] for chunk in chunks]
-        print(f"\nGenerating embeddings:")
-        print(f"├── Total chunks: {len(texts)}")
-        print(f"└── Model: {self.model_name}")
-        
-        embeddings = []
-        for text in texts:
-            result = genai.embed_content(
-                model=self.model_name,
-                content=text,
-                task_type="SEMANTIC_SIMILARITY"
-            )
-            embeddings.append(result['embedding'])
+        logger.info(f"Generating embeddings for {len(texts)} chunks with {self.model_name} "
+                    f"(batch size {self.batch_embedder.batch_size}, concurrency {self.batch_embedder.max_workers})")
         
-        embeddings_array = np.array(embeddings)
-        print(f"\nEmbeddings generated:")
-        print(f"└── Shape: {embeddings_array.shape}")
+        # Only new or changed chunks reach the embedding backend
+        embed = partial(self.batch_embedder.embed, progress=self.progress)
+        if self.embedding_cache:
+            embeddings_array = self.embedding_cache.get_or_embed(texts, embed)
+        else:
+            embeddings_array = embed(texts)
+        logger.info(f"Embeddings generated: shape {embeddings_array.shape}")
         return embeddings_array
 
     def create_faiss_index(self, embeddings: np.ndarray):
-        print(f"\nCreating FAISS index:")
-        print(f"├── Vectors: {len(embeddings)}")
-        print(f"└── Dimensions: {self.embedding_dim}")
+        logger.info(f"Creating FAISS index: {len(embeddings)} vectors, {self.embedding_dim} dimensions")
         
-        self.index = faiss.IndexFlatL2(self.embedding_dim)
-        self.index.add(embeddings.astype('float32'))
+        # Inner product over normalized vectors, so scores are true cosine similarities
+        self.index = build_index(embeddings, self.embedding_dim)
+        self.index_info = describe_index(self.index, embeddings)
         
-        print(f"Index created successfully with {self.index.ntotal} vectors")
+        logger.info(f"Index created successfully with {self.index.ntotal} vectors")
 
     def save_artifacts(self, chunks: List[Dict], embeddings: np.ndarray):
-        timestamp = datetime.strptime(CURRENT_TIME, "%Y-%m-%d %H:%M:%S").strftime('%Y%m%d_%H%M%S')
-        artifacts_dir = Path('data/processed/faiss_index')
-        artifacts_dir.mkdir(parents=True, exist_ok=True)
+        # Every build is a new immutable version; workers switch once CURRENT points at it
+        store = SnapshotStore()
+        version = new_version()
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        artifacts_dir = store.stage(version)
 
-        index_path = artifacts_dir / f'docs_index_{timestamp}.faiss'
+        index_path = artifacts_dir / INDEX_FILE
         faiss.write_index(self.index, str(index_path))
+        # Lossy indexes keep the exact vectors on disk (memory-mapped at load) for re-scoring
+        if is_lossy(self.index):
+            FullPrecisionVectors.write(artifacts_dir / VECTORS_FILE, embeddings)
 
-        chunk_data_path = artifacts_dir / f'chunk_data_{timestamp}.pkl'
+        chunk_data_path = artifacts_dir / CHUNKS_FILE
         metadata = {
-            'chunks': chunks,
-            'created_at': CURRENT_TIME,
+            'created_at': created_at,
             'created_by': CURRENT_USER,
             'embedding_model': self.model_name,
             'embedding_dimension': self.embedding_dim,
+            'metric': METRIC_COSINE,
+            **self.index_info,
             'total_chunks': len(chunks),
             'total_vectors': self.index.ntotal
         }
         
-        with open(chunk_data_path, 'wb') as f:
-            pickle.dump(metadata, f)
+        ChunkStore.write(chunk_data_path, chunks, metadata)
 
-        print(f"\nArtifacts saved successfully:")
-        print(f"├── Index: {index_path}")
-        print(f"└── Chunks: {chunk_data_path}")
-        
-        print(f"\nMetadata summary:")
-        print(f"├── Total chunks: {len(chunks)}")
-        print(f"├── Model: {self.model_name}")
-        print(f"├── Dimension: {self.embedding_dim}")
-        print(f"├── Vectors: {self.index.ntotal}")
-        print(f"├── Created by: {metadata['created_by']}")
-        print(f"└── Created at: {metadata['created_at']}")
+        # Lexical index for hybrid search, built from the same chunks
+        bm25_path = artifacts_dir / BM25_FILE
+        BM25Index.build([chunk['content'] for chunk in chunks]).save(bm25_path)
+
+        store.commit(version, artifacts_dir, {
+            'created_at': created_at,
+            'embedding_model': self.model_name,
+            'embedding_dim': self.embedding_dim,
+            'metric': METRIC_COSINE,
+            'vector_count': int(self.index.ntotal),
+            **self.index_info
+        })
+        store.activate(version)
+
+        logger.info(f"Artifacts saved to {store.snapshot_dir(version)}: "
+                    f"{len(chunks)} chunks, {self.index.ntotal} vectors of dimension {self.embedding_dim}, "
+                    f"model {self.model_name}, created by {metadata['created_by']} at {metadata['created_at']}")
 
     def process_chunks(self, chunks: List[Dict[str, str]]):
         try:
@@ -105,6 +113,6 @@ class DocumentEmbedder:
             self.save_artifacts(chunks, embeddings)
             return True
         except Exception as e:
-            print(f"\n❌ Error processing chunks: {str(e)}")
+            logger.error(f"Error processing chunks: {str(e)}")
             raise
 
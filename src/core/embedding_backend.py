@@ -0,0 +1,240 @@
+# src/core/embedding_backend.py
+
+import asyncio
+import functools
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
+DEFAULT_TASK_TYPE = "SEMANTIC_SIMILARITY"
+
+_genai_lock = threading.Lock()
+_genai_configured_key: Optional[str] = None
+
+
+def configure_genai(api_key: str):
+    """Configure google.generativeai once per process"""
+    global _genai_configured_key
+    with _genai_lock:
+        if _genai_configured_key != api_key:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _genai_configured_key = api_key
+
+
+class EmbeddingBackend:
+    """Turns a batch of texts into a float32 matrix of shape (len(texts), embedding_dim)"""
+
+    model_name: str = ""
+    embedding_dim: int = 768
+
+    def embed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> np.ndarray:
+        raise NotImplementedError
+
+    async def aembed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> np.ndarray:
+        """Async variant; backends without a native async client run in a thread"""
+        return await asyncio.to_thread(self.embed_batch, texts, task_type)
+
+
+class GeminiEmbeddingBackend(EmbeddingBackend):
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is not set")
+
+        # google.generativeai takes about a second to import, so it is loaded on first use
+        self.api_key = api_key
+        self.model_name = model_name
+        # Gemini embeddings are 768-dimensional
+        self.embedding_dim = 768
+
+    def _genai(self):
+        import google.generativeai as genai
+
+        configure_genai(self.api_key)
+        return genai
+
+    def embed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> np.ndarray:
+        # A list of contents is sent as one batchEmbedContents request
+        result = self._genai().embed_content(
+            model=self.model_name,
+            content=texts,
+            task_type=task_type
+        )
+        return np.asarray(result['embedding'], dtype=np.float32).reshape(len(texts), -1)
+
+    async def aembed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> np.ndarray:
+        result = await self._genai().embed_content_async(
+            model=self.model_name,
+            content=texts,
+            task_type=task_type
+        )
+        return np.asarray(result['embedding'], dtype=np.float32).reshape(len(texts), -1)
+
+
+class FakeEmbeddingBackend(EmbeddingBackend):
+    """Deterministic local embedder for tests and benchmarks.
+
+    Uses signed feature hashing over lowercase word tokens, so texts that share
+    words get similar vectors and identical texts always get identical ones.
+    """
+
+    def __init__(self, model_name: str = "fake-embedding", embedding_dim: int = 768, latency: float = 0.0):
+        self.model_name = model_name
+        self.embedding_dim = embedding_dim
+        self.latency = latency
+        self.calls = 0
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for token in re.findall(r'\w+', text.lower()):
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            vector[value % self.embedding_dim] += 1.0 if value & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> np.ndarray:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not texts:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack([self._embed_one(text) for text in texts])
+
+    async def aembed_batch(self, texts: List[str], task_type: str = DEFAULT_TASK_TYPE) -> np.ndarray:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not texts:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack([self._embed_one(text) for text in texts])
+
+
+def get_embedding_backend(model_name: str = DEFAULT_EMBEDDING_MODEL) -> EmbeddingBackend:
+    """Pick the backend from EMBEDDING_BACKEND (gemini | fake)"""
+    backend = os.getenv('EMBEDDING_BACKEND', 'gemini').lower()
+    if backend == 'fake':
+        return FakeEmbeddingBackend(latency=float(os.getenv('FAKE_EMBEDDING_LATENCY', '0')))
+    if backend == 'gemini':
+        return GeminiEmbeddingBackend(model_name)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+@functools.lru_cache(maxsize=None)
+def _retryable_errors() -> tuple:
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        return ()
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+    )
+
+
+def _is_retryable(error: Exception) -> bool:
+    retryable_errors = _retryable_errors()
+    if retryable_errors and isinstance(error, retryable_errors):
+        return True
+    message = str(error)
+    return '429' in message or 'quota' in message.lower() or 'rate limit' in message.lower()
+
+
+class BatchEmbedder:
+    """Splits texts into batches and embeds several batches concurrently,
+    retrying rate-limited batches with exponential backoff and jitter."""
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        batch_size: int = None,
+        max_workers: int = None,
+        max_retries: int = None,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        task_type: str = DEFAULT_TASK_TYPE
+    ):
+        self.backend = backend
+        # batchEmbedContents accepts at most 100 contents per request
+        self.batch_size = batch_size or int(os.getenv('EMBED_BATCH_SIZE', '100'))
+        self.max_workers = max_workers or int(os.getenv('EMBED_CONCURRENCY', '4'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('EMBED_MAX_RETRIES', '5'))
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.task_type = task_type
+
+    def _embed_with_retry(self, batch: List[str]) -> np.ndarray:
+        backoff = self.initial_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.backend.embed_batch(batch, self.task_type)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = min(backoff, self.max_backoff) * (1 + random.random())
+                logger.warning(f"Embedding batch rate limited, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+                backoff *= 2
+
+    async def _aembed_with_retry(self, batch: List[str]) -> np.ndarray:
+        backoff = self.initial_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.backend.aembed_batch(batch, self.task_type)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = min(backoff, self.max_backoff) * (1 + random.random())
+                logger.warning(f"Embedding batch rate limited, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                backoff *= 2
+
+    def embed(self, texts: List[str], progress: Callable[[int, int], None] = None) -> np.ndarray:
+        """progress(done, total) is called with the number of texts embedded so far after each batch"""
+        if not texts:
+            return np.zeros((0, self.backend.embedding_dim), dtype=np.float32)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        embed_batch = self._embed_with_retry
+        if progress is not None:
+            done = [0]
+            done_lock = threading.Lock()
+
+            def embed_batch(batch: List[str]) -> np.ndarray:
+                vectors = self._embed_with_retry(batch)
+                with done_lock:
+                    done[0] += len(batch)
+                    progress(done[0], len(texts))
+                return vectors
+
+        if len(batches) == 1:
+            return embed_batch(batches[0])
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+            # map preserves batch order, so rows line up with the input texts
+            results = list(pool.map(embed_batch, batches))
+        return np.vstack(results)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed_with_retry([text])[0]
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        return (await self._aembed_with_retry([text]))[0]
@@ -0,0 +1,122 @@
+# src/core/embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.utils.file_lock import file_lock
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by sha256(model name + chunk content).
+
+    Vectors live in an append-only float32 matrix (vectors.f32) that is read
+    through np.memmap; index.json maps content hashes to matrix rows.
+    """
+
+    def __init__(self, model_name: str, embedding_dim: int, cache_dir: str = None):
+        cache_dir = cache_dir or os.getenv('EMBEDDING_CACHE_DIR', 'data/processed/embedding_cache')
+        model_slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+
+        self.model_name = model_name
+        self.embedding_dim = embedding_dim
+        self.cache_dir = Path(cache_dir) / model_slug
+        self.vectors_path = self.cache_dir / 'vectors.f32'
+        self.index_path = self.cache_dir / 'index.json'
+        self.lock_path = self.cache_dir / '.lock'
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+
+    def content_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def _read_index(self):
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('embedding_dim') != self.embedding_dim:
+                raise ValueError(
+                    f"Embedding cache dimension mismatch: {data.get('embedding_dim')} != {self.embedding_dim}"
+                )
+            self._rows = data['rows']
+        else:
+            self._rows = {}
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model_name': self.model_name,
+                'embedding_dim': self.embedding_dim,
+                'rows': self._rows
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _open_vectors(self) -> np.ndarray:
+        row_count = len(self._rows)
+        if row_count == 0:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(row_count, self.embedding_dim))
+
+    def _append(self, keys: List[str], vectors: np.ndarray):
+        # Rows are appended before the index is published, so a crash only
+        # leaves unreferenced bytes at the end of the matrix.
+        start = len(self._rows)
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(start * self.embedding_dim * 4)
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+        self._write_index()
+
+    def _lookup(self, keys: List[str]) -> np.ndarray:
+        vectors = self._open_vectors()
+        rows = np.fromiter((self._rows[key] for key in keys), dtype=np.int64, count=len(keys))
+        return np.array(vectors[rows], dtype=np.float32)
+
+    def get_or_embed(self, texts: List[str], embed_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return embeddings for texts, calling embed_fn only for contents not cached yet.
+
+        The lock is held to read the index and again to append, never across
+        embed_fn, so other builds keep using the cache while one is embedding.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        keys = [self.content_key(text) for text in texts]
+
+        with self._lock, file_lock(self.lock_path):
+            self._read_index()
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            if not missing:
+                embeddings = self._lookup(keys)
+
+        if missing:
+            new_vectors = embed_fn(list(missing.values()))
+            with self._lock, file_lock(self.lock_path):
+                # Another process may have appended some of them meanwhile
+                self._read_index()
+                new = [i for i, key in enumerate(missing) if key not in self._rows]
+                if new:
+                    missing_keys = list(missing)
+                    self._append([missing_keys[i] for i in new], new_vectors[new])
+                embeddings = self._lookup(keys)
+
+        logger.info(f"Embedding cache: {len(texts) - len(missing)} reused, {len(missing)} embedded")
+        return embeddings
+
+def get_embedding_cache(model_name: str, embedding_dim: int) -> Optional[EmbeddingCache]:
+    """EmbeddingCache for the model, or None when EMBEDDING_CACHE=0"""
+    if os.getenv('EMBEDDING_CACHE', '1').lower() in ('0', 'false', 'no'):
+        return None
+    return EmbeddingCache(model_name, embedding_dim)
@@ -0,0 +1,153 @@
+# src/core/index_manager.py
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from src.core.index_updates import ChangeLog
+from src.core.searcher import EnhancedSearcher
+from src.core.snapshot import SnapshotStore
+from src.utils.logger import get_logger
+from src.utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+
+class IndexManager:
+    """Keeps one loaded EnhancedSearcher resident per process and hot-swaps it
+    when CURRENT points at a new snapshot version, or when the current
+    version's change log has new records."""
+
+    def __init__(self, base_path: str = 'data/processed/faiss_index', refresh_interval: float = None):
+        self.base_path = Path(base_path)
+        self.store = SnapshotStore(base_path)
+        if refresh_interval is None:
+            refresh_interval = float(os.getenv('INDEX_REFRESH_INTERVAL', '30'))
+        self.refresh_interval = refresh_interval
+
+        self._searcher: Optional[EnhancedSearcher] = None
+        self._snapshot: Optional[str] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_check = 0.0
+        self.swaps = 0
+        self._swap_listeners: List[Callable[[], None]] = []
+
+    def add_swap_listener(self, callback: Callable[[], None]):
+        """Register a callback run after every snapshot swap (e.g. cache invalidation)"""
+        self._swap_listeners.append(callback)
+
+    @property
+    def snapshot(self) -> Optional[str]:
+        return self._snapshot
+
+    @property
+    def searcher(self) -> Optional[EnhancedSearcher]:
+        """The resident searcher, without loading or refreshing"""
+        return self._searcher
+
+    def load(self) -> bool:
+        """Load the latest snapshot synchronously (used at startup)"""
+        with self._lock:
+            return self._swap_to_latest()
+
+    def _apply_changes(self, searcher: EnhancedSearcher) -> EnhancedSearcher:
+        """searcher with any change-log records it has not seen yet"""
+        log = ChangeLog(self.base_path, searcher.snapshot_timestamp)
+        if log.size() <= searcher.applied_offset:
+            return searcher
+        records, offset = log.read(searcher.applied_offset)
+        if records:
+            searcher = searcher.apply_changes(records)
+        searcher.applied_offset = offset
+        return searcher
+
+    def _swap_to_latest(self) -> bool:
+        self._last_check = time.monotonic()
+        # Versions are immutable, so the name in CURRENT identifies the snapshot
+        latest = self.store.current_version()
+        if latest is None and self._snapshot is None:
+            latest = self.store.adopt_legacy()
+        if latest is None:
+            return False
+
+        if latest == self._snapshot:
+            searcher = self._apply_changes(self._searcher)
+            if searcher is self._searcher:
+                return False
+            message = f"Applied change log to snapshot {latest} ({searcher.applied_records} records)"
+        else:
+            searcher = EnhancedSearcher.load(latest)
+            if searcher is None:
+                return False
+            searcher = self._apply_changes(searcher)
+            message = f"Index snapshot swapped to: {latest}"
+
+        # Single reference assignment: requests in flight keep the old searcher
+        self._searcher = searcher
+        self._snapshot = latest
+        self.swaps += 1
+        logger.info(message)
+        for callback in self._swap_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in index swap listener: {str(e)}")
+        return True
+
+    def collect_metrics(self):
+        """Index size samples for /metrics; reads the resident searcher without triggering a refresh"""
+        yield 'gita_index_swaps_total', 'counter', 'Searcher swaps (new snapshot or change-log records)', {}, self.swaps
+        searcher = self._searcher
+        if searcher is None:
+            return
+        yield 'gita_index_info', 'gauge', 'Loaded snapshot version', {'version': self._snapshot or ''}, 1
+        vectors = searcher.index.ntotal + (searcher.delta_index.ntotal if searcher.delta_index is not None else 0)
+        yield 'gita_index_vectors', 'gauge', 'Vectors in the FAISS index, tombstoned ones included', {}, vectors
+        live_chunks = len(searcher.chunks) if searcher.live is None else int(searcher.live.sum())
+        yield 'gita_index_chunks', 'gauge', 'Live chunks that searches can return', {}, live_chunks
+        yield ('gita_index_change_log_records', 'gauge', 'Change-log records applied on top of the snapshot', {},
+               searcher.applied_records)
+
+    def _refresh_in_background(self):
+        try:
+            with self._lock:
+                self._swap_to_latest()
+        except Exception as e:
+            logger.error(f"Error refreshing index: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def _after_fork(self):
+        # A refresh thread running in the parent does not exist in the child
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get_searcher(self) -> Optional[EnhancedSearcher]:
+        """Return the resident searcher, scheduling a snapshot check at most once per interval"""
+        if self._searcher is None:
+            self.load()
+        elif not self._refreshing and time.monotonic() - self._last_check >= self.refresh_interval:
+            self._refreshing = True
+            self._last_check = time.monotonic()
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return self._searcher
+
+
+_index_manager: Optional[IndexManager] = None
+_index_manager_lock = threading.Lock()
+
+
+def get_index_manager() -> IndexManager:
+    """Process-wide IndexManager, created lazily so each gunicorn worker owns one"""
+    global _index_manager
+    if _index_manager is None:
+        with _index_manager_lock:
+            if _index_manager is None:
+                _index_manager = IndexManager()
+                REGISTRY.add_collector(_index_manager.collect_metrics)
+                # gunicorn --preload: workers inherit the loaded index copy-on-write
+                os.register_at_fork(after_in_child=_index_manager._after_fork)
+    return _index_manager
@@ -0,0 +1,258 @@
+# src/core/index_updates.py
+
+import base64
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.embedding_cache import get_embedding_cache
+from src.core.snapshot import CHANGES_FILE, SnapshotStore, new_version
+from src.core.vector_index import is_lossy, normalize_vectors
+from src.utils.file_lock import file_lock
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+_process_lock = threading.Lock()
+
+
+def chunk_uid(chunk: Dict) -> str:
+    """Stable key of a chunk: the chunker's content-derived uid, else its id"""
+    return chunk.get('uid') or chunk.get('id', '')
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(vector, dtype=np.float32).tobytes()).decode('ascii')
+
+
+def decode_vector(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+
+class ChangeLog:
+    """Append-only JSON Lines log of upserts and deletes on top of one index snapshot.
+
+    Each snapshot version keeps its own changes.jsonl inside its directory.
+    Upsert records carry the chunk and its normalized vector, so readers apply
+    them without calling the embedding API. Readers poll by byte offset and
+    only consume complete lines.
+    """
+
+    def __init__(self, base_path: Path, timestamp: str):
+        self.base_path = Path(base_path)
+        self.timestamp = timestamp
+        self.path = SnapshotStore(base_path).snapshot_dir(timestamp) / CHANGES_FILE
+
+    @staticmethod
+    def lock(base_path: Path):
+        """Serializes writers with compaction, which moves the log to a new snapshot"""
+        return file_lock(Path(base_path) / '.changes.lock')
+
+    def size(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def append(self, records: List[Dict]):
+        """Write records at the end of the log; callers hold ChangeLog.lock"""
+        if not records:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self, offset: int = 0) -> Tuple[List[Dict], int]:
+        """Records after byte offset and the offset to resume from"""
+        if not self.path.exists():
+            return [], offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return records, offset + end
+
+
+class IndexUpdater:
+    """Upserts and deletes chunks of the live index through the change log.
+
+    Serving processes pick the records up on their next refresh; compact()
+    folds the log into a new snapshot, and compact_if_needed() does so once
+    the log reaches compact_threshold records.
+    """
+
+    def __init__(self, base_path: str = 'data/processed/faiss_index', backend=None,
+                 compact_threshold: int = None):
+        self.base_path = Path(base_path)
+        self.store = SnapshotStore(base_path)
+        self._backend = backend
+        if compact_threshold is None:
+            compact_threshold = int(os.getenv('CHANGE_LOG_COMPACT_THRESHOLD', '1000'))
+        # 0 disables compaction by size
+        self.compact_threshold = compact_threshold
+        self._batch_embedder = None
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        from src.core.embedding_backend import BatchEmbedder, get_embedding_backend
+
+        if self._batch_embedder is None:
+            self._backend = self._backend or get_embedding_backend()
+            self._batch_embedder = BatchEmbedder(self._backend)
+        embedding_cache = get_embedding_cache(self._backend.model_name, self._backend.embedding_dim)
+        if embedding_cache:
+            return embedding_cache.get_or_embed(texts, self._batch_embedder.embed)
+        return self._batch_embedder.embed(texts)
+
+    def _append(self, records: List[Dict]) -> str:
+        with _process_lock, ChangeLog.lock(self.base_path):
+            timestamp = self.store.current_version()
+            if timestamp is None:
+                raise FileNotFoundError("No index snapshot to update")
+            ChangeLog(self.base_path, timestamp).append(records)
+        return timestamp
+
+    def upsert(self, chunks: Iterable[Dict]) -> int:
+        """Add chunks, replacing any chunk with the same uid; returns the number written"""
+        latest: Dict[str, Dict] = {}
+        for chunk in chunks:
+            latest[chunk_uid(chunk)] = chunk
+        if not latest:
+            return 0
+
+        # Embed before taking the lock so slow API calls never block other writers
+        vectors = normalize_vectors(self._embed([chunk['content'] for chunk in latest.values()]))
+        records = [
+            {'op': OP_UPSERT, 'uid': uid, 'chunk': chunk, 'vector': encode_vector(vector)}
+            for (uid, chunk), vector in zip(latest.items(), vectors)
+        ]
+        timestamp = self._append(records)
+        logger.info(f"Logged {len(records)} upserts on snapshot {timestamp}")
+        return len(records)
+
+    def delete(self, uids: Iterable[str]) -> int:
+        records = [{'op': OP_DELETE, 'uid': uid} for uid in dict.fromkeys(uids)]
+        if records:
+            timestamp = self._append(records)
+            logger.info(f"Logged {len(records)} deletes on snapshot {timestamp}")
+        return len(records)
+
+    def compact(self) -> Optional[str]:
+        """Fold the latest snapshot's change log into a new snapshot.
+
+        The slow part (loading, rebuilding, writing chunk store and BM25) runs
+        without blocking writers; records logged meanwhile are carried over into
+        the new snapshot's log just before CURRENT is switched to it.
+        Returns the new timestamp, or None if nothing was compacted.
+        """
+        from src.core.searcher import EnhancedSearcher
+
+        with file_lock(self.base_path / '.compact.lock', blocking=False) as acquired:
+            if not acquired:
+                logger.info("Compaction already running elsewhere")
+                return None
+
+            timestamp = self.store.current_version()
+            if timestamp is None:
+                return None
+            log = ChangeLog(self.base_path, timestamp)
+            records, offset = log.read()
+            if not records:
+                return None
+
+            current = EnhancedSearcher.load(timestamp, backend=self._backend)
+            if current is None:
+                raise RuntimeError(f"Could not load snapshot {timestamp}")
+            updated = current.apply_changes(records)
+
+            live = np.flatnonzero(updated.live)
+            chunks = [updated.chunks[int(slot)] for slot in live]
+            # Lossy indexes without their exact vectors on disk are re-embedded (from the cache)
+            embeddings = None
+            if updated.exact_vectors is not None:
+                embeddings = updated.exact_vectors.take(live)
+            elif not is_lossy(updated.index):
+                embeddings = updated._vectors(live)
+
+            new_timestamp = new_version()
+            builder = EnhancedSearcher(backend=updated.backend)
+            if not builder.build_index(chunks, new_timestamp, embeddings=embeddings, save=False):
+                raise RuntimeError("Compaction failed to build the new snapshot")
+            builder._save_index(new_timestamp, activate=False)
+
+            with _process_lock, ChangeLog.lock(self.base_path):
+                tail, _ = log.read(offset)
+                ChangeLog(self.base_path, new_timestamp).append(tail)
+                self.store.activate(new_timestamp)
+
+            logger.info(f"Compacted {len(records)} changes into snapshot {new_timestamp} "
+                  f"({len(chunks)} chunks, {len(tail)} carried over)")
+            return new_timestamp
+
+    def compact_if_needed(self) -> Optional[str]:
+        """compact() once the current change log holds compact_threshold records"""
+        timestamp = self.store.current_version()
+        if not self.compact_threshold or timestamp is None:
+            return None
+        records, _ = ChangeLog(self.base_path, timestamp).read()
+        if len(records) < self.compact_threshold:
+            return None
+        return self.compact()
+
+
+_compacting = threading.Lock()
+
+
+def compact_in_background(updater: IndexUpdater = None):
+    """Run compact() on a daemon thread unless one is already running in this process"""
+    if not _compacting.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            (updater or IndexUpdater()).compact()
+        except Exception as e:
+            logger.error(f"Error compacting change log: {str(e)}")
+        finally:
+            _compacting.release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def main(argv: List[str]) -> int:
+    usage = ("Usage: python -m src.core.index_updates add <markdown file or directory>\n"
+             "       python -m src.core.index_updates delete <uid> [<uid> ...]\n"
+             "       python -m src.core.index_updates compact")
+    if not argv or argv[0] not in ('add', 'delete', 'compact'):
+        print(usage)
+        return 2
+
+    updater = IndexUpdater()
+    command, args = argv[0], argv[1:]
+    if command == 'add' and args:
+        from src.core.chunker import DocumentChunker
+
+        chunker = DocumentChunker()
+        for path in args:
+            updater.upsert(chunker.iter_chunks(path))
+    elif command == 'delete' and args:
+        updater.delete(args)
+    elif command == 'compact':
+        updater.compact()
+    else:
+        print(usage)
+        return 2
+    # Writers are the one place that folds a grown log; serving processes only read it
+    if command != 'compact':
+        updater.compact_if_needed()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
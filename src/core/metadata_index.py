@@ -0,0 +1,143 @@
+# src/core/metadata_index.py
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import faiss
+import numpy as np
+
+
+class MetadataIndex:
+    """Precomputed per-attribute bitmaps over chunk positions.
+
+    Each (attribute, value) pair maps to a packed little-endian bitmap, the
+    layout faiss.IDSelectorBitmap expects, so a filter is a few bitwise ops
+    and FAISS skips non-matching vectors during the search itself.
+    """
+
+    ATTRIBUTES = ('chapter', 'speaker', 'type')
+
+    def __init__(self, size: int, bitmaps: Dict[str, Dict[object, np.ndarray]]):
+        self.size = size
+        self.bitmaps = bitmaps
+
+    @staticmethod
+    def _pack(mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask, bitorder='little')
+
+    @classmethod
+    def _value_bitmaps(cls, values: np.ndarray) -> Dict[object, np.ndarray]:
+        return {value: cls._pack(values == value) for value in np.unique(values) if value != -1}
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[Dict]) -> 'MetadataIndex':
+        """Build from a ChunkStore (column arrays, no decoding) or a list of chunk dicts"""
+        if hasattr(chunks, 'column'):
+            chapters = np.asarray(chunks.column('chapter'))
+            speaker_codes = np.asarray(chunks.column('speaker'))
+            type_codes = np.asarray(chunks.column('type'))
+            speaker_names = chunks.dictionaries['speaker']
+            type_names = chunks.dictionaries['type']
+        else:
+            chapters = np.array(
+                [chunk.get('metadata', {}).get('chapter_number', -1) for chunk in chunks], dtype=np.int32
+            )
+            speaker_names = sorted({chunk.get('metadata', {}).get('speaker') for chunk in chunks} - {None})
+            type_names = sorted({chunk.get('type') for chunk in chunks} - {None})
+            speaker_lookup = {name: i for i, name in enumerate(speaker_names)}
+            type_lookup = {name: i for i, name in enumerate(type_names)}
+            speaker_codes = np.array(
+                [speaker_lookup.get(chunk.get('metadata', {}).get('speaker'), -1) for chunk in chunks], dtype=np.int32
+            )
+            type_codes = np.array([type_lookup.get(chunk.get('type'), -1) for chunk in chunks], dtype=np.int32)
+
+        bitmaps = {
+            'chapter': {int(value): bitmap for value, bitmap in cls._value_bitmaps(chapters).items()},
+            'speaker': {
+                speaker_names[int(code)].lower(): bitmap for code, bitmap in cls._value_bitmaps(speaker_codes).items()
+            },
+            'type': {
+                type_names[int(code)].lower(): bitmap for code, bitmap in cls._value_bitmaps(type_codes).items()
+            },
+        }
+        return cls(len(chunks), bitmaps)
+
+    def extend(self, chunks: Sequence[Dict]) -> 'MetadataIndex':
+        """Copy that also covers chunks appended at the next positions.
+
+        Existing bitmaps are only padded to the new size; bits are set for the
+        appended chunks alone, so nothing is recomputed over the snapshot.
+        """
+        size = self.size + len(chunks)
+        length = (size + 7) // 8
+        bitmaps = {
+            attribute: {value: np.pad(bitmap, (0, length - len(bitmap))) for value, bitmap in values.items()}
+            for attribute, values in self.bitmaps.items()
+        }
+        for position, chunk in enumerate(chunks, start=self.size):
+            metadata = chunk.get('metadata', {})
+            values = {
+                'chapter': metadata.get('chapter_number'),
+                'speaker': metadata.get('speaker'),
+                'type': chunk.get('type'),
+            }
+            for attribute, value in values.items():
+                if value is None:
+                    continue
+                bitmap = bitmaps[attribute].setdefault(self._key(value), np.zeros(length, dtype=np.uint8))
+                bitmap[position >> 3] |= 1 << (position & 7)
+        return MetadataIndex(size, bitmaps)
+
+    @staticmethod
+    def _key(value):
+        return value.lower() if isinstance(value, str) else int(value)
+
+    @staticmethod
+    def _conditions(filters) -> Dict[str, Optional[Sequence]]:
+        return {
+            'chapter': filters.chapters,
+            'speaker': filters.speakers,
+            'type': filters.chunk_types,
+        }
+
+    def _union(self, attribute: str, values: Iterable) -> np.ndarray:
+        result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap = self.bitmaps[attribute].get(self._key(value))
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def unknown_values(self, filters) -> Dict[str, List]:
+        """Filter values that no chunk carries, by attribute"""
+        if filters is None:
+            return {}
+        unknown = {}
+        for attribute, values in self._conditions(filters).items():
+            missing = [value for value in values or () if self._key(value) not in self.bitmaps[attribute]]
+            if missing:
+                unknown[attribute] = missing
+        return unknown
+
+    def bitmap(self, filters) -> Optional[np.ndarray]:
+        """Packed bitmap of chunks matching every given attribute (values within one attribute are OR-ed)"""
+        if filters is None:
+            return None
+
+        result = None
+        for attribute, values in self._conditions(filters).items():
+            if not values:
+                continue
+            bitmap = self._union(attribute, values)
+            result = bitmap if result is None else result & bitmap
+        return result
+
+    def mask(self, bitmap: np.ndarray) -> np.ndarray:
+        """Unpacked boolean mask, e.g. for BM25 scoring"""
+        return np.unpackbits(bitmap, count=self.size, bitorder='little').astype(bool)
+
+    @staticmethod
+    def selector(bitmap: np.ndarray, size: int) -> faiss.IDSelector:
+        selector = faiss.IDSelectorBitmap(size, faiss.swig_ptr(bitmap))
+        # The selector points into the numpy buffer; keep it alive alongside
+        selector.bitmap_ref = bitmap
+        return selector
@@ -0,0 +1,232 @@
+# src/core/reranker.py
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from src.core.bm25 import tokenize
+from src.utils.metrics import observe_stage
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+VectorLookup = Callable[[List[int]], np.ndarray]
+TermLookup = Callable[[int], Set[str]]
+
+
+def record_timing(timings: Optional[Dict[str, float]], stage: str, start: float):
+    """Record the time since start in the stage latency histogram, and add the
+    milliseconds to timings[stage] if the caller asked for timings"""
+    observe_stage(stage, time.perf_counter() - start, timings)
+
+
+def _candidate_terms(candidate: Dict, terms: Optional[TermLookup]) -> Set[str]:
+    if terms is not None:
+        return terms(candidate['chunk_index'])
+    return set(tokenize(candidate['content']))
+
+
+def _normalized(scores: np.ndarray) -> np.ndarray:
+    """Min-max scale to [0, 1] so scores from different retrievers can be mixed"""
+    if len(scores) == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    if high - low < 1e-12:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+class Reranker:
+    """Reorders retrieval candidates; returns them best first with a rerank_score"""
+
+    name = "reranker"
+
+    def rerank(self, query: str, candidates: List[Dict], vectors: Optional[VectorLookup] = None,
+               terms: Optional[TermLookup] = None) -> List[Dict]:
+        raise NotImplementedError
+
+
+class MMRReranker(Reranker):
+    """Maximal marginal relevance over the stored chunk vectors.
+
+    Relevance is the candidate's retrieval score scaled to [0, 1], so no query
+    embedding is needed and lexical or fused candidates work too.
+    """
+
+    name = "mmr"
+
+    def __init__(self, diversity: float = 0.3):
+        self.diversity = diversity
+
+    def rerank(self, query: str, candidates: List[Dict], vectors: Optional[VectorLookup] = None,
+               terms: Optional[TermLookup] = None) -> List[Dict]:
+        if vectors is None or len(candidates) < 2:
+            return candidates
+
+        relevance = _normalized(np.array([candidate['score'] for candidate in candidates], dtype=np.float32))
+        embeddings = vectors([candidate['chunk_index'] for candidate in candidates])
+        similarity = embeddings @ embeddings.T
+
+        max_similarity = np.zeros(len(candidates), dtype=np.float32)
+        remaining = np.ones(len(candidates), dtype=bool)
+        reranked = []
+        for step in range(len(candidates)):
+            mmr = (1 - self.diversity) * relevance - self.diversity * max_similarity
+            mmr[~remaining] = -np.inf
+            best = int(np.argmax(mmr))
+            remaining[best] = False
+            max_similarity = similarity[best] if step == 0 else np.maximum(max_similarity, similarity[best])
+            reranked.append({**candidates[best], 'rerank_score': float(mmr[best])})
+        return reranked
+
+
+class LexicalOverlapReranker(Reranker):
+    """Blends the retrieval score with the share of query terms found in the chunk"""
+
+    name = "lexical"
+
+    def __init__(self, weight: float = 0.3):
+        self.weight = weight
+
+    def rerank(self, query: str, candidates: List[Dict], vectors: Optional[VectorLookup] = None,
+               terms: Optional[TermLookup] = None) -> List[Dict]:
+        query_terms = set(tokenize(query))
+        if not query_terms or not candidates:
+            return candidates
+
+        relevance = _normalized(np.array([candidate['score'] for candidate in candidates], dtype=np.float32))
+        overlap = np.array([
+            len(query_terms & _candidate_terms(candidate, terms)) / len(query_terms)
+            for candidate in candidates
+        ], dtype=np.float32)
+        scores = (1 - self.weight) * relevance + self.weight * overlap
+
+        order = np.argsort(-scores, kind='stable')
+        return [{**candidates[i], 'rerank_score': float(scores[i])} for i in order]
+
+
+class CrossEncoderReranker(Reranker):
+    """Scores (query, chunk) pairs with a local sentence-transformers cross-encoder on CPU"""
+
+    name = "cross_encoder"
+
+    def __init__(self, model_name: str = DEFAULT_CROSS_ENCODER, batch_size: int = 32):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "The cross_encoder reranker needs sentence-transformers: pip install sentence-transformers"
+            ) from e
+
+        self.model = CrossEncoder(model_name, device='cpu')
+        self.batch_size = batch_size
+
+    def rerank(self, query: str, candidates: List[Dict], vectors: Optional[VectorLookup] = None,
+               terms: Optional[TermLookup] = None) -> List[Dict]:
+        if not candidates:
+            return candidates
+        scores = np.asarray(self.model.predict(
+            [(query, candidate['content']) for candidate in candidates], batch_size=self.batch_size
+        ))
+        order = np.argsort(-scores, kind='stable')
+        return [{**candidates[i], 'rerank_score': float(scores[i])} for i in order]
+
+
+def collapse_near_duplicates(candidates: List[Dict], threshold: float, limit: Optional[int] = None,
+                             terms: Optional[TermLookup] = None) -> List[Dict]:
+    """Drop candidates whose term set overlaps an earlier one by at least threshold (Jaccard).
+
+    Kept candidates list the chunk IDs they absorbed under collapsed_ids. Stops
+    once limit candidates are kept.
+    """
+    kept = []
+    kept_terms = []
+    for candidate in candidates:
+        if limit is not None and len(kept) >= limit:
+            break
+        candidate_terms = _candidate_terms(candidate, terms)
+        duplicate_of = None
+        for i, other in enumerate(kept_terms):
+            union = len(candidate_terms | other)
+            if union and len(candidate_terms & other) / union >= threshold:
+                duplicate_of = i
+                break
+        if duplicate_of is None:
+            kept.append(dict(candidate))
+            kept_terms.append(candidate_terms)
+        else:
+            kept[duplicate_of].setdefault('collapsed_ids', []).append(candidate['chunk_id'])
+    return kept
+
+
+class RerankPipeline:
+    """Over-fetch candidates, run each reranker in turn, then collapse near-duplicates.
+
+    Stage timings in milliseconds are written to the caller's timings dict.
+    """
+
+    def __init__(self, rerankers: List[Reranker] = None, candidate_multiplier: int = 4,
+                 min_candidates: int = 20, dedupe_threshold: float = 0.9):
+        self.rerankers = rerankers or []
+        self.candidate_multiplier = candidate_multiplier
+        self.min_candidates = min_candidates
+        self.dedupe_threshold = dedupe_threshold
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rerankers) or self.dedupe_threshold < 1.0
+
+    def candidate_count(self, k: int) -> int:
+        """How many candidates retrieval should return for a final top-k"""
+        if not self.enabled:
+            return k
+        return max(k * self.candidate_multiplier, self.min_candidates)
+
+    def run(self, query: str, candidates: List[Dict], k: int, vectors: Optional[VectorLookup] = None,
+            terms: Optional[TermLookup] = None, timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """vectors maps chunk indices to stored embeddings and terms a chunk index
+        to its token set; without terms, chunk content is tokenized on every call"""
+        for reranker in self.rerankers:
+            start = time.perf_counter()
+            candidates = reranker.rerank(query, candidates, vectors, terms)
+            record_timing(timings, reranker.name, start)
+
+        if self.dedupe_threshold < 1.0:
+            start = time.perf_counter()
+            candidates = collapse_near_duplicates(candidates, self.dedupe_threshold, limit=k, terms=terms)
+            record_timing(timings, 'dedupe', start)
+
+        return candidates[:k]
+
+
+def _build_reranker(name: str) -> Reranker:
+    if name == MMRReranker.name:
+        return MMRReranker(diversity=float(os.getenv('MMR_DIVERSITY', '0.3')))
+    if name == LexicalOverlapReranker.name:
+        return LexicalOverlapReranker(weight=float(os.getenv('LEXICAL_RERANK_WEIGHT', '0.3')))
+    if name == CrossEncoderReranker.name:
+        return CrossEncoderReranker(os.getenv('CROSS_ENCODER_MODEL', DEFAULT_CROSS_ENCODER))
+    raise ValueError(f"Unknown reranker: {name}")
+
+
+_pipeline: Optional[RerankPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_rerank_pipeline() -> RerankPipeline:
+    """Process-wide pipeline from RERANKERS (comma separated: mmr, lexical, cross_encoder),
+    RERANK_CANDIDATES and DEDUPE_THRESHOLD; shared across index hot-swaps so models load once"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                names = [name.strip().lower() for name in os.getenv('RERANKERS', '').split(',') if name.strip()]
+                _pipeline = RerankPipeline(
+                    rerankers=[_build_reranker(name) for name in names],
+                    candidate_multiplier=int(os.getenv('RERANK_CANDIDATE_MULTIPLIER', '4')),
+                    min_candidates=int(os.getenv('RERANK_CANDIDATES', '20')),
+                    dedupe_threshold=float(os.getenv('DEDUPE_THRESHOLD', '0.9'))
+                )
+    return _pipeline
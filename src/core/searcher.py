@@ -1,166 +1,733 @@
 # src/core/searcher.py
 
+import copy
 import faiss
 import numpy as np
-import google.generativeai as genai
-from typing import List, Dict, Optional
-from pathlib import Path
-import pickle
-from datetime import datetime, timezone
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from src.core.embedding_backend import (
+    BatchEmbedder,
+    EmbeddingBackend,
+    DEFAULT_EMBEDDING_MODEL,
+    get_embedding_backend,
+)
+from src.core.embedding_cache import get_embedding_cache
+from src.core.chunk_store import ChunkOverlay, ChunkStore
+from src.core.bm25 import BM25Index, SegmentedBM25Index, reciprocal_rank_fusion, tokenize
+from src.core.metadata_index import MetadataIndex
+from src.core.index_updates import OP_UPSERT, chunk_uid, decode_vector
+from src.core.snapshot import (
+    BM25_FILE, CHUNKS_FILE, INDEX_FILE, VECTORS_FILE, SnapshotError, SnapshotStore, new_version
+)
+from src.core.verse_lookup import VerseIndex, parse_verse_reference
+from src.core.reranker import get_rerank_pipeline, record_timing
+from src.core.vector_index import (
+    METRIC_COSINE,
+    FullPrecisionVectors,
+    build_index,
+    delta_index,
+    describe_index,
+    enable_reconstruct,
+    is_lossy,
+    merge_topk,
+    normalize_vectors,
+    range_search_topk_batch,
+    reconstruct_vectors,
+    remove_vectors,
+    search_params,
+)
+from src.utils.cache import TieredCache, create_cache
+from src.utils.helpers import normalize_query
+from src.utils.logger import get_logger
+from src.utils.metrics import ERRORS
+
+logger = get_logger(__name__)
+
+SEARCH_MODES = ('dense', 'lexical', 'hybrid')
+# A failed or timed-out query embedding falls back to lexical results for that request;
+# after this many failures in a row, every request does so for the cooldown (seconds)
+EMBEDDING_FAILURE_THRESHOLD = int(os.getenv('EMBEDDING_FAILURE_THRESHOLD', '3'))
+EMBEDDING_FAILURE_COOLDOWN = float(os.getenv('EMBEDDING_FAILURE_COOLDOWN', '30'))
+
+_embedding_retry_at = 0.0
+_embedding_failures = 0
+_embedding_state_lock = threading.Lock()
+_embed_executor: Optional[ThreadPoolExecutor] = None
+_query_cache: Optional[TieredCache] = None
+_query_cache_lock = threading.Lock()
+
+def get_query_cache() -> TieredCache:
+    """Process-wide query embedding cache, kept across index hot-swaps"""
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = create_cache("QUERY_CACHE", default_size=2048, default_ttl=86400)
+    return _query_cache
+
+def _get_embed_executor() -> ThreadPoolExecutor:
+    global _embed_executor
+    if _embed_executor is None:
+        with _query_cache_lock:
+            if _embed_executor is None:
+                _embed_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='query-embed')
+    return _embed_executor
 
 class EnhancedSearcher:
-    def __init__(self, model_name: str = "models/text-embedding-004"):
-        # Initialize Gemini
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is not set")
-        
-        genai.configure(api_key=api_key)
-        self.model_name = model_name
-        self.embedding_dim = 768  # Gemini embeddings dimension
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: EmbeddingBackend = None):
+        self.backend = backend or get_embedding_backend(model_name)
+        self.batch_embedder = BatchEmbedder(self.backend)
+        self.model_name = self.backend.model_name
+        self.embedding_dim = self.backend.embedding_dim
+        self.query_cache = get_query_cache()
         self.index = None
+        self.index_info = {}
+        # Exact vectors for re-scoring candidates when the index stores lossy ones
+        self.exact_vectors: Optional[FullPrecisionVectors] = None
         self.chunks = []
+        self.bm25: Optional[BM25Index] = None
+        self.metadata_index: Optional[MetadataIndex] = None
+        self.verse_index: Optional[VerseIndex] = None
+        self.verse_neighbours = int(os.getenv('VERSE_LOOKUP_NEIGHBOURS', '1'))
         self.similarity_threshold = 0.3
+        # dense scores are cosine similarities; hybrid ones are RRF values (cosine in dense_score)
+        self.search_mode = os.getenv('SEARCH_MODE', 'dense').lower()
+        self.query_embed_timeout = float(os.getenv('QUERY_EMBED_TIMEOUT', '5'))
+        self.rrf_k = int(os.getenv('RRF_K', '60'))
+        self.rerank_pipeline = get_rerank_pipeline()
+        self._chunk_terms: Dict[int, frozenset] = {}
+        # Incremental updates: snapshot the change log belongs to, bytes of it applied,
+        # and which chunk slots are still live (None while every slot is)
+        self.snapshot_timestamp: Optional[str] = None
+        self.applied_offset = 0
+        self.applied_records = 0
+        self.live: Optional[np.ndarray] = None
+        self.live_bitmap: Optional[np.ndarray] = None
+        # Vectors of chunks appended by the change log, searched beside the snapshot's index
+        self.delta_index: Optional[faiss.Index] = None
+        # uid -> slot in the snapshot (built on the first change), and slots changed since (None once deleted)
+        self._snapshot_slots: Optional[Dict[str, int]] = None
+        self._changed_slots: Dict[str, Optional[int]] = {}
 
-    def build_index(self, chunks: List[Dict], timestamp: str = None) -> bool:
-        """Build FAISS index from chunks"""
+    def build_index(self, chunks: List[Dict], timestamp: str = None, embeddings: np.ndarray = None,
+                    save: bool = True) -> bool:
+        """Build FAISS index from chunks; embeddings may be passed in when already known"""
         try:
             if timestamp is None:
-                timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+                timestamp = new_version()
                 
-            print(f"\nBuilding index at {timestamp}")
+            logger.info(f"Building index at {timestamp}")
             self.chunks = chunks
+            self._chunk_terms = {}
+            self.snapshot_timestamp = timestamp
+            self.applied_offset = self.applied_records = 0
+            self.live = self.live_bitmap = None
+            self.delta_index = self._snapshot_slots = None
+            self._changed_slots = {}
             
-            # Generate embeddings using Gemini
+            # Generate embeddings in concurrent batches, reusing cached vectors
             texts = [chunk['content'] for chunk in chunks]
-            embeddings = []
-            for text in texts:
-                result = genai.embed_content(
-                    model=self.model_name,
-                    content=text,
-                    task_type="SEMANTIC_SIMILARITY"
-                )
-                embeddings.append(result['embedding'])
-            embeddings = np.array(embeddings)
+            if embeddings is None:
+                embedding_cache = get_embedding_cache(self.model_name, self.embedding_dim)
+                if embedding_cache:
+                    embeddings = embedding_cache.get_or_embed(texts, self.batch_embedder.embed)
+                else:
+                    embeddings = self.batch_embedder.embed(texts)
             
-            # Create and populate FAISS index
-            self.index = faiss.IndexFlatL2(self.embedding_dim)
-            self.index.add(embeddings.astype(np.float32))
+            # Create and populate a cosine (inner product on normalized vectors) index
+            self.index = build_index(embeddings, self.embedding_dim)
+            self.index_info = describe_index(self.index, embeddings)
+            self.exact_vectors = FullPrecisionVectors(normalize_vectors(embeddings)) if is_lossy(self.index) else None
+            enable_reconstruct(self.index)
+            self.bm25 = BM25Index.build(texts)
+            self.metadata_index = MetadataIndex.from_chunks(chunks)
+            self.verse_index = VerseIndex.from_chunks(chunks)
             
-            self._save_index(timestamp)
+            if save:
+                self._save_index(timestamp)
             
-            print(f"Successfully built index with {len(chunks)} vectors")
+            logger.info(f"Successfully built index with {len(chunks)} vectors")
             return True
             
         except Exception as e:
-            print(f"Error building index: {str(e)}")
+            logger.error(f"Error building index: {str(e)}")
             return False
 
-    def _save_index(self, timestamp: str):
-        base_path = Path('data/processed/faiss_index')
-        base_path.mkdir(parents=True, exist_ok=True)
-        
-        index_path = base_path / f'docs_index_{timestamp}.faiss'
-        faiss.write_index(self.index, str(index_path))
-        
-        chunks_path = base_path / f'chunk_data_{timestamp}.pkl'
-        chunk_data = {
-            'chunks': self.chunks,
+    def _save_index(self, timestamp: str, activate: bool = True):
+        """Publish the index as snapshot version timestamp; activate=False commits it without
+        making it current (the caller flips CURRENT later)"""
+        store = SnapshotStore()
+        staging_dir = store.stage(timestamp)
+
+        metadata = {
             'embedding_model': self.model_name,
             'created_at': timestamp,
             'created_by': 'ravi-hisoka',
             'vector_count': len(self.chunks),
             'vector_dimension': self.embedding_dim,
+            'metric': METRIC_COSINE,
+            **self.index_info,
             'current_date_utc': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        with open(chunks_path, 'wb') as f:
-            pickle.dump(chunk_data, f)
+        ChunkStore.write(staging_dir / CHUNKS_FILE, self.chunks, metadata)
+        self.bm25.save(staging_dir / BM25_FILE)
+        faiss.write_index(self.index, str(staging_dir / INDEX_FILE))
+        if self.exact_vectors is not None:
+            FullPrecisionVectors.write(staging_dir / VECTORS_FILE, self.exact_vectors.take(range(len(self.chunks))))
+
+        store.commit(timestamp, staging_dir, {
+            'created_at': timestamp,
+            'embedding_model': self.model_name,
+            'embedding_dim': self.embedding_dim,
+            'metric': METRIC_COSINE,
+            'vector_count': int(self.index.ntotal),
+            **self.index_info
+        })
+        if activate:
+            store.activate(timestamp)
             
-        print(f"Saved index and metadata at: {base_path}")
+        logger.info(f"Saved index and metadata at: {store.snapshot_dir(timestamp)}")
 
     @classmethod
-    def load(cls, timestamp: str = None):
-        """Load an existing index"""
+    def load(cls, timestamp: str = None, backend: EmbeddingBackend = None):
+        """Load snapshot version timestamp, or the current one"""
         try:
-            base_path = Path('data/processed/faiss_index')
-            
+            store = SnapshotStore()
             if timestamp is None:
-                # Get latest index
-                index_files = list(base_path.glob('docs_index_*.faiss'))
-                if not index_files:
-                    raise FileNotFoundError("No index files found")
-                index_path = max(index_files)
-                timestamp = index_path.stem.split('_', 2)[-1]
-            else:
-                index_path = base_path / f'docs_index_{timestamp}.faiss'
-                
-            chunks_path = base_path / f'chunk_data_{timestamp}.pkl'
-            
-            if not index_path.exists():
-                raise FileNotFoundError(f"Index file not found: {index_path}")
-            if not chunks_path.exists():
-                raise FileNotFoundError(f"Chunks file not found: {chunks_path}")
-                
-            
-            instance = cls()
-            instance.index = faiss.read_index(str(index_path))
+                timestamp = store.current_version() or store.adopt_legacy()
+                if timestamp is None:
+                    raise FileNotFoundError("No index snapshot published")
+
+            manifest = store.open(timestamp)
+            snapshot_dir = store.snapshot_dir(timestamp)
             
-            with open(chunks_path, 'rb') as f:
-                chunk_data = pickle.load(f)
-                instance.chunks = chunk_data['chunks']
+            instance = cls(backend=backend)
+            if manifest.get('embedding_model') and manifest['embedding_model'] != instance.model_name:
+                raise SnapshotError(
+                    f"Snapshot {timestamp} was embedded with {manifest['embedding_model']}, "
+                    f"not {instance.model_name}"
+                )
+            if manifest['embedding_dim'] != instance.embedding_dim:
+                raise SnapshotError(
+                    f"Snapshot {timestamp} has dimension {manifest['embedding_dim']}, not {instance.embedding_dim}"
+                )
+
+            instance.snapshot_timestamp = timestamp
+            instance.index = faiss.read_index(str(snapshot_dir / INDEX_FILE))
+            instance.index_info = {
+                key: manifest[key]
+                for key in ('index_type', 'storage', 'index_bytes', 'float32_bytes', 'recall_k', 'recall_at_k',
+                            'recall_at_k_rescored')
+                if key in manifest
+            }
+            if VECTORS_FILE in manifest['files']:
+                instance.exact_vectors = FullPrecisionVectors.open(snapshot_dir / VECTORS_FILE)
+            instance.chunks = ChunkStore.open(snapshot_dir / CHUNKS_FILE)
+            instance.bm25 = BM25Index.load(snapshot_dir / BM25_FILE)
+            instance.metadata_index = MetadataIndex.from_chunks(instance.chunks)
+            enable_reconstruct(instance.index)
+            instance.verse_index = VerseIndex.from_chunks(instance.chunks)
                 
-            print(f"Loaded index from: {index_path}")
-            print(f"Number of vectors: {instance.index.ntotal}")
+            logger.info(f"Loaded index snapshot: {timestamp} ({instance.index.ntotal} vectors)")
             return instance
             
         except Exception as e:
-            print(f"Error loading index: {str(e)}")
+            logger.error(f"Error loading index: {str(e)}")
+            return None
+
+    def apply_changes(self, records: List[Dict]) -> 'EnhancedSearcher':
+        """New searcher with change-log records applied; this one keeps serving unchanged.
+
+        FAISS ids are chunk slots: upserts append the chunk and its vector under
+        the next slot, and the slot a uid previously held is tombstoned in the
+        live mask. The snapshot's chunk store, index and BM25 are shared as they
+        are; appended chunks go to an overlay, their vectors to a small exact
+        delta index and their text to a BM25 delta segment, so the cost grows
+        with the change log rather than the corpus until compaction folds it in.
+        """
+        if self._snapshot_slots is None:
+            self._snapshot_slots = self._uid_slots()
+        updated = copy.copy(self)
+        chunks = self.chunks if isinstance(self.chunks, ChunkOverlay) else ChunkOverlay(self.chunks)
+        slots = dict(self._changed_slots)
+
+        added_chunks, added_vectors, removed = [], [], []
+        for record in records:
+            uid = record['uid']
+            slot = slots[uid] if uid in slots else self._snapshot_slots.get(uid)
+            slots[uid] = None
+            if slot is not None:
+                removed.append(slot)
+            if record['op'] == OP_UPSERT:
+                slots[uid] = len(chunks) + len(added_chunks)
+                added_chunks.append(record['chunk'])
+                added_vectors.append(decode_vector(record['vector']))
+
+        added_ids = np.arange(len(chunks), len(chunks) + len(added_chunks), dtype=np.int64)
+        live = np.ones(len(chunks) + len(added_chunks), dtype=bool)
+        if self.live is not None:
+            live[:len(chunks)] = self.live
+        live[removed] = False
+
+        index = faiss.clone_index(self.delta_index) if self.delta_index is not None \
+            else delta_index(self.embedding_dim)
+        if added_chunks:
+            index.add_with_ids(np.vstack(added_vectors), added_ids)
+        removed_appended = [slot for slot in removed if slot >= chunks.base_count]
+        if removed_appended:
+            remove_vectors(index, removed_appended)
+
+        updated.delta_index = index
+        if self.exact_vectors is not None and added_vectors:
+            updated.exact_vectors = self.exact_vectors.append(np.vstack(added_vectors))
+        updated.chunks = chunks.append(added_chunks)
+        updated.live = live
+        updated.live_bitmap = None if live.all() else np.packbits(live, bitorder='little')
+        updated._changed_slots = slots
+        # Dead appended slots get empty text so they neither match nor skew term statistics
+        base_bm25 = self.bm25.base if isinstance(self.bm25, SegmentedBM25Index) else self.bm25
+        updated.bm25 = SegmentedBM25Index.build(base_bm25, [
+            chunk['content'] if alive else ''
+            for chunk, alive in zip(updated.chunks.appended, live[chunks.base_count:])
+        ])
+        updated.metadata_index = self.metadata_index.extend(added_chunks)
+        updated.verse_index = self.verse_index.update(
+            updated.chunks, removed, [int(slot) for slot in added_ids if live[slot]]
+        )
+        updated.applied_records = self.applied_records + len(records)
+        return updated
+
+    def _uid_slots(self) -> Dict[str, int]:
+        """uid -> slot of every chunk in the snapshot"""
+        chunks = self.chunks.base if isinstance(self.chunks, ChunkOverlay) else self.chunks
+        uid_of = chunks.get_uid if hasattr(chunks, 'get_uid') else (lambda i: chunk_uid(chunks[i]))
+        return {uid_of(i): i for i in range(len(chunks))}
+
+    def _query_cache_key(self, query: str) -> str:
+        return f"{self.model_name}\0{normalize_query(query)}"
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Query embedding, served from the LRU/TTL cache when the normalized query was seen before"""
+        cache_key = self._query_cache_key(query)
+        embedding = self.query_cache.get(cache_key)
+        if embedding is None:
+            embedding = self.batch_embedder.embed_query(query)
+            self.query_cache.set(cache_key, embedding)
+        return embedding
+
+    def cached_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        """The query embedding if it is already cached (e.g. by a preceding search); never calls the API"""
+        return self.query_cache.get(self._query_cache_key(query))
+
+    async def aembed_query(self, query: str) -> np.ndarray:
+        cache_key = self._query_cache_key(query)
+        embedding = self.query_cache.get(cache_key)
+        if embedding is None:
+            embedding = await self.batch_embedder.aembed_query(query)
+            self.query_cache.set(cache_key, embedding)
+        return embedding
+
+    def _embedding_available(self) -> bool:
+        return time.monotonic() >= _embedding_retry_at
+
+    def _embedding_failed(self, error: Exception):
+        global _embedding_retry_at, _embedding_failures
+        with _embedding_state_lock:
+            _embedding_failures += 1
+            failures = _embedding_failures
+            if failures >= EMBEDDING_FAILURE_THRESHOLD:
+                _embedding_retry_at = time.monotonic() + EMBEDDING_FAILURE_COOLDOWN
+                _embedding_failures = 0
+        reason = str(error) or type(error).__name__
+        if failures >= EMBEDDING_FAILURE_THRESHOLD:
+            logger.warning(f"Query embedding failed {failures} times in a row, serving lexical results "
+                           f"for {EMBEDDING_FAILURE_COOLDOWN:g}s: {reason}")
+        else:
+            logger.warning(f"Query embedding unavailable, falling back to lexical search for this request: {reason}")
+
+    def _embedding_succeeded(self):
+        global _embedding_failures
+        if _embedding_failures:
+            with _embedding_state_lock:
+                _embedding_failures = 0
+
+    def _embed_query_or_none(self, query: str) -> Optional[np.ndarray]:
+        """Query embedding, or None when the embedding API is failing or slower than the timeout"""
+        cached = self.query_cache.get(self._query_cache_key(query))
+        if cached is not None:
+            return cached
+        if not self._embedding_available():
+            return None
+        try:
+            if self.query_embed_timeout > 0:
+                future = _get_embed_executor().submit(self.embed_query, query)
+                embedding = future.result(timeout=self.query_embed_timeout)
+            else:
+                embedding = self.embed_query(query)
+        except Exception as e:
+            self._embedding_failed(e)
             return None
+        self._embedding_succeeded()
+        return embedding
+
+    async def _aembed_query_or_none(self, query: str) -> Optional[np.ndarray]:
+        if not self._embedding_available():
+            return self.query_cache.get(self._query_cache_key(query))
+        try:
+            if self.query_embed_timeout > 0:
+                embedding = await asyncio.wait_for(self.aembed_query(query), self.query_embed_timeout)
+            else:
+                embedding = await self.aembed_query(query)
+        except Exception as e:
+            self._embedding_failed(e)
+            return None
+        self._embedding_succeeded()
+        return embedding
+
+    def _embed_queries_or_none(self, queries: List[str]) -> List[Optional[np.ndarray]]:
+        """Embeddings for many queries: cache hits first, then every miss in one batched embedding call"""
+        keys = [self._query_cache_key(query) for query in queries]
+        embeddings = [self.query_cache.get(key) for key in keys]
+        misses = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                misses.setdefault(keys[i], []).append(i)
+        if not misses or not self._embedding_available():
+            return embeddings
+
+        try:
+            vectors = self.batch_embedder.embed([queries[rows[0]] for rows in misses.values()])
+        except Exception as e:
+            self._embedding_failed(e)
+            return embeddings
+        self._embedding_succeeded()
+        for (key, rows), vector in zip(misses.items(), vectors):
+            self.query_cache.set(key, vector)
+            for i in rows:
+                embeddings[i] = vector
+        return embeddings
 
-    def search(self, query: str, k: int = 3) -> List[Dict]:
+    def search(self, query: str, k: int = 3, mode: str = None, filters=None,
+               nprobe: int = None, ef_search: int = None, timings: Dict[str, float] = None) -> List[Dict]:
+        """mode is dense, lexical or hybrid (default SEARCH_MODE); filters is a
+        SearchFilters restricting chapters, speakers and chunk types; nprobe (IVF)
+        and ef_search (HNSW) trade recall for speed per query. Pass a dict as
+        timings to get the milliseconds spent in each stage."""
         try:
             if self.index is None:
                 raise ValueError("Index not loaded")
                 
-            # Generate query embedding using Gemini
-            query_embedding = genai.embed_content(
-                model=self.model_name,
-                content=query,
-                task_type="SEMANTIC_SIMILARITY"
-            )['embedding']
-            query_embedding = np.array(query_embedding).astype(np.float32).reshape(1, -1)
-            
-            # Search
-            distances, indices = self.index.search(query_embedding, k * 2)
-            
-            results = []
-            for distance, idx in zip(distances[0], indices[0]):
-                if idx != -1:  # Valid index
-                    similarity_score = 1 - (distance / 2)  # Convert L2 distance to similarity
-                    if similarity_score >= self.similarity_threshold:
-                        result = {
-                            'content': self.chunks[idx]['content'],
-                            'score': float(similarity_score),
-                            'chunk_index': int(idx)
-                        }
-                        results.append(result)
-            
-            return self._deduplicate_results(results)[:k]
+            start = time.perf_counter()
+            verse_results = self.lookup_verses(query, k, filters)
+            record_timing(timings, 'verse_lookup', start)
+            if verse_results is not None:
+                return verse_results
+
+            mode = mode or self.search_mode
+            start = time.perf_counter()
+            query_embedding = self._embed_query_or_none(query) if mode != 'lexical' else None
+            record_timing(timings, 'embed', start)
+            return self._search_with_embedding(query, query_embedding, k, mode, filters, nprobe, ef_search, timings,
+                                               chapter=self._referenced_chapter(query, filters))
             
         except Exception as e:
-            print(f"Error during search: {str(e)}")
+            ERRORS.inc(stage='search')
+            logger.error(f"Error during search: {str(e)}")
             return []
 
-    def _deduplicate_results(self, results: List[Dict]) -> List[Dict]:
-        
-        seen = set()
-        unique_results = []
-        
-        for result in sorted(results, key=lambda x: x['score'], reverse=True):
-            if result['chunk_index'] not in seen:
-                seen.add(result['chunk_index'])
-                unique_results.append(result)
-                
-        return unique_results
+    async def asearch(self, query: str, k: int = 3, executor=None, mode: str = None, filters=None,
+                      nprobe: int = None, ef_search: int = None, timings: Dict[str, float] = None) -> List[Dict]:
+        """Non-blocking search: awaits the query embedding and runs FAISS in a thread pool"""
+        if self.index is None:
+            raise ValueError("Index not loaded")
+
+        start = time.perf_counter()
+        verse_results = self.lookup_verses(query, k, filters)
+        record_timing(timings, 'verse_lookup', start)
+        if verse_results is not None:
+            return verse_results
+
+        mode = mode or self.search_mode
+        start = time.perf_counter()
+        query_embedding = await self._aembed_query_or_none(query) if mode != 'lexical' else None
+        record_timing(timings, 'embed', start)
+        chapter = self._referenced_chapter(query, filters)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor,
+            lambda: self._search_with_embedding(query, query_embedding, k, mode, filters, nprobe, ef_search, timings,
+                                                chapter=chapter)
+        )
+
+    def lookup_verses(self, query: str, k: int = 3, filters=None) -> Optional[List[Dict]]:
+        """Chunks for an explicit chapter/verse reference, or None to fall through to retrieval.
+
+        Requested verses score 1.0 and come first; neighbouring verses follow as context.
+        Verses the filters exclude are dropped, and if none of the requested ones is
+        left the query goes to retrieval under the same filters.
+        """
+        if self.verse_index is None:
+            return None
+        reference = parse_verse_reference(query)
+        if reference is None:
+            return None
+        matches = self.verse_index.lookup(reference, neighbours=self.verse_neighbours)
+        bitmap = self._filter_bitmap(filters) if filters is not None else None
+        if bitmap is not None:
+            matches = [(position, is_requested) for position, is_requested in matches
+                       if bitmap[position >> 3] >> (position & 7) & 1]
+        if not any(is_requested for _, is_requested in matches):
+            return None
+
+        requested = [position for position, is_requested in matches if is_requested]
+        neighbours = [position for position, is_requested in matches if not is_requested]
+        results = [self._result(idx, 1.0, verse_match=True) for idx in requested]
+        results += [self._result(idx, 0.0, verse_match=False) for idx in neighbours]
+        return results[:max(k, len(requested))]
+
+    @staticmethod
+    def _referenced_chapter(query: str, filters=None) -> Optional[int]:
+        """Chapter of a verse reference the verse index could not resolve, to keep retrieval
+        within it; None when there is no reference or the caller already filters chapters"""
+        if filters is not None and filters.chapters:
+            return None
+        reference = parse_verse_reference(query)
+        return reference.chapter if reference is not None else None
+
+    def _search_with_embedding(self, query: str, query_embedding: Optional[np.ndarray], k: int,
+                               mode: str, filters=None, nprobe: int = None, ef_search: int = None,
+                               timings: Dict[str, float] = None, chapter: int = None) -> List[Dict]:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        bitmap = self._filter_bitmap(filters, chapter)
+        if bitmap is not None and not bitmap.any():
+            return []
+
+        # Over-fetch so reranking and near-duplicate collapsing still leave k results
+        candidate_count = self.rerank_pipeline.candidate_count(k)
+        start = time.perf_counter()
+        # Lexical-only also covers the case where the embedding API is down
+        if query_embedding is None:
+            candidates = self.lexical_search(query, candidate_count, bitmap=bitmap)
+        elif mode == 'hybrid' and self.bm25 is not None:
+            candidates = self._hybrid_search(query, query_embedding, candidate_count, bitmap, nprobe, ef_search)
+        else:
+            candidates = self.search_by_vector(
+                query_embedding, candidate_count, bitmap=bitmap, nprobe=nprobe, ef_search=ef_search
+            )
+        record_timing(timings, 'retrieve', start)
+        return self.rerank_pipeline.run(query, candidates, k, vectors=self._vectors, terms=self._terms,
+                                         timings=timings)
+
+    def validate_filters(self, filters):
+        """Raise ValueError for filter values no chunk in this index carries, which could only match nothing"""
+        if filters is None or self.metadata_index is None:
+            return
+        unknown = self.metadata_index.unknown_values(filters)
+        if unknown:
+            details = '; '.join(
+                f"{attribute} {', '.join(map(str, values))} (known: "
+                f"{', '.join(map(str, sorted(self.metadata_index.bitmaps[attribute])))})"
+                for attribute, values in unknown.items()
+            )
+            raise ValueError(f"Unknown filter values: {details}")
+
+    def _filter_bitmap(self, filters, chapter: int = None) -> Optional[np.ndarray]:
+        """Packed bitmap of chunks matching filters (and chapter, when it has any chunks)
+        and still live, or None for all chunks"""
+        bitmap = self.metadata_index.bitmap(filters) if self.metadata_index is not None else None
+        chapter_bitmap = self.metadata_index.bitmaps['chapter'].get(chapter) \
+            if self.metadata_index is not None and chapter is not None else None
+        if chapter_bitmap is not None:
+            bitmap = chapter_bitmap if bitmap is None else bitmap & chapter_bitmap
+        if self.live_bitmap is None:
+            return bitmap
+        return self.live_bitmap if bitmap is None else bitmap & self.live_bitmap
+
+    def _vectors(self, chunk_indices: List[int]) -> np.ndarray:
+        if self.exact_vectors is not None:
+            return self.exact_vectors.take(chunk_indices)
+        if self.delta_index is None:
+            return reconstruct_vectors(self.index, chunk_indices)
+        ids = np.asarray(chunk_indices, dtype=np.int64)
+        appended = ids >= self.chunks.base_count
+        vectors = np.empty((len(ids), self.embedding_dim), dtype=np.float32)
+        if (~appended).any():
+            vectors[~appended] = reconstruct_vectors(self.index, ids[~appended])
+        if appended.any():
+            vectors[appended] = reconstruct_vectors(self.delta_index, ids[appended])
+        return vectors
+
+    def _terms(self, chunk_index: int) -> frozenset:
+        """Token set of a chunk, tokenized once per loaded snapshot"""
+        terms = self._chunk_terms.get(chunk_index)
+        if terms is None:
+            content = self.chunks.get_content(chunk_index) if hasattr(self.chunks, 'get_content') \
+                else self.chunks[chunk_index]['content']
+            terms = frozenset(tokenize(content))
+            self._chunk_terms[chunk_index] = terms
+        return terms
+
+    def _search_params(self, bitmap: Optional[np.ndarray], nprobe: int = None, ef_search: int = None):
+        """SearchParameters carrying the filter as an ID selector, so FAISS only visits matching vectors"""
+        if bitmap is None:
+            return search_params(self.index, nprobe=nprobe, ef_search=ef_search)
+        selector = MetadataIndex.selector(bitmap, len(bitmap))
+        return search_params(self.index, nprobe=nprobe, ef_search=ef_search, sel=selector)
+
+    def _dense_search(self, queries: np.ndarray, threshold: float, k: int, bitmap: Optional[np.ndarray] = None,
+                      nprobe: int = None, ef_search: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Top-k (scores, ids) per query row from the snapshot's index and any delta index"""
+        params = self._search_params(bitmap, nprobe=nprobe, ef_search=ef_search)
+        results = range_search_topk_batch(
+            self.index, queries, threshold, k, params=params, vectors=self.exact_vectors
+        )
+        if self.delta_index is None or not self.delta_index.ntotal:
+            return results
+        delta_params = faiss.SearchParameters(sel=MetadataIndex.selector(bitmap, len(bitmap))) \
+            if bitmap is not None else None
+        delta = range_search_topk_batch(self.delta_index, queries, threshold, k, params=delta_params)
+        return [merge_topk(snapshot, appended, k) for snapshot, appended in zip(results, delta)]
+
+    def _result(self, idx: int, score: float, **extra) -> Dict:
+        chunk = self.chunks[idx]
+        return {
+            'content': chunk['content'],
+            'chunk_id': chunk.get('id', str(idx)),
+            'uid': chunk_uid(chunk) or str(idx),
+            'score': float(score),
+            'chunk_index': int(idx),
+            **extra
+        }
+
+    def lexical_search(self, query: str, k: int = 3, bitmap: Optional[np.ndarray] = None) -> List[Dict]:
+        """BM25 only; needs no embedding call"""
+        if self.bm25 is None:
+            return []
+        allowed = self.metadata_index.mask(bitmap) if bitmap is not None else None
+        scores, indices = self.bm25.search(query, k, allowed=allowed)
+        return [self._result(idx, score) for score, idx in zip(scores, indices)]
+
+    def _hybrid_search(self, query: str, query_embedding: np.ndarray, k: int, bitmap: Optional[np.ndarray] = None,
+                       nprobe: int = None, ef_search: int = None) -> List[Dict]:
+        """Reciprocal rank fusion of dense and BM25 candidates"""
+        candidate_count = self._hybrid_candidate_count(k)
+        dense_scores, dense_ids = self._dense_search(
+            query_embedding, self.similarity_threshold, candidate_count, bitmap, nprobe, ef_search
+        )[0]
+        return self._fuse(query, dense_scores, dense_ids, k, bitmap)
+
+    @staticmethod
+    def _hybrid_candidate_count(k: int) -> int:
+        return max(k * 4, 20)
+
+    def _fuse(self, query: str, dense_scores: np.ndarray, dense_ids: np.ndarray, k: int,
+              bitmap: Optional[np.ndarray] = None) -> List[Dict]:
+        allowed = self.metadata_index.mask(bitmap) if bitmap is not None else None
+        lexical_scores, lexical_ids = self.bm25.search(query, self._hybrid_candidate_count(k), allowed=allowed)
+
+        dense = dict(zip(dense_ids.tolist(), dense_scores.tolist()))
+        lexical = dict(zip(lexical_ids.tolist(), lexical_scores.tolist()))
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids], self.rrf_k)[:k]
+
+        return [
+            self._result(idx, score, dense_score=dense.get(idx), lexical_score=lexical.get(idx))
+            for idx, score in fused
+        ]
+
+    def search_by_vector(self, query_embedding: np.ndarray, k: int = 3, bitmap: Optional[np.ndarray] = None,
+                         nprobe: int = None, ef_search: int = None) -> List[Dict]:
+        # The threshold and any metadata filter are applied inside FAISS, so only
+        # qualifying candidates come back
+        scores, indices = self._dense_search(
+            query_embedding, self.similarity_threshold, k, bitmap, nprobe, ef_search
+        )[0]
+        return [self._result(idx, score) for score, idx in zip(scores, indices)]
+
+    def search_batch(self, queries: List[str], k: Union[int, Sequence[int]] = 3, mode: str = None,
+                     filters: Optional[Sequence] = None, threshold: Union[float, Sequence[float]] = None,
+                     nprobe: int = None, ef_search: int = None, timings: Dict[str, float] = None) -> List[List[Dict]]:
+        """Search many queries at once, returning one result list per query in input order.
+
+        Query embeddings are fetched in one batched call and the dense part runs as
+        a single FAISS search over the query matrix for each distinct filter.
+        k, filters and the similarity threshold may be given per query; timings
+        accumulates the stage totals for the whole batch.
+        """
+        if self.index is None:
+            raise ValueError("Index not loaded")
+        mode = mode or self.search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        count = len(queries)
+        ks = [k] * count if isinstance(k, int) else list(k)
+        filters = list(filters) if filters is not None else [None] * count
+        if threshold is None:
+            threshold = self.similarity_threshold
+        thresholds = [threshold] * count if isinstance(threshold, (int, float)) else list(threshold)
+        results: List[Optional[List[Dict]]] = [None] * count
+
+        pending = []
+        for i, query in enumerate(queries):
+            verse_results = self.lookup_verses(query, ks[i], filters[i])
+            if verse_results is not None:
+                results[i] = verse_results
+            else:
+                pending.append(i)
+
+        bitmaps = {}
+        for i in pending:
+            bitmap = self._filter_bitmap(filters[i], self._referenced_chapter(queries[i], filters[i]))
+            if bitmap is not None and not bitmap.any():
+                results[i] = []
+            else:
+                bitmaps[i] = bitmap
+        pending = list(bitmaps)
+
+        embeddings = [None] * len(pending)
+        if mode != 'lexical' and pending:
+            start = time.perf_counter()
+            embeddings = self._embed_queries_or_none([queries[i] for i in pending])
+            record_timing(timings, 'embed', start)
+
+        fetch = {i: self.rerank_pipeline.candidate_count(ks[i]) for i in pending}
+        candidates = {}
+        start = time.perf_counter()
+
+        # Group the embedded queries by filter and threshold so each group is one matrix search
+        groups: Dict[tuple, List[int]] = {}
+        for i, embedding in zip(pending, embeddings):
+            if embedding is None:
+                candidates[i] = self.lexical_search(queries[i], fetch[i], bitmap=bitmaps[i])
+            else:
+                key = (thresholds[i], bitmaps[i].tobytes() if bitmaps[i] is not None else None)
+                groups.setdefault(key, []).append(i)
+        query_embeddings = dict(zip(pending, embeddings))
+
+        hybrid = mode == 'hybrid' and self.bm25 is not None
+        for rows in groups.values():
+            bitmap = bitmaps[rows[0]]
+            candidate_count = max(self._hybrid_candidate_count(fetch[i]) if hybrid else fetch[i] for i in rows)
+            matrix = np.vstack([query_embeddings[i] for i in rows])
+            dense = self._dense_search(matrix, thresholds[rows[0]], candidate_count, bitmap, nprobe, ef_search)
+            for i, (scores, indices) in zip(rows, dense):
+                if hybrid:
+                    limit = self._hybrid_candidate_count(fetch[i])
+                    candidates[i] = self._fuse(queries[i], scores[:limit], indices[:limit], fetch[i], bitmap)
+                else:
+                    candidates[i] = [self._result(idx, score) for score, idx in zip(scores[:fetch[i]], indices[:fetch[i]])]
+        record_timing(timings, 'retrieve', start)
+
+        for i, found in candidates.items():
+            results[i] = self.rerank_pipeline.run(
+                queries[i], found, ks[i], vectors=self._vectors, terms=self._terms, timings=timings
+            )
+        return results
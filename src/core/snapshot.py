@@ -0,0 +1,240 @@
+# src/core/snapshot.py
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+
+from src.core.bm25 import BM25Index
+from src.core.chunk_store import ChunkStore
+from src.core.vector_index import METRIC_COSINE, is_cosine_index, migrate_to_cosine
+from src.utils.file_lock import file_lock
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'index.faiss'
+CHUNKS_FILE = 'chunks.bin'
+BM25_FILE = 'bm25.npz'
+CHANGES_FILE = 'changes.jsonl'
+# Full-precision vectors, written alongside lossy (float16, sq8, PQ) indexes for re-scoring
+VECTORS_FILE = 'vectors.npy'
+SNAPSHOT_FILES = (INDEX_FILE, CHUNKS_FILE, BM25_FILE)
+OPTIONAL_SNAPSHOT_FILES = (VECTORS_FILE,)
+FORMAT_VERSION = 1
+
+
+def new_version() -> str:
+    """Sortable, unique-per-build snapshot name"""
+    return datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S_%f')
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotStore:
+    """Versioned index snapshots under one base directory.
+
+    Layout::
+
+        CURRENT                    name of the live version, replaced via rename
+        snapshots/<version>/       index.faiss, chunks.bin, bm25.npz, manifest.json
+                                   (vectors.npy for lossy indexes, plus the
+                                   version's append-only changes.jsonl)
+
+    A version is assembled in a hidden staging directory and renamed into
+    place complete, so its files never change after publication; flipping
+    CURRENT is the single atomic step that makes it live. Finding the live
+    snapshot is one small file read, with no directory listing.
+    """
+
+    def __init__(self, base_path: str = 'data/processed/faiss_index'):
+        self.base_path = Path(base_path)
+        self.snapshots_path = self.base_path / 'snapshots'
+        self.current_path = self.base_path / 'CURRENT'
+
+    def snapshot_dir(self, version: str) -> Path:
+        return self.snapshots_path / version
+
+    def current_version(self) -> Optional[str]:
+        try:
+            return self.current_path.read_text(encoding='utf-8').strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version: str) -> Dict[str, Any]:
+        manifest_path = self.snapshot_dir(version) / MANIFEST_FILE
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise SnapshotError(f"Snapshot not found: {version}") from None
+
+    def stage(self, version: str) -> Path:
+        """Empty directory to write a new version's files into before commit()"""
+        if self.snapshot_dir(version).exists():
+            raise SnapshotError(f"Snapshot already exists: {version}")
+        staging_dir = self.snapshots_path / f'.staging-{version}-{os.getpid()}'
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+        return staging_dir
+
+    def commit(self, version: str, staging_dir: Path, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Checksum the staged files, write the manifest and move the directory into place"""
+        files = {}
+        for name in SNAPSHOT_FILES:
+            path = staging_dir / name
+            if not path.exists():
+                raise SnapshotError(f"Missing snapshot file: {name}")
+            files[name] = {'sha256': file_sha256(path), 'bytes': path.stat().st_size}
+        for name in OPTIONAL_SNAPSHOT_FILES:
+            path = staging_dir / name
+            if path.exists():
+                files[name] = {'sha256': file_sha256(path), 'bytes': path.stat().st_size}
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'version': version,
+            'published_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            **metadata,
+            'files': files
+        }
+        _write_atomic(staging_dir / MANIFEST_FILE, json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+        os.replace(staging_dir, self.snapshot_dir(version))
+        return manifest
+
+    def activate(self, version: str):
+        """Point CURRENT at a committed version once its checksums verify"""
+        self.open(version, verify=True)
+        _write_atomic(self.current_path, f"{version}\n".encode('utf-8'))
+        logger.info(f"Published snapshot: {version}")
+        self.prune()
+
+    def open(self, version: str, verify: bool = None) -> Dict[str, Any]:
+        """Manifest of version after checking its files are complete (and, with verify, intact).
+
+        Checksums are verified when a version is activated; re-hashing on every
+        load would read each file in full, so loads check sizes unless
+        SNAPSHOT_VERIFY=1.
+        """
+        if verify is None:
+            verify = os.getenv('SNAPSHOT_VERIFY', '0') == '1'
+        manifest = self.manifest(version)
+        snapshot_dir = self.snapshot_dir(version)
+        for name, expected in manifest['files'].items():
+            path = snapshot_dir / name
+            if not path.exists() or path.stat().st_size != expected['bytes']:
+                raise SnapshotError(f"Snapshot {version} has an incomplete {name}")
+            if verify and file_sha256(path) != expected['sha256']:
+                raise SnapshotError(f"Snapshot {version} failed checksum for {name}")
+        return manifest
+
+    def versions(self) -> List[str]:
+        if not self.snapshots_path.exists():
+            return []
+        return sorted(path.name for path in self.snapshots_path.iterdir()
+                      if path.is_dir() and not path.name.startswith('.'))
+
+    def prune(self, keep: int = None):
+        """Delete all but the newest keep versions (SNAPSHOT_RETENTION); never the current one.
+        Workers still holding an older version keep their open files until they swap."""
+        keep = keep if keep is not None else int(os.getenv('SNAPSHOT_RETENTION', '3'))
+        if keep <= 0:
+            return
+        current = self.current_version()
+        for version in self.versions()[:-keep]:
+            if version != current:
+                shutil.rmtree(self.snapshot_dir(version), ignore_errors=True)
+                logger.info(f"Removed old snapshot: {version}")
+
+    def adopt_legacy(self) -> Optional[str]:
+        """One-time import of the newest flat-layout snapshot (docs_index_<ts>.faiss next to
+        chunk_store_<ts>.bin or a pickled chunk_data_<ts>.pkl) as a version.
+
+        Processes starting together import it once: the others wait on the lock
+        and pick up the version it published.
+        """
+        if not list(self.base_path.glob('docs_index_*.faiss')):
+            return None
+        with file_lock(self.base_path / '.legacy.lock'):
+            current = self.current_version()
+            if current is not None:
+                return current
+            return self._import_legacy()
+
+    def _import_legacy(self) -> str:
+        index_files = list(self.base_path.glob('docs_index_*.faiss'))
+        index_path = max(index_files)
+        version = index_path.stem.split('_', 2)[-1]
+        chunks_path = self.base_path / f'chunk_store_{version}.bin'
+        legacy_chunks_path = self.base_path / f'chunk_data_{version}.pkl'
+        bm25_path = self.base_path / f'bm25_{version}.npz'
+        if not chunks_path.exists() and not legacy_chunks_path.exists():
+            raise SnapshotError(f"Chunks file not found: {chunks_path}")
+
+        logger.info(f"Importing legacy snapshot: {index_path}")
+        staging_dir = self.stage(version)
+        index = faiss.read_index(str(index_path))
+        migrated = not is_cosine_index(index)
+        if migrated:
+            logger.info("Migrating L2 index to cosine similarity")
+            index = migrate_to_cosine(index)
+
+        if chunks_path.exists():
+            chunks = ChunkStore.open(chunks_path)
+            metadata = dict(chunks.metadata)
+            if migrated:
+                ChunkStore.write(staging_dir / CHUNKS_FILE, list(chunks), {**metadata, 'metric': METRIC_COSINE})
+            else:
+                shutil.copyfile(chunks_path, staging_dir / CHUNKS_FILE)
+        else:
+            with open(legacy_chunks_path, 'rb') as f:
+                metadata = pickle.load(f)
+            chunks = metadata.pop('chunks')
+            ChunkStore.write(staging_dir / CHUNKS_FILE, chunks, {**metadata, 'metric': METRIC_COSINE})
+
+        if bm25_path.exists() and not migrated:
+            shutil.copyfile(bm25_path, staging_dir / BM25_FILE)
+        else:
+            BM25Index.build([chunk['content'] for chunk in chunks]).save(staging_dir / BM25_FILE)
+        faiss.write_index(index, str(staging_dir / INDEX_FILE))
+
+        legacy_changes = self.base_path / f'changes_{version}.jsonl'
+        if legacy_changes.exists():
+            shutil.copyfile(legacy_changes, staging_dir / CHANGES_FILE)
+
+        self.commit(version, staging_dir, {
+            'created_at': metadata.get('created_at', version),
+            'embedding_model': metadata.get('embedding_model'),
+            'embedding_dim': index.d,
+            'metric': METRIC_COSINE,
+            'vector_count': int(index.ntotal),
+            'imported_from': index_path.name
+        })
+        self.activate(version)
+        return version
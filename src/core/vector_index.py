@@ -0,0 +1,406 @@
+# src/core/vector_index.py
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+METRIC_COSINE = "cosine"
+METRIC_L2 = "l2"
+
+INDEX_FLAT = "flat"
+INDEX_HNSW = "hnsw"
+INDEX_IVF = "ivf"
+INDEX_IVFPQ = "ivfpq"
+INDEX_TYPES = (INDEX_FLAT, INDEX_HNSW, INDEX_IVF, INDEX_IVFPQ)
+
+# How flat, hnsw and ivf indexes store vectors; ivfpq always stores PQ codes
+STORAGE_FLOAT32 = "float32"
+STORAGE_FLOAT16 = "float16"
+STORAGE_SQ8 = "sq8"
+STORAGE_PQ = "pq"
+STORAGE_TYPES = (STORAGE_FLOAT32, STORAGE_FLOAT16, STORAGE_SQ8)
+_SQ_TYPES = {
+    STORAGE_FLOAT16: faiss.ScalarQuantizer.QT_fp16,
+    STORAGE_SQ8: faiss.ScalarQuantizer.QT_8bit,
+}
+# Lossy indexes fetch k * RESCORE_FACTOR candidates and re-rank them by exact
+# cosine against the full-precision vectors kept beside the index (0 disables)
+RESCORE_FACTOR = int(os.getenv('RESCORE_FACTOR', '4'))
+
+# k-means wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """Return an L2-normalized float32 copy, so inner product equals cosine similarity"""
+    vectors = np.array(vectors, dtype=np.float32, copy=True, order='C')
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _training_sample(vectors: np.ndarray, sample_size: int) -> np.ndarray:
+    if len(vectors) <= sample_size:
+        return vectors
+    rng = np.random.default_rng(0)
+    return vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+
+def _recall_queries(vectors: np.ndarray, sample_size: int, noise: float = 0.5) -> np.ndarray:
+    """Sampled vectors moved off their own position by random noise of norm about noise.
+
+    An indexed vector used as its own query always finds itself first, which
+    flatters recall; perturbed queries land between vectors like real ones do.
+    """
+    sample = _training_sample(vectors, sample_size)
+    rng = np.random.default_rng(1)
+    offsets = rng.standard_normal(sample.shape).astype(np.float32) * (noise / np.sqrt(sample.shape[1]))
+    return normalize_vectors(sample + offsets)
+
+
+def _ivf_nlist(vector_count: int) -> int:
+    nlist = _env_int('IVF_NLIST', 0) or int(4 * np.sqrt(vector_count))
+    return max(1, min(nlist, vector_count // MIN_POINTS_PER_CENTROID))
+
+
+def build_index(embeddings: np.ndarray, embedding_dim: int, index_type: str = None,
+                storage: str = None) -> faiss.Index:
+    """Inner-product index over normalized vectors (cosine similarity).
+
+    index_type (or INDEX_TYPE) selects flat (exact), hnsw, ivf (IVF-Flat) or
+    ivfpq (IVF-PQ). IVF variants are trained on a sample of the vectors.
+    storage (or VECTOR_STORAGE) keeps flat, hnsw and ivf vectors as float32,
+    float16 (half the memory) or sq8 (8-bit scalar quantization, a quarter).
+    The index is wrapped in an IndexIDMap2 with row i stored under id i, the
+    chunk slot ids that a delta_index beside it continues.
+    """
+    index_type = (index_type or os.getenv('INDEX_TYPE', INDEX_FLAT)).lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+    storage = (storage or os.getenv('VECTOR_STORAGE', STORAGE_FLOAT32)).lower()
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+
+    vectors = normalize_vectors(embeddings) if len(embeddings) else np.zeros((0, embedding_dim), dtype=np.float32)
+    train_size = _env_int('INDEX_TRAIN_SAMPLE', 50000)
+    nlist = _ivf_nlist(len(vectors))
+
+    if index_type in (INDEX_IVF, INDEX_IVFPQ) and len(vectors) < MIN_POINTS_PER_CENTROID * 2:
+        logger.warning(f"Too few vectors ({len(vectors)}) to train {index_type}, using exact index")
+        index_type = INDEX_FLAT
+    if index_type == INDEX_IVFPQ and len(vectors) < 2 ** _env_int('PQ_NBITS', 8):
+        logger.warning(f"Too few vectors ({len(vectors)}) to train PQ codebooks, using IVF-Flat")
+        index_type = INDEX_IVF
+    if storage == STORAGE_SQ8 and not len(vectors):
+        logger.warning("No vectors to train the 8-bit quantizer, using float16 storage")
+        storage = STORAGE_FLOAT16
+    sq_type = _SQ_TYPES.get(storage)
+
+    if index_type == INDEX_HNSW:
+        if sq_type is None:
+            index = faiss.IndexHNSWFlat(embedding_dim, _env_int('HNSW_M', 32), faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(embedding_dim, sq_type, _env_int('HNSW_M', 32), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = _env_int('HNSW_EF_CONSTRUCTION', 200)
+        index.hnsw.efSearch = _env_int('HNSW_EF_SEARCH', 64)
+    elif index_type == INDEX_IVF:
+        quantizer = faiss.IndexFlatIP(embedding_dim)
+        if sq_type is None:
+            index = faiss.IndexIVFFlat(quantizer, embedding_dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, embedding_dim, nlist, sq_type, faiss.METRIC_INNER_PRODUCT
+            )
+    elif index_type == INDEX_IVFPQ:
+        quantizer = faiss.IndexFlatIP(embedding_dim)
+        index = faiss.IndexIVFPQ(
+            quantizer, embedding_dim, nlist,
+            _env_int('PQ_M', 64), _env_int('PQ_NBITS', 8), faiss.METRIC_INNER_PRODUCT
+        )
+    elif sq_type is not None:
+        index = faiss.IndexScalarQuantizer(embedding_dim, sq_type, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexFlatIP(embedding_dim)
+
+    if not index.is_trained:
+        index.train(_training_sample(vectors, train_size))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = _env_int('IVF_NPROBE', 8)
+
+    index = faiss.IndexIDMap2(index)
+    if len(vectors):
+        index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+    return index
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """The index inside an IndexIDMap/IndexIDMap2 wrapper (or the index itself)"""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def delta_index(embedding_dim: int) -> faiss.IndexIDMap2:
+    """Exact index for vectors added after a snapshot, stored under their chunk slots.
+
+    It is searched beside the snapshot's index, which stays shared and
+    unchanged, and holds only the change log's vectors until compaction.
+    """
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(embedding_dim))
+
+
+def index_type_of(index: faiss.Index) -> str:
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return INDEX_HNSW
+    if isinstance(index, faiss.IndexIVFPQ):
+        return INDEX_IVFPQ
+    if faiss.try_extract_index_ivf(index) is not None:
+        return INDEX_IVF
+    return INDEX_FLAT
+
+
+def storage_of(index: faiss.Index) -> str:
+    """How the index stores its vectors: float32, float16, sq8 or pq"""
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return STORAGE_PQ
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        for storage, sq_type in _SQ_TYPES.items():
+            if index.sq.qtype == sq_type:
+                return storage
+    return STORAGE_FLOAT32
+
+
+def is_lossy(index: faiss.Index) -> bool:
+    """Whether stored vectors are approximations of the embeddings"""
+    return storage_of(index) != STORAGE_FLOAT32
+
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None, **kwargs):
+    """Per-query SearchParameters for the index type (None keeps the index defaults)"""
+    index_type = index_type_of(index)
+    if index_type in (INDEX_IVF, INDEX_IVFPQ):
+        if nprobe is None and not kwargs:
+            return None
+        params = faiss.SearchParametersIVF(**kwargs)
+        params.nprobe = nprobe or faiss.try_extract_index_ivf(index).nprobe
+        return params
+    if index_type == INDEX_HNSW:
+        if ef_search is None and not kwargs:
+            return None
+        params = faiss.SearchParametersHNSW(**kwargs)
+        params.efSearch = ef_search or base_index(index).hnsw.efSearch
+        return params
+    return faiss.SearchParameters(**kwargs) if kwargs else None
+
+
+def enable_reconstruct(index: faiss.Index):
+    """IVF indexes can only reconstruct stored vectors once they have a direct map"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+
+
+def remove_vectors(index: faiss.Index, ids) -> bool:
+    """Drop vectors by id where the index supports it; HNSW graphs and ID-mapped IVF
+    lists cannot, so callers must also mask removed ids out of searches"""
+    try:
+        index.remove_ids(np.asarray(ids, dtype=np.int64))
+        return True
+    except RuntimeError:
+        return False
+
+
+def reconstruct_vectors(index: faiss.Index, ids: np.ndarray) -> np.ndarray:
+    """Stored (normalized) vectors for the given ids; approximate for PQ indexes"""
+    return index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+
+def measure_recall(index: faiss.Index, embeddings: np.ndarray, k: int = 10, sample_size: int = 200,
+                   rescore_factor: int = 0) -> float:
+    """recall@k of index against exact search, using perturbed copies of sampled vectors as queries.
+
+    With rescore_factor, k * rescore_factor candidates are re-scored against
+    the full-precision vectors first, as the searcher does for lossy storage.
+    """
+    if (index_type_of(index) == INDEX_FLAT and not is_lossy(index)) or len(embeddings) == 0:
+        return 1.0
+
+    vectors = normalize_vectors(embeddings)
+    k = min(k, len(vectors))
+    queries = _recall_queries(vectors, sample_size)
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    exact_scores, _ = exact.search(queries, k)
+    if rescore_factor:
+        full_precision = FullPrecisionVectors(vectors)
+        scores, ids = index.search(queries, min(k * rescore_factor, len(vectors)))
+        approx_ids = [rescore_topk(query, row_scores, row_ids, full_precision, k)[1]
+                      for query, row_scores, row_ids in zip(queries, scores, ids)]
+    else:
+        _, approx_ids = index.search(queries, k)
+
+    # A hit is any result scoring at least the exact k-th score, so ties among equal vectors count
+    hits = 0
+    for query, ids, kth in zip(queries, approx_ids, exact_scores[:, -1]):
+        ids = np.asarray(ids)
+        ids = ids[ids >= 0]
+        hits += int(np.count_nonzero(vectors[ids] @ query >= kth - 1e-5))
+    return hits / float(exact_scores.size)
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """Size of the serialized index, about what it occupies in memory once loaded"""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def describe_index(index: faiss.Index, embeddings: np.ndarray, k: int = 10) -> Dict:
+    """Build-time report: index type, storage, memory footprint and recall@k against the exact index"""
+    info = {
+        'index_type': index_type_of(index),
+        'storage': storage_of(index),
+        'index_bytes': index_bytes(index),
+        'float32_bytes': int(index.ntotal) * int(index.d) * 4,
+        'recall_k': k,
+        'recall_at_k': round(measure_recall(index, embeddings, k), 4)
+    }
+    report = (f"Index type: {info['index_type']}, {info['storage']} storage, "
+              f"{info['index_bytes'] / 2 ** 20:.1f} MB (float32 vectors alone: {info['float32_bytes'] / 2 ** 20:.1f} MB), "
+              f"recall@{k} vs exact: {info['recall_at_k']:.3f}")
+    if is_lossy(index) and RESCORE_FACTOR:
+        info['recall_at_k_rescored'] = round(measure_recall(index, embeddings, k, rescore_factor=RESCORE_FACTOR), 4)
+        report += f", {info['recall_at_k_rescored']:.3f} re-scored"
+    logger.info(report)
+    return info
+
+
+class FullPrecisionVectors:
+    """Normalized float32 vectors by id, for re-scoring candidates of a lossy index.
+
+    A snapshot's vectors are memory-mapped from disk, so only rows that are
+    actually looked up are paged in (and shared between worker processes);
+    vectors added after the snapshot through the change log are kept in memory.
+    """
+
+    def __init__(self, stored: np.ndarray, appended: Optional[np.ndarray] = None):
+        self.stored = stored
+        self.appended = appended if appended is not None else np.zeros((0, stored.shape[1]), dtype=np.float32)
+
+    @staticmethod
+    def write(path: Path, vectors: np.ndarray):
+        np.save(path, normalize_vectors(vectors))
+
+    @classmethod
+    def open(cls, path: Path) -> 'FullPrecisionVectors':
+        return cls(np.load(path, mmap_mode='r'))
+
+    def __len__(self) -> int:
+        return len(self.stored) + len(self.appended)
+
+    def append(self, vectors: np.ndarray) -> 'FullPrecisionVectors':
+        """Copy with normalized vectors appended under the next ids"""
+        return FullPrecisionVectors(self.stored, np.vstack([self.appended, normalize_vectors(vectors)]))
+
+    def take(self, ids) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        stored = ids < len(self.stored)
+        if stored.all():
+            return np.asarray(self.stored[ids], dtype=np.float32)
+        vectors = np.empty((len(ids), self.stored.shape[1]), dtype=np.float32)
+        vectors[stored] = self.stored[ids[stored]]
+        vectors[~stored] = self.appended[ids[~stored] - len(self.stored)]
+        return vectors
+
+
+def rescore_topk(query: np.ndarray, scores: np.ndarray, ids: np.ndarray, vectors: FullPrecisionVectors, k: int,
+                 threshold: float = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (scores, ids) of the candidates by exact cosine against full-precision vectors"""
+    known = (ids >= 0) & (ids < len(vectors))
+    scores, ids = scores[known], ids[known]
+    if len(ids):
+        scores = vectors.take(ids) @ query.reshape(-1)
+    if threshold is not None:
+        keep = scores > threshold
+        scores, ids = scores[keep], ids[keep]
+    return _topk(scores, ids, k)
+
+
+def is_cosine_index(index: faiss.Index) -> bool:
+    return index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+
+def migrate_to_cosine(index: faiss.Index) -> faiss.Index:
+    """Rebuild a legacy IndexFlatL2 snapshot as an exact cosine index from its stored vectors"""
+    vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), dtype=np.float32)
+    return build_index(vectors, index.d, INDEX_FLAT, STORAGE_FLOAT32)
+
+
+def _topk(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(ids) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[top], ids[top]
+    order = np.argsort(-scores, kind='stable')
+    return scores[order], ids[order]
+
+
+def merge_topk(first: Tuple[np.ndarray, np.ndarray], second: Tuple[np.ndarray, np.ndarray],
+               k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (scores, ids) of two result sets over disjoint ids"""
+    return _topk(np.concatenate([first[0], second[0]]), np.concatenate([first[1], second[1]]), k)
+
+
+def range_search_topk(index: faiss.Index, query: np.ndarray, threshold: float, k: int, params=None,
+                      vectors: FullPrecisionVectors = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (scores, ids) among vectors whose cosine similarity exceeds threshold.
+
+    Range search returns exactly the candidates above the threshold, so there
+    is no over-fetching and nothing is discarded after the fact. Index types
+    without range search fall back to a k-NN search filtered by the threshold.
+    """
+    return range_search_topk_batch(index, query, threshold, k, params=params, vectors=vectors)[0]
+
+
+def range_search_topk_batch(index: faiss.Index, queries: np.ndarray, threshold: float, k: int,
+                            params=None, vectors: FullPrecisionVectors = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """range_search_topk for a matrix of queries in a single FAISS call, one (scores, ids) per row.
+
+    Given the full-precision vectors of a lossy index, k * RESCORE_FACTOR
+    candidates are fetched and re-ranked by their exact scores.
+    """
+    queries = normalize_vectors(queries)
+    if vectors is not None and RESCORE_FACTOR:
+        fetched = range_search_topk_batch(index, queries, threshold, k * RESCORE_FACTOR, params=params)
+        return [
+            rescore_topk(query, scores, ids, vectors, k, threshold)
+            for query, (scores, ids) in zip(queries, fetched)
+        ]
+    try:
+        lims, scores, ids = index.range_search(queries, threshold, params=params)
+        return [
+            _topk(scores[lims[row]:lims[row + 1]], ids[lims[row]:lims[row + 1]], k)
+            for row in range(len(queries))
+        ]
+    except RuntimeError:
+        scores, ids = index.search(queries, k, params=params)
+        results = []
+        for row_scores, row_ids in zip(scores, ids):
+            keep = (row_ids != -1) & (row_scores > threshold)
+            results.append(_topk(row_scores[keep], row_ids[keep], k))
+        return results
@@ -0,0 +1,114 @@
+# src/core/verse_lookup.py
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.utils.helpers import roman_to_int
+
+MAX_CHAPTER = 18
+
+_CHAPTER = r'(\d{1,2}|[IVXL]{1,6})'
+_VERSES = r'(\d{1,3})(?:\s*(?:-|–|to)\s*(\d{1,3}))?'
+
+# "chapter 2 verse 47", "ch. II, v. 47-48", "chapter 2, shlokas 47 to 50"
+CHAPTER_THEN_VERSE = re.compile(
+    rf'\b(?:chapter|ch\.?|adhyaya)\s*{_CHAPTER}\b[\s,:.-]*(?:verses?|v{{1,2}}\.?|sh?lokas?)\s*{_VERSES}',
+    re.IGNORECASE
+)
+# "verse 47 of chapter 2"
+VERSE_THEN_CHAPTER = re.compile(
+    rf'\b(?:verses?|v{{1,2}}\.?|sh?lokas?)\s*{_VERSES}\s*(?:of|in|from)\s*(?:the\s+)?(?:chapter|ch\.?)\s*{_CHAPTER}\b',
+    re.IGNORECASE
+)
+# "BG 2.47", "Gita 2:47-48", "verse 2.47"; a bare number needs a colon ("2:47"),
+# so decimals like "3.5" are not mistaken for references
+NUMERIC = re.compile(
+    rf'(?<![\d.])(?:(?:bg|gita|bhagavad[- ]gita|verses?)\s*(\d{{1,2}})[.:]|(\d{{1,2}}):){_VERSES}(?![\d.])',
+    re.IGNORECASE
+)
+CHUNK_ID = re.compile(r'^ch(\d+)_v(\d+)$')
+
+
+@dataclass
+class VerseReference:
+    chapter: int
+    verse_start: int
+    verse_end: int
+
+
+def _chapter_value(text: str) -> int:
+    return int(text) if text.isdigit() else roman_to_int(text)
+
+
+def parse_verse_reference(question: str) -> Optional[VerseReference]:
+    """Find an explicit chapter/verse reference in a question, if any"""
+    for pattern in (CHAPTER_THEN_VERSE, VERSE_THEN_CHAPTER, NUMERIC):
+        match = pattern.search(question)
+        if not match:
+            continue
+        if pattern is VERSE_THEN_CHAPTER:
+            start, end, chapter = match.groups()
+        elif pattern is NUMERIC:
+            prefixed_chapter, bare_chapter, start, end = match.groups()
+            chapter = prefixed_chapter or bare_chapter
+        else:
+            chapter, start, end = match.groups()
+
+        chapter = _chapter_value(chapter)
+        start = int(start)
+        end = int(end) if end else start
+        if 1 <= chapter <= MAX_CHAPTER and 1 <= start <= end:
+            return VerseReference(chapter, start, end)
+    return None
+
+
+class VerseIndex:
+    """(chapter, verse) -> chunk position, built from chunk ids of the form ch{n}_v{m}.
+
+    The chunker only gives that id to a chunk holding exactly one numbered
+    verse; unnumbered passages (ch{n}_p{m}) are never resolved, so a
+    reference either finds its verse or falls through to retrieval.
+    """
+
+    def __init__(self, positions: Dict[Tuple[int, int], int]):
+        self.positions = positions
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[Dict]) -> 'VerseIndex':
+        get_id = chunks.get_id if hasattr(chunks, 'get_id') else (lambda i: chunks[i].get('id', ''))
+        positions = {}
+        for i in range(len(chunks)):
+            match = CHUNK_ID.match(get_id(i))
+            if match:
+                # Keep the first chunk when an id repeats
+                positions.setdefault((int(match.group(1)), int(match.group(2))), i)
+        return cls(positions)
+
+    def update(self, chunks: Sequence[Dict], removed: Iterable[int], added: Iterable[int]) -> 'VerseIndex':
+        """Copy with the removed positions dropped and the added ones indexed; only
+        the ids at those positions are read"""
+        get_id = chunks.get_id if hasattr(chunks, 'get_id') else (lambda i: chunks[i].get('id', ''))
+        positions = dict(self.positions)
+        for i in removed:
+            match = CHUNK_ID.match(get_id(i))
+            key = (int(match.group(1)), int(match.group(2))) if match else None
+            if positions.get(key) == i:
+                del positions[key]
+        for i in added:
+            match = CHUNK_ID.match(get_id(i))
+            if match:
+                positions.setdefault((int(match.group(1)), int(match.group(2))), i)
+        return VerseIndex(positions)
+
+    def lookup(self, reference: VerseReference, neighbours: int = 0) -> List[Tuple[int, bool]]:
+        """Chunk positions (position, is_requested) for the referenced verses plus neighbours, in verse order"""
+        results = []
+        for verse in range(reference.verse_start - neighbours, reference.verse_end + neighbours + 1):
+            position = self.positions.get((reference.chapter, verse))
+            if position is not None:
+                requested = reference.verse_start <= verse <= reference.verse_end
+                results.append((position, requested))
+        if not any(requested for _, requested in results):
+            return []
+        return results
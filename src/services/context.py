@@ -0,0 +1,155 @@
+# src/services/context.py
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+VERSE_ID = re.compile(r'^ch(\d+)_v(\d+)$')
+# Unnumbered passages of a chapter (a speech or stanza, not verse m)
+PASSAGE_ID = re.compile(r'^ch(\d+)_p(\d+)$')
+CHAPTER_HEADER_ID = re.compile(r'^ch(\d+)_header$')
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count; about four characters per token for English prose"""
+    return math.ceil(len(text) / chars_per_token)
+
+
+@dataclass
+class _Piece:
+    rank: int
+    chunk_id: str
+    content: str
+    chapter: Optional[int] = None
+    verse: Optional[int] = None
+    passage: Optional[int] = None
+    # Set when even the citation header did not fit the budget
+    headerless: bool = False
+
+    @property
+    def position(self) -> Optional[tuple]:
+        """(kind, chapter, number) for verses and passages, which merge with their successors"""
+        if self.headerless:
+            return None
+        if self.verse is not None:
+            return ('verse', self.chapter, self.verse)
+        if self.passage is not None:
+            return ('passage', self.chapter, self.passage)
+        return None
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    chunk_ids: List[str] = field(default_factory=list)
+    tokens: int = 0
+    truncated: bool = False
+
+
+class ContextAssembler:
+    """Packs retrieved chunks into a token budget for the generation prompt.
+
+    Chunks are taken greedily in ranking order; a chunk that does not fit is
+    trimmed to the space left, or skipped when less than min_chunk_tokens
+    remain, so smaller lower-ranked ones can still use the space. Verses (or
+    passages) that end up adjacent in the same chapter share one citation header.
+    """
+
+    def __init__(self, max_tokens: int = None, chars_per_token: float = None, min_chunk_tokens: int = None):
+        self.max_tokens = max_tokens or int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+        self.chars_per_token = chars_per_token or float(os.getenv('CONTEXT_CHARS_PER_TOKEN', '4'))
+        self.min_chunk_tokens = min_chunk_tokens or int(os.getenv('CONTEXT_MIN_CHUNK_TOKENS', '64'))
+
+    def _tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    @staticmethod
+    def _piece(rank: int, chunk_id: str, content: str) -> _Piece:
+        match = VERSE_ID.match(chunk_id)
+        if match:
+            return _Piece(rank, chunk_id, content, int(match.group(1)), verse=int(match.group(2)))
+        match = PASSAGE_ID.match(chunk_id)
+        if match:
+            return _Piece(rank, chunk_id, content, int(match.group(1)), passage=int(match.group(2)))
+        return _Piece(rank, chunk_id, content)
+
+    @staticmethod
+    def _label(pieces: List[_Piece]) -> str:
+        first = pieces[0]
+        if first.verse is not None:
+            if len(pieces) == 1:
+                return f"[Chapter {first.chapter}, verse {first.verse}]"
+            return f"[Chapter {first.chapter}, verses {first.verse}-{pieces[-1].verse}]"
+        # A passage spans an unknown range of verses, so it is cited by chapter only
+        if first.chapter is not None:
+            return f"[Chapter {first.chapter}]"
+        match = CHAPTER_HEADER_ID.match(first.chunk_id)
+        if match:
+            return f"[Chapter {match.group(1)}]"
+        return f"[{first.chunk_id.rsplit('_', 1)[0].replace('_', ' ').title()}]"
+
+    def _truncate(self, content: str, max_tokens: int) -> str:
+        # Leave room for the ellipsis
+        max_chars = max(int(max_tokens * self.chars_per_token) - 2, 0)
+        cut = content.rfind(' ', 0, max_chars)
+        return content[:cut if cut > 0 else max_chars].rstrip() + " …"
+
+    def _merge(self, pieces: List[_Piece]) -> List[List[_Piece]]:
+        """Group runs of consecutive verses (or passages) from one chapter; blocks keep the rank of their best chunk"""
+        positioned = sorted((piece for piece in pieces if piece.position is not None), key=lambda p: p.position)
+        blocks: List[List[_Piece]] = []
+        for piece in positioned:
+            previous = blocks[-1][-1].position if blocks else None
+            kind, chapter, number = piece.position
+            if previous == (kind, chapter, number - 1):
+                blocks[-1].append(piece)
+            else:
+                blocks.append([piece])
+        blocks.extend([piece] for piece in pieces if piece.position is None)
+        return sorted(blocks, key=lambda block: min(piece.rank for piece in block))
+
+    def assemble(self, context_chunks: List[str], chunk_ids: Optional[List[str]] = None) -> AssembledContext:
+        """context_chunks are in ranking order (best first), chunk_ids alongside them"""
+        if chunk_ids is None:
+            chunk_ids = [f"context_{i}" for i in range(len(context_chunks))]
+
+        selected: List[_Piece] = []
+        used = 0
+        truncated = False
+        for rank, (chunk_id, content) in enumerate(zip(chunk_ids, context_chunks)):
+            piece = self._piece(rank, chunk_id, content.strip())
+            # Budget each chunk with its own header; merging only ever saves headers
+            header_cost = self._tokens(self._label([piece])) + 1
+            cost = header_cost + self._tokens(piece.content)
+            if used + cost <= self.max_tokens:
+                selected.append(piece)
+                used += cost
+                continue
+            # Trim to the space left; the best chunk is always kept, so the context is never empty
+            space = self.max_tokens - used - header_cost
+            if space >= self.min_chunk_tokens or (not selected and space > 0):
+                piece.content = self._truncate(piece.content, space)
+                selected.append(piece)
+                used += header_cost + self._tokens(piece.content)
+                truncated = True
+            elif not selected:
+                # Not even the best chunk's header fits: keep its text without one
+                if self._tokens(piece.content) > self.max_tokens:
+                    piece.content = self._truncate(piece.content, self.max_tokens)
+                    truncated = True
+                piece.headerless = True
+                selected.append(piece)
+                used += self._tokens(piece.content)
+
+        sections = []
+        for block in self._merge(selected):
+            body = "\n".join(piece.content for piece in block)
+            sections.append(body if block[0].headerless else self._label(block) + "\n" + body)
+        text = "\n\n".join(sections)
+        return AssembledContext(
+            text=text,
+            chunk_ids=[piece.chunk_id for piece in sorted(selected, key=lambda p: p.rank)],
+            tokens=self._tokens(text),
+            truncated=truncated
+        )
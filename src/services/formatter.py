@@ -0,0 +1,113 @@
+# src/services/formatter.py
+from typing import List, Optional, Tuple
+
+
+class ResponseFormatter:
+    """Incremental, line-oriented markdown formatter for Gemini answers.
+
+    Text can be fed in arbitrary fragments; only complete lines are formatted,
+    so verse blocks and speaker prefixes split across fragments come out the
+    same as when the whole answer is formatted at once. Leading and trailing
+    whitespace of the answer is dropped, matching response.text.strip().
+    """
+
+    SPEAKERS = ['Krishna:', 'Arjuna:', 'Sanjaya:', 'Dhritirashtra:']
+    SANSKRIT_MARKERS = ['[Sanskrit]', '(Sanskrit)']
+
+    def __init__(self):
+        self._buffer = ""
+        self._started = False
+        self._emitted_any = False
+        self._in_verse_block = False
+        # Whitespace-only lines are held back until we know they are not trailing
+        self._pending_blank_lines: List[str] = []
+        # A line ending in whitespace formats differently if it is the last one (the
+        # whitespace is stripped then), so it waits with its blank lines for more text
+        self._held: Optional[Tuple[List[str], str]] = None
+
+    def _format_line(self, line: str) -> List[str]:
+        if line.strip().startswith('Chapter') or line.strip().startswith('Verse'):
+            if not self._in_verse_block:
+                self._in_verse_block = True
+                return ['```verse', line]
+            return [line]
+        # Handle Sanskrit terms
+        if any(sanskrit_marker in line for sanskrit_marker in self.SANSKRIT_MARKERS):
+            return [f"*{line}*"]
+
+        if self._in_verse_block and line.strip() == '':
+            self._in_verse_block = False
+            return ['```', '']
+
+        for speaker in self.SPEAKERS:
+            if line.strip().startswith(speaker):
+                line = f"**{speaker}** {line[len(speaker):]}"
+        return [line]
+
+    def _emit(self, lines: List[str]) -> str:
+        output = []
+        for line in lines:
+            for formatted in self._format_line(line):
+                output.append(formatted if not self._emitted_any else '\n' + formatted)
+                self._emitted_any = True
+        return ''.join(output)
+
+    def _release(self) -> str:
+        if self._held is None:
+            return ""
+        (pending, line), self._held = self._held, None
+        return self._emit(pending + [line])
+
+    def _emit_content_line(self, line: str) -> str:
+        output = self._release()
+        pending, self._pending_blank_lines = self._pending_blank_lines, []
+        if line != line.rstrip():
+            self._held = (pending, line)
+            return output
+        return output + self._emit(pending + [line])
+
+    def feed(self, text: str) -> str:
+        """Add a fragment and return the formatted text of any lines it completed"""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+
+        self._buffer += text
+        last_newline = self._buffer.rfind('\n')
+        if last_newline == -1:
+            return ""
+
+        complete, self._buffer = self._buffer[:last_newline], self._buffer[last_newline + 1:]
+        output = []
+        for line in complete.split('\n'):
+            if line.strip() == '':
+                self._pending_blank_lines.append(line)
+            else:
+                output.append(self._emit_content_line(line))
+        if self._buffer.strip():
+            output.append(self._release())
+        return ''.join(output)
+
+    def flush(self) -> str:
+        """Format the final partial line and close an open verse block"""
+        output = []
+        last_line = self._buffer.rstrip()
+        self._buffer = ""
+        if last_line:
+            output.append(self._emit_content_line(last_line))
+        elif self._held is not None:
+            (pending, line), self._held = self._held, None
+            output.append(self._emit(pending + [line.rstrip()]))
+        elif not self._emitted_any:
+            output.append(self._emit(['']))
+        self._pending_blank_lines = []
+
+        if self._in_verse_block:
+            output.append('\n```')
+            self._in_verse_block = False
+        return ''.join(output)
+
+    def format(self, text: str) -> str:
+        return self.feed(text) + self.flush()
@@ -1,98 +1,231 @@
 # src/services/gemini.py
-import google.generativeai as genai
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
+import threading
+import time
+import numpy as np
 from src.utils.logger import get_logger
-import os
+from src.utils.cache import create_cache
+from src.utils.semantic_cache import create_semantic_cache
+from src.utils.helpers import normalize_query
+from src.utils.metrics import ERRORS, LLM_TOKENS, observe_stage, span
+from src.services.formatter import ResponseFormatter
+from src.services.context import ContextAssembler, estimate_tokens
+from src.services.llm_backend import get_generative_model
+from src.core.verse_lookup import parse_verse_reference
+import hashlib
 
 logger = get_logger(__name__)
 
+# Kept compact: every token here is paid on every request
+PROMPT_TEMPLATE = """You are a knowledgeable assistant for the Bhagavad Gita.
+
+Context from the Bhagavad Gita (each block starts with its citation):
+```
+{context}
+```
+
+Guidelines:
+- Answer the question directly, citing the chapter (and verse only where its header gives one) and speaker.
+- Explain Sanskrit terms and connect verses to their wider philosophical meaning.
+- Give practical interpretations for modern life where relevant.
+- Use markdown.
+
+Question: {question}
+
+Explain both the literal meaning and the deeper significance where appropriate."""
+
 class GeminiService:
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-            
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        # Created on first use: importing google.generativeai alone takes about a second
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.answer_cache = create_cache("ANSWER_CACHE", default_size=512, default_ttl=3600)
+        self.semantic_cache = create_semantic_cache()
+        self.context_assembler = ContextAssembler()
         
         logger.info("Initialized Gemini service")
 
-    def _prepare_prompt(self, question: str, context_chunks: List[str]) -> str:
-        context_text = "\n".join(context_chunks)
-        
-        prompt = f"""You are a knowledgeable assistant for the Bhagavad Gita, focusing on providing 
-        clear and insightful explanations of its teachings, verses, and philosophical concepts.
-
-        Context from the Bhagavad Gita:
-        ```
-        {context_text}
-        ```
-
-        Guidelines:
-        1. Directly address the user's question about the Gita's teachings.
-        2. If the question involves specific verses, cite them and provide their context.
-        3. Explain Sanskrit terms when they appear in the text.
-        4. Connect verses to their broader philosophical or spiritual context.
-        5. If relevant, mention which chapter (and speaker) the teaching comes from.
-        6. Provide practical interpretations that relate to modern life.
-        7. When appropriate, reference related verses that support or expand the teaching.
-        8. Maintain proper formatting for verse citations and Sanskrit terms.
-        9. Use markdown for better readability.
-       
-
-        Question: {question}
-
-        Provide a clear explanation, citing specific verses where relevant. Include both the literal 
-        meaning and the deeper philosophical significance when appropriate."""
-        
-        return prompt
+    @property
+    def model(self):
+        # LLM_BACKEND=fake swaps Gemini for a deterministic local model (tests, benchmarks)
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = get_generative_model()
+        return self._model
+
+    def warm_up(self):
+        """Create the model ahead of the first request"""
+        self.model
+
+    def _cache_key(self, question: str, chunk_uids: List[str]) -> str:
+        # uids are content-derived: an upserted chunk keeps its id but not its uid
+        key_source = normalize_query(question) + "\0" + "\0".join(chunk_uids)
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    def invalidate_cache(self):
+        """Drop cached answers, e.g. after the index snapshot changed"""
+        self.answer_cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+        logger.info("Answer cache invalidated")
+
+    def cache_stats(self) -> dict:
+        stats = {"answer_cache": self.answer_cache.stats()}
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.stats()
+        return stats
 
-    def get_answer(self, question: str, context_chunks: List[str]) -> str:
+    @staticmethod
+    def _semantic_scope(question: str, scope: str) -> str:
+        # "chapter 2 verse 47" and "chapter 2 verse 48" embed almost identically
+        # but must not share an answer
+        reference = parse_verse_reference(question)
+        if reference is None:
+            return scope
+        return f"{scope}|{reference.chapter}:{reference.verse_start}-{reference.verse_end}"
+
+    def _cached_answer(self, question: str, chunk_uids: Optional[List[str]],
+                       question_embedding: Optional[np.ndarray], scope: str) -> Tuple[Optional[str], Optional[str]]:
+        """(cached answer or None, exact cache key); tries the exact key, then similar past questions"""
+        cache_key = self._cache_key(question, chunk_uids) if chunk_uids is not None else None
+        if cache_key:
+            cached_answer = self.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                return cached_answer, cache_key
+        if question_embedding is not None and self.semantic_cache is not None:
+            cached_answer = self.semantic_cache.get(question_embedding, self._semantic_scope(question, scope))
+            if cached_answer is not None:
+                return cached_answer, cache_key
+        return None, cache_key
+
+    def _remember(self, question: str, answer: str, cache_key: Optional[str],
+                  question_embedding: Optional[np.ndarray], scope: str):
+        if cache_key:
+            self.answer_cache.set(cache_key, answer)
+        if question_embedding is not None and self.semantic_cache is not None:
+            self.semantic_cache.set(question_embedding, answer, self._semantic_scope(question, scope))
+
+    @staticmethod
+    def _count_tokens(prompt: str, answer: str, response=None):
+        """Token usage reported by the model, else estimated from the text"""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt)
+        completion_tokens = getattr(usage, 'candidates_token_count', None) or estimate_tokens(answer)
+        LLM_TOKENS.inc(prompt_tokens, direction='prompt')
+        LLM_TOKENS.inc(completion_tokens, direction='completion')
+
+    def _prepare_prompt(self, question: str, context_chunks: List[str], chunk_ids: Optional[List[str]] = None) -> str:
+        context = self.context_assembler.assemble(context_chunks, chunk_ids)
+        return PROMPT_TEMPLATE.format(context=context.text, question=question)
+
+    def get_answer(self, question: str, context_chunks: List[str], chunk_ids: Optional[List[str]] = None,
+                   chunk_uids: Optional[List[str]] = None, question_embedding: Optional[np.ndarray] = None, scope: str = "",
+                   timings: Optional[Dict[str, float]] = None) -> str:
+        """chunk_uids (the retrieved chunks' uids) key the exact answer cache;
+        question_embedding enables the semantic cache; scope (e.g. the search filters)
+        keeps answers from being shared between differently scoped questions.
+        Pass timings to get the milliseconds spent in each stage."""
         try:
-            prompt = self._prepare_prompt(question, context_chunks)
-            response = self.model.generate_content(prompt)
-            answer = response.text.strip()
+            # Answers are cached per question + retrieved chunks, and per similar question;
+            # a hit skips prompt building and formatting
+            with span('answer_cache', timings):
+                cached_answer, cache_key = self._cached_answer(question, chunk_uids, question_embedding, scope)
+            if cached_answer is not None:
+                return cached_answer
+
+            with span('prompt', timings):
+                prompt = self._prepare_prompt(question, context_chunks, chunk_ids)
+            with span('generate', timings):
+                response = self.model.generate_content(prompt)
+                answer = response.text.strip()
+            self._count_tokens(prompt, answer, response)
             
             # Format the answer with proper markdown
-            answer = self._format_response(answer)
+            with span('format', timings):
+                answer = self._format_response(answer)
             
+            self._remember(question, answer, cache_key, question_embedding, scope)
             return answer
             
         except Exception as e:
             logger.error(f"Gemini API error: {str(e)}")
             raise
 
+    async def aget_answer(self, question: str, context_chunks: List[str], chunk_ids: Optional[List[str]] = None,
+                          chunk_uids: Optional[List[str]] = None, question_embedding: Optional[np.ndarray] = None, scope: str = "",
+                          timings: Optional[Dict[str, float]] = None) -> str:
+        """Async variant of get_answer for the ASGI app"""
+        try:
+            with span('answer_cache', timings):
+                cached_answer, cache_key = self._cached_answer(question, chunk_uids, question_embedding, scope)
+            if cached_answer is not None:
+                return cached_answer
+
+            with span('prompt', timings):
+                prompt = self._prepare_prompt(question, context_chunks, chunk_ids)
+            with span('generate', timings):
+                response = await self.model.generate_content_async(prompt)
+                answer = response.text.strip()
+            self._count_tokens(prompt, answer, response)
+            with span('format', timings):
+                answer = self._format_response(answer)
+
+            self._remember(question, answer, cache_key, question_embedding, scope)
+            return answer
+
+        except Exception as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise
+
+    def stream_answer(self, question: str, context_chunks: List[str], chunk_ids: Optional[List[str]] = None,
+                      chunk_uids: Optional[List[str]] = None, question_embedding: Optional[np.ndarray] = None, scope: str = "") -> Iterator[str]:
+        """Yield formatted answer fragments as Gemini generates them"""
+        with span('answer_cache'):
+            cached_answer, cache_key = self._cached_answer(question, chunk_uids, question_embedding, scope)
+        if cached_answer is not None:
+            yield cached_answer
+            return
+
+        with span('prompt'):
+            prompt = self._prepare_prompt(question, context_chunks, chunk_ids)
+
+        try:
+            formatter = ResponseFormatter()
+            fragments = []
+            texts = []
+            chunk = None
+
+            start = time.perf_counter()
+            for chunk in self.model.generate_content(prompt, stream=True):
+                # Chunks without text parts (e.g. safety metadata) raise on .text
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if not texts:
+                    observe_stage('first_token', time.perf_counter() - start)
+                texts.append(text)
+                fragment = formatter.feed(text)
+                if fragment:
+                    fragments.append(fragment)
+                    yield fragment
+
+            fragment = formatter.flush()
+            if fragment:
+                fragments.append(fragment)
+                yield fragment
+
+            # Includes the time the client took to read each fragment
+            observe_stage('generate', time.perf_counter() - start)
+            # The last streamed chunk carries the usage metadata for the whole answer
+            self._count_tokens(prompt, ''.join(texts), chunk)
+            self._remember(question, ''.join(fragments), cache_key, question_embedding, scope)
+
+        except Exception as e:
+            ERRORS.inc(stage='generate')
+            logger.error(f"Gemini API error: {str(e)}")
+            raise
+
     def _format_response(self, text: str) -> str:
-        
-        lines = text.split('\n')
-        formatted_lines = []
-        in_verse_block = False
-        
-        for line in lines:
-            
-            if line.strip().startswith('Chapter') or line.strip().startswith('Verse'):
-                if not in_verse_block:
-                    formatted_lines.extend(['```verse', line])
-                    in_verse_block = True
-                else:
-                    formatted_lines.append(line)
-            # Handle Sanskrit terms
-            elif any(sanskrit_marker in line for sanskrit_marker in ['[Sanskrit]', '(Sanskrit)']):
-                formatted_lines.append(f"*{line}*")
-            
-            elif in_verse_block and line.strip() == '':
-                formatted_lines.extend(['```', ''])
-                in_verse_block = False
-            
-            else:
-                
-                for speaker in ['Krishna:', 'Arjuna:', 'Sanjaya:', 'Dhritirashtra:']:
-                    if line.strip().startswith(speaker):
-                        line = f"**{speaker}** {line[len(speaker):]}"
-                formatted_lines.append(line)
-        
-        
-        if in_verse_block:
-            formatted_lines.append('```')
-            
-        return '\n'.join(formatted_lines)
+        return ResponseFormatter().format(text)
@@ -5,10 +5,17 @@ import uuid
 from dotenv import load_dotenv
 import json
 import os
+import re
+import unicodedata
+import zlib
 from .logger import get_logger
 load_dotenv()
 logger = get_logger(__name__)
 
+# Fraction of requests whose request and response bodies are logged, and their size cap
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.1'))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', '2000'))
+
 def create_metadata(additional_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     
     metadata = {
@@ -24,47 +31,75 @@ def create_metadata(additional_data: Optional[Dict[str, Any]] = None) -> Dict[st
     
     return metadata
 
+def _payload_sampled(request_id: str) -> bool:
+    """Decided by the request id, so a request and its response are logged together"""
+    return zlib.crc32(request_id.encode('utf-8')) < LOG_PAYLOAD_SAMPLE_RATE * 2 ** 32
+
+_payload_encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+
+def _payload(log_data: Dict[str, Any]) -> str:
+    """JSON of log_data, encoded incrementally and only up to LOG_PAYLOAD_MAX_CHARS"""
+    parts = []
+    size = 0
+    for part in _payload_encoder.iterencode(log_data):
+        parts.append(part)
+        size += len(part)
+        if size > LOG_PAYLOAD_MAX_CHARS:
+            return f"{''.join(parts)[:LOG_PAYLOAD_MAX_CHARS]}... [truncated]"
+    return ''.join(parts)
+
 def log_request(endpoint: str, data: Dict[str, Any]) -> str:
     
     request_id = str(uuid.uuid4())
-    
-    log_data = {
-        "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
-        "endpoint": endpoint,
-        "request_id": request_id,
-        "user": os.getenv("GITHUB_USER", "ravi-hisoka"),
-        "data": data
-    }
-    
+    message = f"Incoming request to {endpoint}"
+    extra = {"request_id": request_id, "log_type": "request"}
 
-    logger.info(
-        f"Incoming request to {endpoint}",
-        extra={
+    # Bodies are only serialized for sampled requests
+    if _payload_sampled(request_id):
+        extra["data"] = _payload({
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            "endpoint": endpoint,
             "request_id": request_id,
-            "log_type": "request",
-            "data": json.dumps(log_data)
-        }
-    )
-    
+            "user": os.getenv("GITHUB_USER", "ravi-hisoka"),
+            "data": data
+        })
+        message = f"{message}: {extra['data']}"
+
+    logger.info(message, extra=extra)
     return request_id
 
 def log_response(request_id: str, response_data: Dict[str, Any]) -> None:
     
-    log_data = {
-        "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
-        "request_id": request_id,
-        "response": response_data
-    }
-    
+    message = "Outgoing response"
+    extra = {"request_id": request_id, "log_type": "response"}
 
-    logger.info(
-        "Outgoing response",
-        extra={
+    if _payload_sampled(request_id):
+        extra["data"] = _payload({
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
             "request_id": request_id,
-            "log_type": "response",
-            "data": json.dumps(log_data)
-        }
-    )
+            "response": response_data
+        })
+        message = f"{message}: {extra['data']}"
+
+    logger.info(message, extra=extra)
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a user query used for cache lookups"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.strip(' ?!.,;:"\'')
+
+def roman_to_int(roman_numeral: str) -> int:
+    """Convert a Roman numeral (e.g. 'XVIII') to an integer"""
+    roman_values = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100}
+    roman_numeral = roman_numeral.upper()
+    integer_value = 0
+    for i in range(len(roman_numeral)):
+        if i > 0 and roman_values[roman_numeral[i]] > roman_values[roman_numeral[i-1]]:
+            integer_value += roman_values[roman_numeral[i]] - 2 * roman_values[roman_numeral[i-1]]
+        else:
+            integer_value += roman_values[roman_numeral[i]]
+    return integer_value
 
 def sanitize_log_data(data: Dict[str, Any]) -> Dict[str, Any]:
     
@@ -1,39 +1,103 @@
 # utils/logger.py
+import atexit
 import logging
 import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from typing import List, Optional
+
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Hand records to a background writer thread so requests never wait on disk
+LOG_ASYNC = os.getenv('LOG_ASYNC', '1') == '1'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# 0 logs to stderr only, e.g. in a container whose runtime collects it
+LOG_FILES = os.getenv('LOG_FILES', '1') == '1'
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s  - %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the writer falls behind"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handlers: Optional[List[logging.Handler]] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def _output_handlers() -> List[logging.Handler]:
+    formatter = logging.Formatter(FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+
+    # Every gunicorn worker appends to the same files, so none of them rotates:
+    # an external logrotate renames the file and each process reopens it on its next write
+    if LOG_FILES:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        efh = WatchedFileHandler(os.path.join(LOG_DIR, 'error.log'), encoding='utf-8')
+        efh.setLevel(logging.ERROR)
+        handlers += [WatchedFileHandler(os.path.join(LOG_DIR, 'app.log'), encoding='utf-8'), efh]
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener():
+    global _listener
+    _queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    """Flush queued records; runs at exit"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _setup() -> List[logging.Handler]:
+    """Handlers shared by every logger; created once per process"""
+    global _handlers, _queue_handler
+    if _handlers is None:
+        with _setup_lock:
+            if _handlers is None:
+                if LOG_ASYNC:
+                    _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+                    _handlers = _output_handlers()
+                    _start_listener()
+                    atexit.register(_stop_listener)
+                    # The writer thread does not survive fork (gunicorn --preload), so each child starts its own
+                    os.register_at_fork(after_in_child=_start_listener)
+                else:
+                    _handlers = _output_handlers()
+    return [_queue_handler] if LOG_ASYNC else _handlers
+
+
+def dropped_records() -> int:
+    """Records discarded because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
 
 def get_logger(name: str) -> logging.Logger:
 
     logger = logging.getLogger(name)
-    
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
 
-        os.makedirs('logs', exist_ok=True)
-        
+    if not logger.handlers:
+        logger.setLevel(LOG_LEVEL)
+        for handler in _setup():
+            logger.addHandler(handler)
 
-        fh = logging.FileHandler('logs/app.log')
-        fh.setLevel(logging.INFO)
-        
-   
-        efh = logging.FileHandler('logs/error.log')
-        efh.setLevel(logging.ERROR)
-        
-   
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.INFO)
-
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s  - %(message)s'
-        )
-        
-        fh.setFormatter(formatter)
-        efh.setFormatter(formatter)
-        ch.setFormatter(formatter)
-        
-        logger.addHandler(fh)
-        logger.addHandler(efh)
-        logger.addHandler(ch)
-        
     return logger
@@ -0,0 +1,226 @@
+# utils/metrics.py
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.utils.logger import dropped_records
+
+# Seconds; spans from sub-millisecond FAISS searches up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (metric name, type, help, labels, value) produced at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield self.name, self._labels(key), value
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._series[self._key(labels)] = float(value)
+
+    def samples(self):
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield self.name, self._labels(key), value
+
+
+class Histogram(_Metric):
+    """Fixed buckets; an observation is one bisect and three additions under a lock"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        bucket = bisect.bisect_left(self.buckets, value)
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Counters, gauges and histograms are updated on the request path;
+    collectors are callbacks that report values other components already
+    keep (cache hit counts, index size) when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str] = (), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, collect: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        collected: Dict[str, List[Sample]] = {}
+        for collect in self._collectors:
+            try:
+                for sample in collect():
+                    collected.setdefault(sample[0], []).append(sample)
+            except Exception as e:
+                lines.append(f'# collector error: {_escape(e)}')
+        for name, samples in collected.items():
+            lines.append(f'# HELP {name} {samples[0][2]}')
+            lines.append(f'# TYPE {name} {samples[0][1]}')
+            for _, _, _, labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUESTS = REGISTRY.counter('gita_requests_total', 'HTTP requests by endpoint and status', ('endpoint', 'status'))
+REQUEST_DURATION = REGISTRY.histogram('gita_request_duration_seconds', 'HTTP request latency', ('endpoint',))
+STAGE_DURATION = REGISTRY.histogram('gita_stage_duration_seconds', 'Latency of each pipeline stage', ('stage',))
+ERRORS = REGISTRY.counter('gita_errors_total', 'Failures by pipeline stage', ('stage',))
+LLM_TOKENS = REGISTRY.counter('gita_llm_tokens_total', 'LLM tokens by direction (prompt or completion)', ('direction',))
+
+
+def _collect_logging_metrics():
+    yield 'gita_log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full', {}, dropped_records()
+
+
+REGISTRY.add_collector(_collect_logging_metrics)
+
+# Server-Timing header on every API response (stage durations for this request)
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', '0') == '1'
+
+
+def observe_stage(stage: str, seconds: float, timings: Optional[Dict[str, float]] = None):
+    """Record a stage duration; also adds the milliseconds to timings[stage] when given"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None):
+    """Time the enclosed block as stage; exceptions also count as errors of that stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, timings)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Server-Timing header value, e.g. "embed;dur=12.1, retrieve;dur=0.8" """
+    return ', '.join(f'{stage};dur={ms:.1f}' for stage, ms in timings.items())
+
+
+def cache_samples(cache: str, stats: Dict) -> Iterator[Sample]:
+    """Hit, miss and size samples from a cache's stats(), flat or split per tier"""
+    tiers = [('local', stats)] if 'hits' in stats else stats.items()
+    for tier, tier_stats in tiers:
+        labels = {'cache': cache, 'tier': tier}
+        yield 'gita_cache_hits_total', 'counter', 'Cache hits', labels, tier_stats['hits']
+        yield 'gita_cache_misses_total', 'counter', 'Cache misses', labels, tier_stats['misses']
+        yield 'gita_cache_entries', 'gauge', 'Entries held by the cache', labels, tier_stats['size']
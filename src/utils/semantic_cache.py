@@ -0,0 +1,130 @@
+# utils/semantic_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+
+class SemanticCache:
+    """Answers keyed by question embedding instead of question text.
+
+    A small inner-product FAISS index (IndexIDMap2 over normalized vectors) holds
+    the embeddings of past questions; a lookup whose cosine similarity to a stored
+    question reaches the threshold returns that question's value. Entries carry a
+    scope string and only match lookups with the same scope, e.g. the same filters.
+    Eviction is LRU with an optional TTL.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_size: int = 1024, ttl: Optional[float] = 3600,
+                 candidates: int = 4):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        # Neighbours checked per lookup, in case the nearest is expired or out of scope
+        self.candidates = candidates
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_similarity_total = 0.0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _remove(self, entry_ids):
+        ids = np.asarray(list(entry_ids), dtype=np.int64)
+        if len(ids):
+            self._index.remove_ids(ids)
+            for entry_id in ids.tolist():
+                self._entries.pop(entry_id, None)
+
+    def get(self, embedding: np.ndarray, scope: str = "") -> Optional[Any]:
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0 or self._index.d != vector.shape[1]:
+                self.misses += 1
+                return None
+
+            scores, ids = self._index.search(vector, min(self.candidates, self._index.ntotal))
+            expired = []
+            for score, entry_id in zip(scores[0].tolist(), ids[0].tolist()):
+                if entry_id == -1 or score < self.threshold:
+                    break
+                value, entry_scope, expires_at = self._entries[entry_id]
+                if expires_at is not None and expires_at < now:
+                    expired.append(entry_id)
+                    continue
+                if entry_scope != scope:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self._remove(expired)
+                self.hits += 1
+                self.hit_similarity_total += score
+                return value
+
+            self._remove(expired)
+            self.misses += 1
+            return None
+
+    def set(self, embedding: np.ndarray, value: Any, scope: str = ""):
+        vector = self._normalize(embedding)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if self._index is None or self._index.d != vector.shape[1]:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                self._entries.clear()
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (value, scope, expires_at)
+
+            overflow = len(self._entries) - self.max_size
+            if overflow > 0:
+                self._remove(list(self._entries)[:overflow])
+                self.evictions += overflow
+
+    def clear(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.reset()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": "faiss",
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "mean_hit_similarity": round(self.hit_similarity_total / self.hits, 4) if self.hits else None
+        }
+
+
+def create_semantic_cache(prefix: str = "SEMANTIC_CACHE") -> Optional[SemanticCache]:
+    """Build from <PREFIX> (0 disables), <PREFIX>_THRESHOLD, <PREFIX>_SIZE and <PREFIX>_TTL"""
+    if os.getenv(prefix, '1') == '0':
+        return None
+    return SemanticCache(
+        threshold=float(os.getenv(f"{prefix}_THRESHOLD", '0.95')),
+        max_size=int(os.getenv(f"{prefix}_SIZE", '1024')),
+        ttl=float(os.getenv(f"{prefix}_TTL", '3600'))
+    )
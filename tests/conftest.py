@@ -0,0 +1,36 @@
+# tests/conftest.py
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Local stand-ins for Gemini, set before any application module reads them
+os.environ.update({
+    'EMBEDDING_BACKEND': 'fake',
+    'LLM_BACKEND': 'fake',
+    # Fake embeddings are hashes with no semantic similarity; BM25 makes retrieval meaningful
+    'SEARCH_MODE': 'hybrid',
+    'GEMINI_API_KEY': 'test',
+    'EMBEDDING_CACHE': '0',
+    'SEMANTIC_CACHE': '0',
+    'INDEX_REFRESH_INTERVAL': '3600',
+    'FAST_START': '0',
+    'LOG_ASYNC': '0',
+    'LOG_DIR': os.path.join(tempfile.gettempdir(), 'gita-test-logs'),
+})
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope='session')
+def workspace(tmp_path_factory):
+    """Throwaway working directory holding data/raw/gita.md; the app resolves data/ against the cwd"""
+    path = tmp_path_factory.mktemp('workspace')
+    (path / 'data' / 'raw').mkdir(parents=True)
+    shutil.copy(REPO_ROOT / 'data' / 'raw' / 'gita.md', path / 'data' / 'raw' / 'gita.md')
+    previous = os.getcwd()
+    os.chdir(path)
+    yield path
+    os.chdir(previous)
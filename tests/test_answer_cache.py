@@ -0,0 +1,19 @@
+# tests/test_answer_cache.py
+from src.services.gemini import GeminiService
+from src.services.llm_backend import FakeGenerativeModel
+
+
+def test_answer_cache_keys_on_chunk_content_not_ids():
+    service = GeminiService()
+    service._model = FakeGenerativeModel()
+    ask = lambda content, uid: service.get_answer(
+        "What is karma yoga?", [content], chunk_ids=['ch3_v8'], chunk_uids=[uid]
+    )
+
+    first = ask("8. Do thou thy allotted work.", 'a1b2c3d4e5f60708')
+    assert ask("8. Do thou thy allotted work.", 'a1b2c3d4e5f60708') == first
+    assert service.model.calls == 1
+
+    # Same id after an upsert rewrote the passage: a new uid, so a fresh answer
+    ask("8. Perform thy bounden duty.", '0f1e2d3c4b5a6978')
+    assert service.model.calls == 2
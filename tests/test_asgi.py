@@ -0,0 +1,48 @@
+# tests/test_asgi.py
+import asyncio
+import threading
+
+
+def test_asgi_app_serves_ask_and_health(workspace):
+    import asgi
+
+    async def exercise():
+        client = asgi.app.test_client()
+        ready = await client.get('/health/ready')
+        assert ready.status_code == 200
+
+        response = await client.post('/api/v1/ask', json={'question': 'What is karma yoga?'})
+        assert response.status_code == 200
+        body = await response.get_json()
+        assert body['answer']
+        assert body['metadata']['context_chunks'] > 0
+
+        bad = await client.post('/api/v1/ask', json={'question': 'Duty?', 'filters': {'chapters': {'from': 2}}})
+        assert bad.status_code == 400
+
+        metrics = await client.get('/metrics')
+        assert 'gita_in_flight_requests 0' in await metrics.get_data(as_text=True)
+
+    asyncio.run(exercise())
+    assert asgi.limiter.in_flight == 0
+
+
+def test_asgi_loads_the_searcher_off_the_event_loop(workspace, monkeypatch):
+    import asgi
+
+    index_manager = asgi.app.config['index_manager']
+    get_searcher = index_manager.get_searcher
+    threads = []
+
+    def recording_get_searcher():
+        threads.append(threading.current_thread().name)
+        return get_searcher()
+
+    monkeypatch.setattr(index_manager, 'get_searcher', recording_get_searcher)
+
+    async def exercise():
+        response = await asgi.app.test_client().post('/api/v1/ask', json={'question': 'What is dharma?'})
+        assert response.status_code == 200
+
+    asyncio.run(exercise())
+    assert threads and all(name.startswith('faiss-search') for name in threads)
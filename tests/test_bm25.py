@@ -0,0 +1,73 @@
+# tests/test_bm25.py
+import numpy as np
+import pytest
+
+from src.core.bm25 import BM25Index, SegmentedBM25Index, tokenize
+
+TEXTS = [
+    "The soul is never born and never dies; it is eternal.",
+    "Thy right is to work only, never to the fruits of work.",
+    "Perform action, abandoning attachment, steady in yoga.",
+    "Arjuna saw the armies arrayed on the field of dharma.",
+    "Work done without attachment to fruits frees the soul.",
+]
+DELTA = [
+    "The lotus leaf is untouched by water.",
+    "Yoga is skill in work.",
+]
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("Thy right is to WORK only") == ['right', 'work', 'only']
+
+
+def test_ranks_by_term_weight():
+    index = BM25Index.build(TEXTS)
+    scores, ids = index.search('fruits of work', k=3)
+
+    assert list(ids[:2]) == [1, 4]
+    assert np.all(np.diff(scores) <= 0)
+    assert index.search('kurukshetra', k=3)[1].size == 0
+
+
+def test_allowed_mask_filters_documents():
+    index = BM25Index.build(TEXTS)
+    allowed = np.array([True, False, True, True, True])
+    _, ids = index.search('work', k=5, allowed=allowed)
+    assert 1 not in ids and 4 in ids
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index.build(TEXTS)
+    index.save(tmp_path / 'bm25.npz')
+    loaded = BM25Index.load(tmp_path / 'bm25.npz')
+
+    assert loaded.doc_count == index.doc_count
+    assert loaded.avg_length == pytest.approx(index.avg_length)
+    assert loaded.vocabulary == index.vocabulary
+    for query in ('fruits of work', 'soul', 'attachment yoga'):
+        np.testing.assert_array_equal(loaded.search(query, k=5)[1], index.search(query, k=5)[1])
+        np.testing.assert_allclose(loaded.search(query, k=5)[0], index.search(query, k=5)[0])
+
+
+def test_segmented_index_offsets_delta_ids():
+    base = BM25Index.build(TEXTS)
+    segmented = SegmentedBM25Index.build(base, DELTA)
+
+    assert segmented.doc_count == len(TEXTS) + len(DELTA)
+    assert list(segmented.search('lotus leaf', k=3)[1]) == [len(TEXTS)]
+    _, ids = segmented.search('work', k=10)
+    assert set(ids) == {1, 4, len(TEXTS) + 1}
+
+    allowed = np.ones(segmented.doc_count, dtype=bool)
+    allowed[len(TEXTS) + 1] = False
+    assert len(TEXTS) + 1 not in segmented.search('work', k=10, allowed=allowed)[1]
+
+
+def test_segmented_ranking_matches_a_full_rebuild():
+    # Delta weights count the base documents too, so rankings agree with one index over everything
+    segmented = SegmentedBM25Index.build(BM25Index.build(TEXTS), DELTA)
+    full = BM25Index.build(TEXTS + DELTA)
+
+    for query in ('lotus', 'yoga', 'work', 'skill in work'):
+        assert list(segmented.search(query, k=3)[1]) == list(full.search(query, k=3)[1])
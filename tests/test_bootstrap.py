@@ -0,0 +1,47 @@
+# tests/test_bootstrap.py
+import pytest
+
+from src.core import bootstrap
+
+
+@pytest.fixture
+def fresh_startup(monkeypatch):
+    """Module state of a process that has not started up, with thread starts and fork hooks recorded"""
+    calls = []
+    monkeypatch.setattr(bootstrap, 'startup_status', bootstrap.StartupStatus())
+    monkeypatch.setattr(bootstrap, '_background', None)
+    monkeypatch.setattr(bootstrap, '_deferred_to_workers', False)
+    monkeypatch.setattr(bootstrap, '_start_background', lambda: calls.append('thread'))
+    monkeypatch.setattr(bootstrap, '_register_fork_hook', lambda: calls.append('fork hook'))
+    monkeypatch.setattr(bootstrap, 'setup_directories', lambda: None)
+    return calls
+
+
+def test_preload_master_leaves_a_missing_index_to_workers(fresh_startup, monkeypatch):
+    monkeypatch.setattr(bootstrap, 'PRELOAD_APP', True)
+    monkeypatch.setattr(bootstrap, 'check_existing_files', lambda: False)
+
+    bootstrap.prepare_index(background=True)
+
+    assert fresh_startup == ['fork hook']
+    assert bootstrap.startup_status.state == 'starting'
+
+    # Any forked child only resets its locks; serving workers resume explicitly
+    bootstrap._after_fork()
+    assert fresh_startup == ['fork hook']
+    bootstrap.resume_after_fork()
+    assert fresh_startup == ['fork hook', 'thread']
+
+
+def test_fast_start_without_preload_starts_its_own_thread(fresh_startup, monkeypatch):
+    monkeypatch.setattr(bootstrap, 'PRELOAD_APP', False)
+
+    bootstrap.prepare_index(background=True)
+
+    assert fresh_startup == ['fork hook', 'thread']
+
+
+def test_resume_is_a_no_op_once_ready(fresh_startup):
+    bootstrap.startup_status.update(state='ready')
+    bootstrap.resume_after_fork()
+    assert fresh_startup == []
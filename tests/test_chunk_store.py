@@ -0,0 +1,74 @@
+# tests/test_chunk_store.py
+import pytest
+
+from src.core.chunk_store import ChunkOverlay, ChunkStore
+
+CHUNKS = [
+    {'id': 'ch1_header', 'uid': 'u0', 'type': 'chapter_header', 'content': 'Chapter I: The Despondency of Arjuna',
+     'metadata': {'chapter_number': 1, 'section_type': 'header', 'headers': {'h1': 'Chapter I'}}},
+    {'id': 'ch2_v47', 'uid': 'u1', 'type': 'verse', 'content': 'Thy right is to work only — कर्मण्येवाधिकारस्ते.',
+     'metadata': {'chapter_number': 2, 'verse_number': 47, 'speaker': 'Krishna',
+                  'headers': {'h1': 'Chapter II'}, 'source': 'gita.md'}},
+    {'id': 'ch2_p3', 'type': 'verse', 'content': '', 'metadata': {'chapter_number': 2, 'speaker': 'Arjuna'}},
+    {'id': 'intro', 'content': 'An unnumbered introduction.', 'metadata': {}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / 'chunks.bin'
+    ChunkStore.write(path, CHUNKS, {'embedding_model': 'fake-embedding'})
+    return ChunkStore.open(path)
+
+
+def normalized(chunk):
+    """What a chunk decodes to: no None type, metadata always present"""
+    expected = {key: value for key, value in chunk.items() if value is not None}
+    expected.setdefault('type', None)
+    return expected
+
+
+def test_round_trip(store):
+    assert len(store) == len(CHUNKS)
+    assert store.metadata == {'embedding_model': 'fake-embedding'}
+    assert list(store) == [normalized(chunk) for chunk in CHUNKS]
+    assert store[-1] == store[3] and store[1:3] == [store[1], store[2]]
+    with pytest.raises(IndexError):
+        store[len(CHUNKS)]
+
+
+def test_column_accessors_skip_decoding(store):
+    assert [store.get_id(i) for i in range(len(store))] == [chunk['id'] for chunk in CHUNKS]
+    assert store.get_content(1) == CHUNKS[1]['content']
+    assert [store.get_uid(i) for i in range(len(store))] == ['u0', 'u1', 'ch2_p3', 'intro']
+    assert list(store.column('chapter')) == [1, 2, 2, -1]
+    assert list(store.column('verse')) == [-1, 47, -1, -1]
+    assert store.dictionaries['speaker'] == ['Krishna', 'Arjuna']
+
+
+def test_empty_store(tmp_path):
+    ChunkStore.write(tmp_path / 'empty.bin', [])
+    store = ChunkStore.open(tmp_path / 'empty.bin')
+    assert len(store) == 0 and list(store) == []
+
+
+def test_rejects_other_files(tmp_path):
+    (tmp_path / 'chunks.bin').write_bytes(b'not a chunk store at all')
+    with pytest.raises(ValueError, match='Not a chunk store'):
+        ChunkStore.open(tmp_path / 'chunks.bin')
+
+
+def test_overlay_appends_without_touching_the_base(store):
+    added = {'id': 'ch3_v8', 'type': 'verse', 'content': 'Do thy bounden duty.', 'metadata': {'chapter_number': 3}}
+    overlay = ChunkOverlay(store)
+    extended = overlay.append([added])
+
+    assert len(overlay) == len(CHUNKS) and len(extended) == len(CHUNKS) + 1
+    assert extended.base is store
+    assert extended[len(CHUNKS)] == added and extended[-1] == added
+    assert extended[1] == store[1]
+    assert extended.get_id(len(CHUNKS)) == 'ch3_v8' and extended.get_id(0) == 'ch1_header'
+    assert extended.get_content(len(CHUNKS)) == 'Do thy bounden duty.'
+    assert list(extended)[:len(CHUNKS)] == list(store)
+    with pytest.raises(IndexError):
+        extended[len(CHUNKS) + 1]
@@ -0,0 +1,60 @@
+# tests/test_context.py
+import pytest
+
+from src.services.context import ContextAssembler, estimate_tokens
+
+VERSES = {
+    'ch2_v47': "Thy right is to work only, but never with its fruits; let not the fruits of action be thy motive.",
+    'ch2_v48': "Perform action, O Dhananjaya, being steadfast in Yoga, abandoning attachment.",
+    'ch3_v8': "Do thou perform thy bounden duty, for action is superior to inaction.",
+}
+
+
+def assemble(max_tokens, ids, min_chunk_tokens=8):
+    assembler = ContextAssembler(max_tokens=max_tokens, chars_per_token=4, min_chunk_tokens=min_chunk_tokens)
+    return assembler.assemble([VERSES[chunk_id] for chunk_id in ids], ids)
+
+
+def test_everything_fits_and_adjacent_verses_share_a_header():
+    context = assemble(1000, ['ch3_v8', 'ch2_v48', 'ch2_v47'])
+
+    assert not context.truncated
+    assert context.chunk_ids == ['ch3_v8', 'ch2_v48', 'ch2_v47']
+    assert context.text.startswith("[Chapter 3, verse 8]\n")
+    assert f"[Chapter 2, verses 47-48]\n{VERSES['ch2_v47']}\n{VERSES['ch2_v48']}" in context.text
+    assert context.tokens == estimate_tokens(context.text)
+
+
+@pytest.mark.parametrize('max_tokens', [30, 40, 60])
+def test_stays_within_budget_and_keeps_ranking_order(max_tokens):
+    context = assemble(max_tokens, ['ch2_v47', 'ch3_v8', 'ch2_v48'])
+
+    assert context.tokens <= max_tokens
+    assert context.chunk_ids[0] == 'ch2_v47'
+    assert context.text.startswith("[Chapter 2, verse 47")
+
+
+def test_trims_the_chunk_that_does_not_fit():
+    context = assemble(50, ['ch2_v47', 'ch3_v8'])
+
+    assert context.truncated
+    assert context.chunk_ids == ['ch2_v47', 'ch3_v8']
+    assert context.text.endswith(" …")
+
+
+def test_skips_a_chunk_when_too_little_space_is_left():
+    # After the first verse only a few tokens remain, below min_chunk_tokens
+    context = assemble(50, ['ch2_v47', 'ch3_v8'], min_chunk_tokens=20)
+
+    assert context.chunk_ids == ['ch2_v47']
+    assert not context.truncated
+
+
+@pytest.mark.parametrize('max_tokens', [1, 3, 5])
+def test_best_chunk_survives_a_budget_smaller_than_its_header(max_tokens):
+    context = assemble(max_tokens, ['ch2_v47', 'ch3_v8'])
+
+    assert context.chunk_ids == ['ch2_v47']
+    assert context.text and not context.text.startswith("[")
+    assert VERSES['ch2_v47'].startswith(context.text.rstrip(" …"))
+    assert context.tokens <= max_tokens
@@ -0,0 +1,126 @@
+# tests/test_embedding_backend.py
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.core import embedding_backend
+from src.core.embedding_backend import BatchEmbedder, FakeEmbeddingBackend
+
+
+class FlakyBackend(FakeEmbeddingBackend):
+    """Fake backend that raises the queued errors, one per call, before embedding normally"""
+
+    def __init__(self, errors=(), **kwargs):
+        super().__init__(embedding_dim=32, **kwargs)
+        self.errors = list(errors)
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def _next_error(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            return self.errors.pop(0) if self.errors else None
+
+    def embed_batch(self, texts, task_type=embedding_backend.DEFAULT_TASK_TYPE):
+        error = self._next_error(texts)
+        if error is not None:
+            raise error
+        return super().embed_batch(texts, task_type)
+
+    async def aembed_batch(self, texts, task_type=embedding_backend.DEFAULT_TASK_TYPE):
+        error = self._next_error(texts)
+        if error is not None:
+            raise error
+        return await super().aembed_batch(texts, task_type)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays, recorded instead of slept; jitter is pinned to zero"""
+    delays = []
+
+    async def fake_async_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(embedding_backend.time, 'sleep', delays.append)
+    monkeypatch.setattr(embedding_backend.asyncio, 'sleep', fake_async_sleep)
+    monkeypatch.setattr(embedding_backend.random, 'random', lambda: 0.0)
+    return delays
+
+
+TEXTS = [f"verse {i} on duty, the soul and action number {i}" for i in range(10)]
+
+
+def test_splits_into_batches_and_keeps_input_order():
+    backend = FlakyBackend()
+    progress = []
+    vectors = BatchEmbedder(backend, batch_size=3, max_workers=4).embed(
+        TEXTS, progress=lambda done, total: progress.append((done, total))
+    )
+
+    assert vectors.shape == (10, 32)
+    np.testing.assert_array_equal(vectors, FakeEmbeddingBackend(embedding_dim=32).embed_batch(TEXTS))
+    assert sorted(map(len, backend.batches)) == [1, 3, 3, 3]
+    assert sorted(text for batch in backend.batches for text in batch) == sorted(TEXTS)
+    assert progress[-1] == (10, 10)
+
+
+def test_empty_input_makes_no_call():
+    backend = FlakyBackend()
+    assert BatchEmbedder(backend).embed([]).shape == (0, 32)
+    assert backend.batches == []
+
+
+@pytest.mark.parametrize('error', [
+    google_exceptions.TooManyRequests('429 Too Many Requests'),
+    google_exceptions.ResourceExhausted('429 Quota exceeded'),
+    google_exceptions.InternalServerError('500 Internal error'),
+    google_exceptions.ServiceUnavailable('503 Service unavailable'),
+    RuntimeError('HTTP 429: rate limit'),
+])
+def test_retries_rate_limits_and_server_errors_with_backoff(sleeps, error):
+    backend = FlakyBackend(errors=[error, error, error])
+    embedder = BatchEmbedder(backend, batch_size=100, max_retries=5, initial_backoff=1.0, max_backoff=3.0)
+
+    vectors = embedder.embed(TEXTS)
+
+    np.testing.assert_array_equal(vectors, FakeEmbeddingBackend(embedding_dim=32).embed_batch(TEXTS))
+    assert len(backend.batches) == 4
+    assert sleeps == [1.0, 2.0, 3.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    errors = [google_exceptions.ServiceUnavailable('503')] * 10
+    backend = FlakyBackend(errors=errors)
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        BatchEmbedder(backend, max_retries=2).embed(TEXTS)
+    assert len(backend.batches) == 3
+    assert len(sleeps) == 2
+
+
+@pytest.mark.parametrize('error', [
+    google_exceptions.InvalidArgument('400 Request payload size exceeds the limit'),
+    google_exceptions.PermissionDenied('403 API key not valid'),
+    ValueError('malformed response'),
+])
+def test_does_not_retry_other_errors(sleeps, error):
+    backend = FlakyBackend(errors=[error])
+
+    with pytest.raises(type(error)):
+        BatchEmbedder(backend, max_retries=5).embed(TEXTS)
+    assert len(backend.batches) == 1
+    assert sleeps == []
+
+
+def test_async_query_retries(sleeps):
+    backend = FlakyBackend(errors=[google_exceptions.TooManyRequests('429')])
+    embedder = BatchEmbedder(backend, initial_backoff=0.5)
+
+    vector = asyncio.run(embedder.aembed_query("what is dharma"))
+
+    np.testing.assert_array_equal(vector, FakeEmbeddingBackend(embedding_dim=32).embed_batch(["what is dharma"])[0])
+    assert sleeps == [0.5]
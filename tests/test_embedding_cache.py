@@ -0,0 +1,53 @@
+# tests/test_embedding_cache.py
+import threading
+
+import numpy as np
+
+from src.core.embedding_backend import FakeEmbeddingBackend
+from src.core.embedding_cache import EmbeddingCache
+
+BACKEND = FakeEmbeddingBackend(embedding_dim=16)
+
+
+def recording_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return BACKEND.embed_batch(texts)
+    return embed
+
+
+def test_reuses_cached_vectors(tmp_path):
+    calls = []
+    cache = EmbeddingCache('fake-embedding', 16, cache_dir=str(tmp_path))
+    texts = ['karma yoga', 'jnana yoga', 'karma yoga']
+
+    first = cache.get_or_embed(texts, recording_embed(calls))
+    second = EmbeddingCache('fake-embedding', 16, cache_dir=str(tmp_path)).get_or_embed(
+        texts + ['bhakti yoga'], recording_embed(calls)
+    )
+
+    assert calls == [['karma yoga', 'jnana yoga'], ['bhakti yoga']]
+    np.testing.assert_array_equal(second[:3], first)
+    np.testing.assert_array_equal(second, BACKEND.embed_batch(texts + ['bhakti yoga']))
+
+
+def test_lock_is_not_held_while_embedding(tmp_path):
+    other = EmbeddingCache('fake-embedding', 16, cache_dir=str(tmp_path))
+    finished_while_embedding = []
+
+    def slow_embed(texts):
+        # Another build caches one of the same texts while this one is embedding
+        thread = threading.Thread(target=other.get_or_embed, args=(['dharma'], BACKEND.embed_batch))
+        thread.start()
+        thread.join(timeout=5)
+        finished_while_embedding.append(not thread.is_alive())
+        return BACKEND.embed_batch(texts)
+
+    cache = EmbeddingCache('fake-embedding', 16, cache_dir=str(tmp_path))
+    embeddings = cache.get_or_embed(['dharma', 'moksha'], slow_embed)
+
+    assert finished_while_embedding == [True]
+    np.testing.assert_array_equal(embeddings, BACKEND.embed_batch(['dharma', 'moksha']))
+    # The vector the other build appended is not written a second time
+    cache._read_index()
+    assert sorted(cache._rows.values()) == [0, 1]
@@ -0,0 +1,76 @@
+# tests/test_formatter.py
+import random
+
+import pytest
+
+from src.services.formatter import ResponseFormatter
+
+
+def reference_format(text: str) -> str:
+    """The whole-text formatter ResponseFormatter replaced, applied to the stripped answer"""
+    formatted_lines = []
+    in_verse_block = False
+    for line in text.strip().split('\n'):
+        if line.strip().startswith('Chapter') or line.strip().startswith('Verse'):
+            if not in_verse_block:
+                formatted_lines.extend(['```verse', line])
+                in_verse_block = True
+            else:
+                formatted_lines.append(line)
+        elif any(marker in line for marker in ['[Sanskrit]', '(Sanskrit)']):
+            formatted_lines.append(f"*{line}*")
+        elif in_verse_block and line.strip() == '':
+            formatted_lines.extend(['```', ''])
+            in_verse_block = False
+        else:
+            for speaker in ['Krishna:', 'Arjuna:', 'Sanjaya:', 'Dhritirashtra:']:
+                if line.strip().startswith(speaker):
+                    line = f"**{speaker}** {line[len(speaker):]}"
+            formatted_lines.append(line)
+    if in_verse_block:
+        formatted_lines.append('```')
+    return '\n'.join(formatted_lines)
+
+
+def stream(text: str, sizes) -> str:
+    formatter = ResponseFormatter()
+    output, position = [], 0
+    for size in sizes:
+        output.append(formatter.feed(text[position:position + size]))
+        position += size
+    output.append(formatter.feed(text[position:]))
+    return ''.join(output) + formatter.flush()
+
+
+ANSWERS = [
+    "",
+    "   \n\n",
+    "Krishna: Perform your duty without attachment.",
+    "Chapter 2, Verse 47\nYou have a right to action alone.\n\nKrishna: Act without desire.",
+    "\n  Arjuna: How can I fight?\n[Sanskrit] karmany evadhikaras te\n\n\nSanjaya: Thus spoke Arjuna.  \n",
+    "Verse 1\nChapter 2\n \nDhritirashtra: What did they do?\n\n",
+    "Text before\nChapter 18\n(Sanskrit) moksha\nstill in the block",
+]
+
+
+@pytest.mark.parametrize('text', ANSWERS)
+def test_format_matches_whole_text_formatting(text):
+    assert ResponseFormatter().format(text) == reference_format(text)
+
+
+@pytest.mark.parametrize('text', ANSWERS)
+def test_any_fragmentation_gives_the_same_output(text):
+    expected = reference_format(text)
+    assert stream(text, [1] * len(text)) == expected
+    for cut in range(len(text) + 1):
+        assert stream(text, [cut]) == expected
+
+
+def test_random_answers_streamed_in_random_fragments():
+    pieces = ['Chapter 2', 'Verse 47', 'Krishna: act', 'Arjuna: why  ', '[Sanskrit] om ', '  ', '',
+              'plain text', '[Sanskrit] dharma', 'Arjuna: why', ' \t', 'Sanjaya:']
+    rng = random.Random(7)
+    for _ in range(2000):
+        text = '\n'.join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+        sizes = [rng.randint(1, 6) for _ in range(len(text))]
+        assert stream(text, sizes) == reference_format(text), repr(text)
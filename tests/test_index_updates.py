@@ -0,0 +1,193 @@
+# tests/test_index_updates.py
+import json
+import threading
+import time
+
+import pytest
+
+from src.core import index_updates
+from src.core.index_updates import OP_DELETE, OP_UPSERT, ChangeLog, IndexUpdater
+from src.core.searcher import EnhancedSearcher
+from src.core.snapshot import SnapshotStore
+
+VERSION = '20260101_000000_000000'
+
+
+def chunk(uid, content, chapter=2, speaker='Krishna', number=None):
+    metadata = {'chapter_number': chapter, 'speaker': speaker}
+    if number is not None:
+        metadata['verse_number'] = number
+    return {
+        'uid': uid,
+        'id': f'ch{chapter}_v{number}' if number is not None else f'ch{chapter}_p{uid}',
+        'type': 'verse',
+        'content': content,
+        'metadata': metadata,
+    }
+
+
+CHUNKS = [
+    chunk('a', 'The soul is never born and never dies.', number=20),
+    chunk('b', 'Thy right is to work only, never to its fruits.', number=47),
+    chunk('c', 'Arjuna asked how the steady minded one speaks.', speaker='Arjuna'),
+    chunk('d', 'Sanjaya described the armies on the field.', chapter=1, speaker='Sanjaya'),
+]
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    """A published snapshot of CHUNKS under tmp_path/data/processed/faiss_index"""
+    monkeypatch.chdir(tmp_path)
+    assert EnhancedSearcher().build_index(CHUNKS)
+    return tmp_path / 'data' / 'processed' / 'faiss_index'
+
+
+def live_contents(searcher):
+    if searcher.live is None:
+        return sorted(c['content'] for c in searcher.chunks)
+    return sorted(searcher.chunks[slot]['content'] for slot, alive in enumerate(searcher.live) if alive)
+
+
+def lexical_ids(searcher, query, k=5):
+    return [result['chunk_id'] for result in searcher.search(query, k=k, mode='lexical')]
+
+
+def test_read_consumes_only_complete_lines(tmp_path):
+    log = ChangeLog(tmp_path, VERSION)
+    assert log.read() == ([], 0)
+
+    log.path.parent.mkdir(parents=True)
+    log.append([{'op': OP_DELETE, 'uid': 'a'}, {'op': OP_DELETE, 'uid': 'b'}])
+    complete = log.size()
+    partial = json.dumps({'op': OP_DELETE, 'uid': 'c'})
+    with open(log.path, 'a', encoding='utf-8') as f:
+        f.write(partial[:10])
+
+    records, offset = log.read()
+    assert [record['uid'] for record in records] == ['a', 'b']
+    assert offset == complete
+
+    with open(log.path, 'a', encoding='utf-8') as f:
+        f.write(partial[10:] + '\n')
+    records, offset = log.read(offset)
+    assert [record['uid'] for record in records] == ['c']
+    assert log.read(offset) == ([], offset)
+
+
+def test_upserts_and_deletes_apply_to_a_copy(index_dir):
+    updater = IndexUpdater(str(index_dir))
+    assert updater.upsert([
+        chunk('e', 'A new commentary on the lotus leaf untouched by water.', chapter=5, speaker='Krishna'),
+        chunk('b', 'Revised: act without attachment to the fruits.', number=47),
+    ]) == 2
+    assert updater.delete(['d', 'missing']) == 2
+
+    searcher = EnhancedSearcher.load()
+    records, _ = ChangeLog(index_dir, searcher.snapshot_timestamp).read()
+    assert [record['op'] for record in records] == [OP_UPSERT, OP_UPSERT, OP_DELETE, OP_DELETE]
+    updated = searcher.apply_changes(records)
+
+    assert live_contents(searcher) == sorted(c['content'] for c in CHUNKS)
+    assert live_contents(updated) == sorted([
+        CHUNKS[0]['content'], CHUNKS[2]['content'],
+        'A new commentary on the lotus leaf untouched by water.',
+        'Revised: act without attachment to the fruits.',
+    ])
+    assert updated.applied_records == 4
+
+    assert lexical_ids(updated, 'lotus leaf') == ['ch5_pe']
+    assert lexical_ids(updated, 'armies field') == []
+    assert lexical_ids(searcher, 'armies field') == ['ch1_pd']
+    assert [r['content'] for r in updated.search('BG 2.47', k=1)] == ['Revised: act without attachment to the fruits.']
+
+    class Filters:
+        chapters, speakers, chunk_types = [5], None, None
+    assert [r['chunk_id'] for r in updated.search('commentary', k=3, filters=Filters)] == ['ch5_pe']
+    with pytest.raises(ValueError):
+        searcher.validate_filters(Filters)
+
+
+def test_batches_apply_like_one(index_dir):
+    updater = IndexUpdater(str(index_dir))
+    updater.upsert([chunk('e', 'The lotus leaf is untouched by water.', chapter=5)])
+    updater.upsert([chunk('e', 'The lotus leaf, revised twice.', chapter=5)])
+    updater.delete(['a', 'e'])
+    updater.upsert([chunk('a', 'The soul returns, rewritten.', number=20)])
+
+    searcher = EnhancedSearcher.load()
+    records, _ = ChangeLog(index_dir, searcher.snapshot_timestamp).read()
+    at_once = searcher.apply_changes(records)
+    one_by_one = searcher
+    for record in records:
+        one_by_one = one_by_one.apply_changes([record])
+
+    assert live_contents(at_once) == live_contents(one_by_one)
+    assert 'The soul returns, rewritten.' in live_contents(at_once)
+    assert lexical_ids(at_once, 'lotus leaf') == lexical_ids(one_by_one, 'lotus leaf') == []
+    for query in ('soul returns', 'right to work'):
+        assert at_once.search(query, k=3) == one_by_one.search(query, k=3)
+
+
+def test_compaction_folds_the_log_into_a_new_snapshot(index_dir):
+    updater = IndexUpdater(str(index_dir))
+    updater.upsert([chunk('e', 'The lotus leaf is untouched by water.', chapter=5)])
+    updater.delete(['d'])
+    store = SnapshotStore(index_dir)
+    before = store.current_version()
+    expected = live_contents(EnhancedSearcher.load().apply_changes(ChangeLog(index_dir, before).read()[0]))
+
+    version = updater.compact()
+    assert version is not None and version != before
+    assert store.current_version() == version
+
+    compacted = EnhancedSearcher.load()
+    assert compacted.live is None and compacted.delta_index is None
+    assert live_contents(compacted) == expected
+    assert ChangeLog(index_dir, version).read() == ([], 0)
+    assert lexical_ids(compacted, 'lotus leaf') == ['ch5_pe']
+    assert updater.compact() is None
+
+
+def test_compacts_only_once_the_log_reaches_the_threshold(index_dir):
+    updater = IndexUpdater(str(index_dir), compact_threshold=2)
+    store = SnapshotStore(index_dir)
+    before = store.current_version()
+
+    updater.delete(['d'])
+    assert updater.compact_if_needed() is None
+    updater.upsert([chunk('e', 'The lotus leaf is untouched by water.', chapter=5)])
+    version = updater.compact_if_needed()
+
+    assert version is not None and store.current_version() == version != before
+    assert IndexUpdater(str(index_dir), compact_threshold=0).compact_if_needed() is None
+
+
+def test_one_background_compaction_per_process():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    class SlowUpdater:
+        def compact(self):
+            calls.append(1)
+            started.set()
+            release.wait(5)
+
+    threads = [threading.Thread(target=index_updates.compact_in_background, args=(SlowUpdater(),))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert started.wait(5)
+    release.set()
+    assert calls == [1]
+
+    # The lock is released once the run finishes
+    for _ in range(100):
+        if index_updates._compacting.acquire(blocking=False):
+            index_updates._compacting.release()
+            break
+        time.sleep(0.01)
+    else:
+        pytest.fail("compaction lock was never released")
@@ -0,0 +1,70 @@
+# tests/test_metadata_index.py
+import numpy as np
+
+from src.api.models import SearchFilters
+from src.core.chunk_store import ChunkStore
+from src.core.metadata_index import MetadataIndex
+
+
+def chunk(chapter, speaker, chunk_type='verse'):
+    metadata = {'chapter_number': chapter} if chapter is not None else {}
+    if speaker:
+        metadata['speaker'] = speaker
+    return {'id': f'ch{chapter}', 'type': chunk_type, 'content': 'text', 'metadata': metadata}
+
+
+CHUNKS = [
+    chunk(1, 'Sanjaya'),
+    chunk(1, 'Arjuna'),
+    chunk(2, 'Krishna'),
+    chunk(2, 'Arjuna', 'commentary'),
+    chunk(3, 'Krishna'),
+    chunk(None, None, 'introduction'),
+    chunk(2, 'Krishna'),
+    chunk(3, 'Arjuna'),
+    chunk(18, 'Krishna'),
+]
+
+
+def matches(index, filters):
+    bitmap = index.bitmap(filters)
+    return None if bitmap is None else list(np.flatnonzero(index.mask(bitmap)))
+
+
+def test_bitmaps_combine_filters():
+    index = MetadataIndex.from_chunks(CHUNKS)
+
+    assert matches(index, None) is None
+    assert matches(index, SearchFilters(chapters=[2])) == [2, 3, 6]
+    assert matches(index, SearchFilters(chapters=[2, 3])) == [2, 3, 4, 6, 7]
+    # Values within an attribute are OR-ed, attributes AND-ed; names ignore case
+    assert matches(index, SearchFilters(chapters=[2, 3], speakers=['krishna'])) == [2, 4, 6]
+    assert matches(index, SearchFilters(speakers=['Arjuna'], chunk_types=['verse'])) == [1, 7]
+    assert matches(index, SearchFilters(chapters=[7])) == []
+    assert index.unknown_values(SearchFilters(chapters=[2, 7], speakers=['Vyasa'])) == \
+        {'chapter': [7], 'speaker': ['Vyasa']}
+
+
+def test_chunk_store_columns_give_the_same_bitmaps(tmp_path):
+    ChunkStore.write(tmp_path / 'chunks.bin', CHUNKS)
+    from_store = MetadataIndex.from_chunks(ChunkStore.open(tmp_path / 'chunks.bin'))
+    from_dicts = MetadataIndex.from_chunks(CHUNKS)
+
+    for filters in (SearchFilters(chapters=[1, 18]), SearchFilters(speakers=['Krishna']),
+                    SearchFilters(chunk_types=['Commentary', 'introduction'])):
+        np.testing.assert_array_equal(from_store.bitmap(filters), from_dicts.bitmap(filters))
+
+
+def test_extend_matches_a_rebuild():
+    # 8 base chunks fill the first byte exactly, so the appended ones start a new one
+    base = MetadataIndex.from_chunks(CHUNKS[:8])
+    added = CHUNKS[8:] + [chunk(18, 'Sanjaya', 'summary')]
+    extended = base.extend(added)
+    rebuilt = MetadataIndex.from_chunks(CHUNKS[:8] + added)
+
+    assert extended.size == rebuilt.size == 10
+    for filters in (SearchFilters(chapters=[18]), SearchFilters(speakers=['Sanjaya']),
+                    SearchFilters(chunk_types=['summary']), SearchFilters(chapters=[2], speakers=['Krishna'])):
+        assert matches(extended, filters) == matches(rebuilt, filters)
+    # The original is left as it was
+    assert base.size == 8 and matches(base, SearchFilters(chapters=[18])) == []
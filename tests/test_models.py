@@ -0,0 +1,26 @@
+# tests/test_models.py
+import pytest
+
+from src.api.models import SearchFilters, validate_query, validate_search_query
+
+
+def test_filters_accept_single_values_lists_and_ranges():
+    assert SearchFilters.from_dict({'chapter': '2', 'speaker': 'Krishna'}) == \
+        SearchFilters(chapters=[2], speakers=['Krishna'])
+    assert SearchFilters.from_dict({'chapters': {'from': 2, 'to': 4}}).chapters == [2, 3, 4]
+
+
+@pytest.mark.parametrize('filters', [
+    {'chapters': {'from': 2}},
+    {'chapters': {'to': 3}},
+    {'chapters': {'from': 'two', 'to': 3}},
+    {'chapters': ['two']},
+    {'chapter': None, 'chapters': [[2]]},
+])
+def test_malformed_chapters_raise_value_error(filters):
+    with pytest.raises(ValueError, match='[Cc]hapter'):
+        SearchFilters.from_dict(filters)
+    with pytest.raises(ValueError):
+        validate_search_query({'query': 'duty', 'filters': filters})
+    with pytest.raises(ValueError):
+        validate_query({'question': 'What is duty?', 'filters': filters})
@@ -0,0 +1,59 @@
+# tests/test_search_batch.py
+import pytest
+
+from src.api.models import SearchFilters
+from src.core.searcher import EnhancedSearcher
+
+PASSAGES = [
+    (2, 'Krishna', "The soul is never born and never dies; weapons cleave it not."),
+    (2, 'Krishna', "Thy right is to work only, never to the fruits of work."),
+    (2, 'Arjuna', "How does the man of steady wisdom speak, sit and walk?"),
+    (3, 'Krishna', "Perform thy bounden duty, for action is superior to inaction."),
+    (3, 'Arjuna', "Why then dost thou urge me to this terrible action?"),
+    (4, 'Krishna', "Whenever dharma declines, I manifest myself age after age."),
+    (5, 'Krishna', "He who acts without attachment is untouched, as a lotus leaf by water."),
+    (6, 'Krishna', "The mind is restless, but it is restrained by practice and dispassion."),
+]
+
+
+@pytest.fixture(scope='module')
+def searcher():
+    chunks = [
+        {'id': f'ch{chapter}_v{i + 1}', 'type': 'verse', 'content': f"{i + 1}. {content}",
+         'metadata': {'chapter_number': chapter, 'verse_number': i + 1, 'speaker': speaker}}
+        for i, (chapter, speaker, content) in enumerate(PASSAGES)
+    ]
+    searcher = EnhancedSearcher()
+    assert searcher.build_index(chunks, save=False)
+    return searcher
+
+
+QUERIES = [
+    "What is the nature of the soul?",
+    "work without attachment to fruits",
+    "BG 3.4",
+    "how to control the restless mind",
+    "dharma",
+    "an unrelated question about astronomy",
+]
+
+
+@pytest.mark.parametrize('mode', ['dense', 'lexical', 'hybrid'])
+def test_batch_matches_one_search_per_query(searcher, mode):
+    assert searcher.search_batch(QUERIES, k=3, mode=mode) == \
+        [searcher.search(query, k=3, mode=mode) for query in QUERIES]
+
+
+def test_per_query_k_and_filters(searcher):
+    ks = [1, 2, 3, 4, 5, 2]
+    filters = [None, SearchFilters(speakers=['Krishna']), None, SearchFilters(chapters=[6]),
+               SearchFilters(chapters=[2, 3]), SearchFilters(speakers=['Arjuna'])]
+
+    batch = searcher.search_batch(QUERIES, k=ks, filters=filters)
+
+    assert batch == [searcher.search(query, k=k, filters=f) for query, k, f in zip(QUERIES, ks, filters)]
+    assert all(len(results) <= k for results, k in zip(batch, ks))
+
+
+def test_empty_batch(searcher):
+    assert searcher.search_batch([], k=3) == []
@@ -0,0 +1,100 @@
+# tests/test_snapshot.py
+import multiprocessing
+import pickle
+
+import faiss
+import numpy as np
+import pytest
+
+from src.core.snapshot import (
+    BM25_FILE, CHUNKS_FILE, INDEX_FILE, VECTORS_FILE, SnapshotError, SnapshotStore
+)
+
+
+def publish(store: SnapshotStore, version: str = '20260101_000000_000000', optional: bool = False):
+    staging_dir = store.stage(version)
+    for name in (INDEX_FILE, CHUNKS_FILE, BM25_FILE) + ((VECTORS_FILE,) if optional else ()):
+        (staging_dir / name).write_bytes(f'{name} contents'.encode('utf-8'))
+    store.commit(version, staging_dir, {'embedding_dim': 8})
+    store.activate(version)
+    return version
+
+
+def test_published_snapshot_opens(tmp_path):
+    store = SnapshotStore(tmp_path)
+    version = publish(store, optional=True)
+    assert store.current_version() == version
+    manifest = store.open(version)
+    assert set(manifest['files']) == {INDEX_FILE, CHUNKS_FILE, BM25_FILE, VECTORS_FILE}
+    assert not any(path.name.startswith('.staging') for path in store.snapshots_path.iterdir())
+
+
+def test_rejects_file_failing_checksum(tmp_path):
+    store = SnapshotStore(tmp_path)
+    version = publish(store)
+    path = store.snapshot_dir(version) / BM25_FILE
+    # Same size, different bytes: only the checksum can tell
+    path.write_bytes(path.read_bytes().upper())
+
+    # Loads only check sizes unless SNAPSHOT_VERIFY=1; publishing always verifies
+    store.open(version)
+    with pytest.raises(SnapshotError, match='checksum'):
+        store.open(version, verify=True)
+    with pytest.raises(SnapshotError, match='checksum'):
+        store.activate(version)
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'delete'])
+def test_rejects_incomplete_file(tmp_path, damage):
+    store = SnapshotStore(tmp_path)
+    version = publish(store, optional=True)
+    path = store.snapshot_dir(version) / VECTORS_FILE
+    if damage == 'truncate':
+        path.write_bytes(path.read_bytes()[:-1])
+    else:
+        path.unlink()
+
+    # Size and presence are checked even when checksums are skipped
+    with pytest.raises(SnapshotError, match='incomplete'):
+        store.open(version, verify=False)
+
+
+def test_commit_requires_every_snapshot_file(tmp_path):
+    store = SnapshotStore(tmp_path)
+    staging_dir = store.stage('20260101_000000_000000')
+    (staging_dir / INDEX_FILE).write_bytes(b'index')
+
+    with pytest.raises(SnapshotError, match='Missing snapshot file'):
+        store.commit('20260101_000000_000000', staging_dir, {})
+    assert store.versions() == []
+
+
+def test_unknown_version(tmp_path):
+    with pytest.raises(SnapshotError, match='not found'):
+        SnapshotStore(tmp_path).open('20260101_000000_000000')
+
+
+def write_legacy_snapshot(base_path, version='20250101_120000'):
+    vectors = np.eye(4, 8, dtype=np.float32)
+    index = faiss.IndexFlatIP(8)
+    index.add(vectors)
+    faiss.write_index(index, str(base_path / f'docs_index_{version}.faiss'))
+    chunks = [{'id': f'ch1_p{i}', 'type': 'verse', 'content': f'passage {i}', 'metadata': {}} for i in range(4)]
+    with open(base_path / f'chunk_data_{version}.pkl', 'wb') as f:
+        pickle.dump({'chunks': chunks, 'embedding_model': 'fake-embedding'}, f)
+    return version
+
+
+def adopt(base_path):
+    return SnapshotStore(base_path).adopt_legacy()
+
+
+def test_concurrent_legacy_import_publishes_one_version(tmp_path):
+    version = write_legacy_snapshot(tmp_path)
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        adopted = pool.map(adopt, [tmp_path] * 4)
+
+    assert adopted == [version] * 4
+    store = SnapshotStore(tmp_path)
+    assert store.versions() == [version]
+    assert store.open(version, verify=True)['vector_count'] == 4
@@ -0,0 +1,79 @@
+# tests/test_verse_lookup.py
+import pytest
+
+from src.api.models import SearchFilters
+from src.core.searcher import EnhancedSearcher
+from src.core.verse_lookup import VerseIndex, VerseReference, parse_verse_reference
+
+
+@pytest.mark.parametrize('question, expected', [
+    ("What does chapter 2 verse 47 say?", (2, 47, 47)),
+    ("ch. II, v. 47-48", (2, 47, 48)),
+    ("chapter 2, shlokas 47 to 50", (2, 47, 50)),
+    ("Explain Chapter XVIII verse 66", (18, 66, 66)),
+    ("verse 47 of chapter 2", (2, 47, 47)),
+    ("verses 20–22 in the chapter 3", (3, 20, 22)),
+    ("BG 2.47", (2, 47, 47)),
+    ("Gita 2:47-48", (2, 47, 48)),
+    ("bhagavad-gita 4.7", (4, 7, 7)),
+    ("verse 2.47", (2, 47, 47)),
+    ("what is 2:47 about?", (2, 47, 47)),
+])
+def test_parses_references(question, expected):
+    assert parse_verse_reference(question) == VerseReference(*expected)
+
+
+@pytest.mark.parametrize('question', [
+    "What is karma yoga?",
+    "Summarise chapter 2",
+    "Rated 3.5 out of 5",
+    "version 1.2.3",
+    "chapter 19 verse 1",
+    "chapter 0 verse 4",
+    "verses 5-3 of chapter 2",
+    "BG 2.47.1",
+])
+def test_rejects_non_references(question):
+    assert parse_verse_reference(question) is None
+
+
+def test_index_resolves_only_numbered_verses():
+    chunks = [
+        {'id': 'ch2_p1', 'content': 'Sanjaya spoke.'},
+        {'id': 'ch2_v47', 'content': '47. Thy right is to work only.'},
+        {'id': 'ch2_v48', 'content': '48. Perform action, abiding in yoga.'},
+        {'id': 'ch2_p9', 'content': 'Unnumbered passage.'},
+    ]
+    index = VerseIndex.from_chunks(chunks)
+    assert index.lookup(VerseReference(2, 47, 47), neighbours=1) == [(1, True), (2, False)]
+    assert index.lookup(VerseReference(2, 9, 9)) == []
+
+    updated = index.update(chunks + [{'id': 'ch2_v47', 'content': '47. Revised.'}], removed=[1], added=[4])
+    assert updated.lookup(VerseReference(2, 47, 47)) == [(4, True)]
+    assert index.lookup(VerseReference(2, 47, 47)) == [(1, True)]
+
+
+def test_verse_fast_path_respects_filters():
+    chunks = [
+        {'id': 'ch2_v46', 'type': 'verse', 'content': '46. As a well in a flood.',
+         'metadata': {'chapter_number': 2, 'speaker': 'Krishna'}},
+        {'id': 'ch2_v47', 'type': 'verse', 'content': '47. Thy right is to work only.',
+         'metadata': {'chapter_number': 2, 'speaker': 'Krishna'}},
+        {'id': 'ch2_v48', 'type': 'verse', 'content': '48. Perform action, abiding in yoga.',
+         'metadata': {'chapter_number': 2, 'speaker': 'Arjuna'}},
+    ]
+    searcher = EnhancedSearcher()
+    assert searcher.build_index(chunks, save=False)
+
+    unfiltered = searcher.search('BG 2.47', k=3)
+    assert [r['chunk_id'] for r in unfiltered] == ['ch2_v47', 'ch2_v46', 'ch2_v48']
+
+    krishna = searcher.search('BG 2.47', k=3, filters=SearchFilters(speakers=['Krishna']))
+    assert [r['chunk_id'] for r in krishna] == ['ch2_v47', 'ch2_v46']
+
+    # The requested verse is filtered out: no fast-path hit, and retrieval stays within the filter
+    arjuna = searcher.search('BG 2.47 right to work', k=3, filters=SearchFilters(speakers=['Arjuna']))
+    assert all(not r.get('verse_match') for r in arjuna)
+    assert {r['chunk_id'] for r in arjuna} <= {'ch2_v48'}
+    assert searcher.search_batch(['BG 2.47'], k=3, filters=[SearchFilters(speakers=['Arjuna'])])[0] == \
+        searcher.search('BG 2.47', k=3, filters=SearchFilters(speakers=['Arjuna']))